@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class PizzeriasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.pizzerias'
+    
+    def ready(self):
+        from apps.pizzerias import signals  # noqa: F401
@@ -0,0 +1,186 @@
+"""
+Indice spaziale delle pizzerie
+- Griglia a celle fisse sulle coordinate delle pizzerie attive
+- Ricerca "pizzerie entro N km" senza scorrere tutte le coppie
+- Haversine vettoriale NumPy per matrici di distanze
+- Indice per processo: ricostruito quando un altro processo incrementa la
+  versione condivisa (admin, import) o comunque dopo PIZZERIA_INDEX_MAX_AGE
+  secondi (con la DummyCache di sviluppo le versioni non cambiano mai)
+- Il processo che salva una pizzeria aggiorna il proprio indice in modo
+  incrementale e passa alla versione nuova senza ricostruirlo
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ridermatch.cache import bump_version
+
+EARTH_RADIUS_KM = 6371.0
+# Lato della cella in gradi di latitudine (~5.5 km)
+CELL_DEGREES = 0.05
+KM_PER_DEGREE = 111.2
+
+
+def has_location(latitude, longitude):
+    """Le coordinate 0,0 (default del modello) valgono come mancanti"""
+    return latitude is not None and longitude is not None and (latitude != 0 or longitude != 0)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distanza in km tra due punti"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_matrix(lats1, lons1, lats2, lons2):
+    """Matrice delle distanze in km (len(lats1) x len(lats2))"""
+    lat1 = np.radians(np.asarray(lats1, dtype=float))[:, None]
+    lon1 = np.radians(np.asarray(lons1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lats2, dtype=float))[None, :]
+    lon2 = np.radians(np.asarray(lons2, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _cell(latitude, longitude):
+    return (math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES))
+
+
+class PizzeriaGridIndex:
+    """Griglia lat/lon -> pizzerie, aggiornabile una pizzeria alla volta"""
+
+    def __init__(self):
+        self.cells = {}
+        self.locations = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.locations)
+
+    def add(self, pizzeria_id, latitude, longitude):
+        """Inserisce o sposta una pizzeria"""
+        latitude, longitude = float(latitude), float(longitude)
+        with self.lock:
+            self._remove(pizzeria_id)
+            self.locations[pizzeria_id] = (latitude, longitude)
+            self.cells.setdefault(_cell(latitude, longitude), {})[pizzeria_id] = (latitude, longitude)
+
+    def remove(self, pizzeria_id):
+        with self.lock:
+            self._remove(pizzeria_id)
+
+    def _remove(self, pizzeria_id):
+        location = self.locations.pop(pizzeria_id, None)
+        if location is None:
+            return
+        cell = _cell(*location)
+        members = self.cells.get(cell)
+        if members is not None:
+            members.pop(pizzeria_id, None)
+            if not members:
+                del self.cells[cell]
+
+    def location(self, pizzeria_id):
+        """Coordinate di una pizzeria indicizzata (o None)"""
+        return self.locations.get(pizzeria_id)
+
+    def within(self, latitude, longitude, radius_km):
+        """Pizzerie entro radius_km: {pizzeria_id: distanza_km}"""
+        latitude, longitude = float(latitude), float(longitude)
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+        min_i, min_j = _cell(latitude - lat_span, longitude - lon_span)
+        max_i, max_j = _cell(latitude + lat_span, longitude + lon_span)
+
+        found = {}
+        cells = self.cells
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                members = cells.get((i, j))
+                if not members:
+                    continue
+                for pizzeria_id, (p_lat, p_lon) in list(members.items()):
+                    distance = haversine_km(latitude, longitude, p_lat, p_lon)
+                    if distance <= radius_km:
+                        found[pizzeria_id] = distance
+        return found
+
+
+_VERSION_KEY = 'geo:v:pizzerias'
+
+_index = None
+# Versione condivisa e istante (monotonic) dell'ultima costruzione
+_index_version = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _is_stale(version):
+    max_age = getattr(settings, 'PIZZERIA_INDEX_MAX_AGE', 300)
+    return _index is None or version != _index_version or time.monotonic() - _index_built_at > max_age
+
+
+def get_pizzeria_index():
+    """Indice del processo, (ri)costruito con una sola query quando non è aggiornato"""
+    global _index, _index_version, _index_built_at
+    version = cache.get(_VERSION_KEY, 1)
+    if _is_stale(version):
+        with _index_lock:
+            if _is_stale(version):
+                from apps.pizzerias.models import Pizzeria
+
+                index = PizzeriaGridIndex()
+                for pizzeria_id, latitude, longitude in Pizzeria.objects.filter(
+                    is_active=True
+                ).values_list('id', 'latitude', 'longitude'):
+                    if has_location(latitude, longitude):
+                        index.add(pizzeria_id, latitude, longitude)
+                _index = index
+                _index_version = version
+                _index_built_at = time.monotonic()
+    return _index
+
+
+def invalidate_pizzeria_index():
+    """Gli altri processi ricostruiscono l'indice (dopo il commit, con i dati nuovi)"""
+    transaction.on_commit(lambda: bump_version(_VERSION_KEY))
+
+
+def _bump_after_local_update():
+    global _index_version
+    with _index_lock:
+        previous = _index_version
+        bump_version(_VERSION_KEY)
+        # Nessun altro processo ha cambiato la versione nel frattempo:
+        # l'indice locale ha già la modifica, resta valido
+        if previous is not None and cache.get(_VERSION_KEY, 1) == previous + 1:
+            _index_version = previous + 1
+
+
+def publish_pizzeria_change():
+    """Dopo update_pizzeria/remove_pizzeria: ricostruiscono solo gli altri processi"""
+    transaction.on_commit(_bump_after_local_update)
+
+
+def update_pizzeria(pizzeria):
+    """Aggiornamento incrementale dopo il salvataggio di una pizzeria"""
+    if _index is None:
+        return
+    if pizzeria.is_active and has_location(pizzeria.latitude, pizzeria.longitude):
+        _index.add(pizzeria.id, pizzeria.latitude, pizzeria.longitude)
+    else:
+        _index.remove(pizzeria.id)
+
+
+def remove_pizzeria(pizzeria_id):
+    if _index is not None:
+        _index.remove(pizzeria_id)
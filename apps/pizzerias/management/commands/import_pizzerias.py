@@ -0,0 +1,18 @@
+from apps.pizzerias.geo import invalidate_pizzeria_index
+from apps.pizzerias.models import Pizzeria
+from ridermatch.importing import BulkUpserter, ImportCommand
+
+
+class PizzeriaUpserter(BulkUpserter):
+    model = Pizzeria
+    key = 'external_id'
+    fields = ('external_id', 'name', 'address', 'phone', 'latitude', 'longitude', 'telegram_contact', 'is_active')
+
+    def after_save(self, instances):
+        # Coordinate e stato possono essere cambiati: indice spaziale da ricostruire
+        invalidate_pizzeria_index()
+
+
+class Command(ImportCommand):
+    help = "Importa o aggiorna pizzerie da CSV/JSONL (chiave: external_id)"
+    upserter_class = PizzeriaUpserter
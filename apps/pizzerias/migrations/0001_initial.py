@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pizzeria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('address', models.TextField()),
+                ('latitude', models.DecimalField(decimal_places=6, default=0.0, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, default=0.0, max_digits=9)),
+                ('phone', models.CharField(max_length=15)),
+                ('telegram_contact', models.BigIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
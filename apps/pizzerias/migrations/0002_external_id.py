@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzerias', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pizzeria',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
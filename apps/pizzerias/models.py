@@ -1,6 +1,8 @@
 from django.db import models
 
 class Pizzeria(models.Model):
+    # Codice del sistema di origine (import in blocco)
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=100)
     address = models.TextField()
     latitude = models.DecimalField(max_digits=9, decimal_places=6, default=0.0)
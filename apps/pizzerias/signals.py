@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.pizzerias.geo import publish_pizzeria_change, remove_pizzeria, update_pizzeria
+from apps.pizzerias.models import Pizzeria
+
+
+@receiver(post_save, sender=Pizzeria)
+def pizzeria_saved(sender, instance, **kwargs):
+    update_pizzeria(instance)
+    publish_pizzeria_change()
+
+
+@receiver(post_delete, sender=Pizzeria)
+def pizzeria_deleted(sender, instance, **kwargs):
+    remove_pizzeria(instance.id)
+    publish_pizzeria_change()
@@ -0,0 +1,102 @@
+import os
+from decimal import Decimal
+from io import StringIO
+from tempfile import NamedTemporaryFile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.pizzerias import geo
+from apps.pizzerias.models import Pizzeria
+from ridermatch.factories import create_pizzeria
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class GridIndexTests(TestCase):
+    def test_within_radius(self):
+        index = geo.PizzeriaGridIndex()
+        index.add(1, 45.4642, 9.19)
+        # ~11 km più a nord
+        index.add(2, 45.5642, 9.19)
+        self.assertEqual(set(index.within(45.4642, 9.19, 5)), {1})
+        self.assertEqual(set(index.within(45.4642, 9.19, 15)), {1, 2})
+
+    def test_move_and_remove(self):
+        index = geo.PizzeriaGridIndex()
+        index.add(1, 45.4642, 9.19)
+        index.add(1, 41.9028, 12.4964)
+        self.assertEqual(index.within(45.4642, 9.19, 5), {})
+        index.remove(1)
+        self.assertEqual(len(index), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PizzeriaIndexRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        geo._index = None
+        self.addCleanup(setattr, geo, '_index', None)
+
+    def test_moved_by_another_process(self):
+        pizzeria = create_pizzeria()
+        self.assertIn(pizzeria.id, geo.get_pizzeria_index().within(45.4642, 9.19, 1))
+
+        # Modifica senza signal in questo processo (altro processo, import in blocco)
+        Pizzeria.objects.filter(id=pizzeria.id).update(latitude=Decimal('41.902800'), longitude=Decimal('12.496400'))
+        self.assertIn(pizzeria.id, geo.get_pizzeria_index().within(45.4642, 9.19, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            geo.invalidate_pizzeria_index()
+        self.assertNotIn(pizzeria.id, geo.get_pizzeria_index().within(45.4642, 9.19, 1))
+        self.assertIn(pizzeria.id, geo.get_pizzeria_index().within(41.9028, 12.4964, 1))
+
+    def test_saving_process_keeps_its_index(self):
+        pizzeria = create_pizzeria()
+        index = geo.get_pizzeria_index()
+        version = geo._index_version
+
+        pizzeria.latitude, pizzeria.longitude = Decimal('41.902800'), Decimal('12.496400')
+        with self.captureOnCommitCallbacks(execute=True):
+            pizzeria.save()
+        # Versione condivisa incrementata per gli altri processi, indice locale già aggiornato
+        self.assertEqual(geo._index_version, version + 1)
+        with self.assertNumQueries(0):
+            self.assertIs(geo.get_pizzeria_index(), index)
+        self.assertIn(pizzeria.id, index.within(41.9028, 12.4964, 1))
+
+    def test_other_process_rebuilds_after_save(self):
+        pizzeria = create_pizzeria()
+        geo.get_pizzeria_index()
+        # Un altro processo ha cambiato la versione prima del nostro salvataggio
+        cache.set(geo._VERSION_KEY, geo._index_version + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            pizzeria.save()
+        with self.assertNumQueries(1):
+            geo.get_pizzeria_index()
+
+    def test_import_invalidates_index(self):
+        self.assertEqual(len(geo.get_pizzeria_index()), 0)
+        with NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write("external_id,name,address,phone,latitude,longitude\n")
+            source.write("p1,Da Mario,Via Roma 1,021234567,45.4642,9.19\n")
+        self.addCleanup(os.unlink, source.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_pizzerias', source.name, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(len(geo.get_pizzeria_index()), 1)
+
+
+@override_settings(PIZZERIA_INDEX_MAX_AGE=0)
+class PizzeriaIndexMaxAgeTests(TestCase):
+    def setUp(self):
+        geo._index = None
+        self.addCleanup(setattr, geo, '_index', None)
+
+    def test_rebuilt_without_shared_versions(self):
+        # DummyCache: le versioni non cambiano, vale solo la scadenza
+        pizzeria = create_pizzeria()
+        geo.get_pizzeria_index()
+        Pizzeria.objects.filter(id=pizzeria.id).update(is_active=False)
+        self.assertEqual(len(geo.get_pizzeria_index()), 0)
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class RidersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.riders'
\ No newline at end of file
+    name = 'apps.riders'
+    
+    def ready(self):
+        from apps.riders import signals  # noqa: F401
\ No newline at end of file
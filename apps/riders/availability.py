@@ -0,0 +1,133 @@
+"""
+Disponibilità settimanale dei rider
+- Finestre per giorno lette con una sola query e raggruppate in Python
+- Bitmap a un bit per minuto per giorno: copertura esatta anche con orari
+  non allineati (es. 19:10-23:00), finestre adiacenti unite
+- Cache per rider, invalidata dai signal su RiderAvailability
+- Finestre a cavallo della mezzanotte (es. 19:00-01:00) divise sui due giorni
+"""
+
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from apps.riders.models import RiderAvailability
+
+MINUTES_PER_DAY = 24 * 60
+# Parole da 64 bit per la bitmap di un giorno (per NumPy)
+MASK_WORDS = -(-MINUTES_PER_DAY // 64)
+WEEKLY_CACHE_TTL = 3600
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def mask_words(mask):
+    """Bitmap di un giorno (1440 bit) divisa in MASK_WORDS parole da 64 bit"""
+    return [(mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for word in range(MASK_WORDS)]
+
+
+def day_pieces(day, start, end):
+    """Intervallo orario diviso per giorno: [(day, minuto_inizio, minuto_fine)].
+    Se end <= start l'intervallo passa la mezzanotte e continua il giorno dopo."""
+    start, end = _minutes(start), _minutes(end)
+    if start < end:
+        return [(day, start, end)]
+    if start == end:
+        return []
+    pieces = [(day, start, MINUTES_PER_DAY)]
+    if end:
+        pieces.append(((day + 1) % 7, 0, end))
+    return pieces
+
+
+def minutes_mask(start, end):
+    """Bitmap dei minuti [start, end) del giorno"""
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def need_masks(day, start, end):
+    """Minuti richiesti da un turno per giorno: [(day, mask)] (due giorni se passa la mezzanotte)"""
+    return [(piece_day, minutes_mask(first, last)) for piece_day, first, last in day_pieces(day, start, end)]
+
+
+class WeeklyAvailability:
+    """Finestre e bitmap di disponibilità di un rider per i 7 giorni"""
+
+    __slots__ = ('days', 'masks', 'preferred_masks')
+
+    def __init__(self, windows=()):
+        # windows: [(day_of_week, start_time, end_time, is_preferred)]
+        self.days = [[] for _ in range(7)]
+        self.masks = [0] * 7
+        self.preferred_masks = [0] * 7
+        for day, start, end, preferred in windows:
+            self.days[day].append((start, end, preferred))
+            for piece_day, first, last in day_pieces(day, start, end):
+                mask = minutes_mask(first, last)
+                self.masks[piece_day] |= mask
+                if preferred:
+                    self.preferred_masks[piece_day] |= mask
+        for day_windows in self.days:
+            day_windows.sort()
+
+    def __bool__(self):
+        return any(self.days)
+
+    def windows(self, day):
+        """Finestre del giorno [(start, end, is_preferred)] ordinate per inizio"""
+        return self.days[day]
+
+    def active_days(self):
+        """Giorni con almeno un minuto disponibile (anche per finestre iniziate il giorno prima)"""
+        return [day for day in range(7) if self.masks[day]]
+
+    def covers(self, day, start, end):
+        """True se il rider è disponibile per tutto l'intervallo"""
+        return self._contains(self.masks, day, start, end)
+
+    def is_preferred(self, day, start, end):
+        return self._contains(self.preferred_masks, day, start, end)
+
+    @staticmethod
+    def _contains(masks, day, start, end):
+        needs = [(piece_day, need) for piece_day, need in need_masks(day, start, end) if need]
+        return bool(needs) and all(masks[piece_day] & need == need for piece_day, need in needs)
+
+
+def _cache_key(rider_id):
+    # v2: bitmap a minuti (le voci con gli slot da 15 minuti non vanno rilette)
+    return f"riders:weekly:v2:{rider_id}"
+
+
+def load_weekly_availabilities(rider_ids=None, active_only=True):
+    """Disponibilità di più rider con una sola query: {rider_id: WeeklyAvailability}"""
+    queryset = RiderAvailability.objects.all()
+    if rider_ids is not None:
+        queryset = queryset.filter(rider_id__in=rider_ids)
+    if active_only:
+        queryset = queryset.filter(rider__is_active=True)
+
+    grouped = defaultdict(list)
+    for rider_id, day, start, end, preferred in queryset.values_list(
+        'rider_id', 'day_of_week', 'start_time', 'end_time', 'is_preferred'
+    ):
+        grouped[rider_id].append((day, start, end, preferred))
+    return {rider_id: WeeklyAvailability(windows) for rider_id, windows in grouped.items()}
+
+
+def get_weekly_availability(rider_id):
+    """Disponibilità di un rider (cache, altrimenti una query)"""
+    key = _cache_key(rider_id)
+    weekly = cache.get(key)
+    if weekly is None:
+        weekly = load_weekly_availabilities([rider_id], active_only=False).get(rider_id) or WeeklyAvailability()
+        cache.set(key, weekly, WEEKLY_CACHE_TTL)
+    return weekly
+
+
+def invalidate_weekly_availability(rider_id):
+    cache.delete(_cache_key(rider_id))
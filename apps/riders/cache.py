@@ -0,0 +1,27 @@
+"""
+Rider per Telegram ID (con l'utente Django), letti dalla cache read-through
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from apps.riders.models import Rider
+from ridermatch.cache import ReadThroughCache, model_version
+
+
+def _load_rider(telegram_id):
+    return Rider.objects.select_related('user').filter(telegram_id=telegram_id).first()
+
+
+riders_by_telegram_id = ReadThroughCache('riders', _load_rider, version=model_version(Rider, User))
+
+
+def get_rider(telegram_id):
+    """Rider con user già caricato, o None se non registrato"""
+    return riders_by_telegram_id.get(telegram_id)
+
+
+def invalidate_rider(telegram_id):
+    # Subito per questo processo, di nuovo al commit per chi rilegge nel frattempo
+    riders_by_telegram_id.invalidate(telegram_id)
+    transaction.on_commit(lambda: riders_by_telegram_id.invalidate(telegram_id))
@@ -0,0 +1,274 @@
+"""
+Indice a intervalli delle disponibilità dei rider
+- Un albero di segmenti per giorno sui minuti di inizio delle finestre,
+  ogni nodo conserva la fine massima del suo sottoalbero
+- "Rider con una finestra che copre il turno" senza scorrere tutte le righe:
+  si visitano solo i rami con inizio <= turno e fine >= turno
+- Finestre e turni a cavallo della mezzanotte divisi sui due giorni
+- Le finestre di un rider sovrapposte o adiacenti sono unite prima di entrare
+  nell'albero: stessa regola di copertura delle bitmap (18-20 + 20-23 copre 19-22)
+- Inserimento/rimozione incrementale quando un rider modifica le disponibilità
+- Ricostruito da zero dopo AVAILABILITY_INDEX_MAX_AGE secondi (con la
+  DummyCache di sviluppo le versioni per giorno non cambiano mai)
+"""
+
+import threading
+import time
+from bisect import insort
+from collections import defaultdict
+
+from django.conf import settings
+
+from apps.riders.availability import day_pieces
+
+# Foglie dell'albero: una per minuto di inizio (potenza di 2 >= 1440)
+TREE_SIZE = 2048
+
+
+class DayIntervalTree:
+    """Intervalli [inizio, fine) di un giorno, in minuti"""
+
+    def __init__(self):
+        self.max_end = [-1] * (2 * TREE_SIZE)
+        # minuto di inizio -> [(fine, rider_id)] ordinate per fine
+        self.leaves = {}
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.leaves.values())
+
+    def add(self, start, end, rider_id):
+        insort(self.leaves.setdefault(start, []), (end, rider_id))
+        self._update(start)
+
+    def remove(self, start, end, rider_id):
+        entries = self.leaves.get(start)
+        if not entries:
+            return
+        entries[:] = [entry for entry in entries if entry != (end, rider_id)]
+        if not entries:
+            del self.leaves[start]
+        self._update(start)
+
+    def _update(self, start):
+        """Ricalcola la fine massima dalla foglia alla radice"""
+        entries = self.leaves.get(start)
+        node = TREE_SIZE + start
+        self.max_end[node] = entries[-1][0] if entries else -1
+        node //= 2
+        while node:
+            self.max_end[node] = max(self.max_end[2 * node], self.max_end[2 * node + 1])
+            node //= 2
+
+    def covering(self, start, end):
+        """Rider con un intervallo di inizio <= start e fine >= end"""
+        found = set()
+        max_end = self.max_end
+        stack = [(1, 0, TREE_SIZE - 1)]
+        while stack:
+            node, low, high = stack.pop()
+            # Rami con inizi tutti dopo il turno o che finiscono prima
+            if low > start or max_end[node] < end:
+                continue
+            if low == high:
+                for window_end, rider_id in reversed(self.leaves[low]):
+                    if window_end < end:
+                        break
+                    found.add(rider_id)
+                continue
+            middle = (low + high) // 2
+            stack.append((2 * node, low, middle))
+            stack.append((2 * node + 1, middle + 1, high))
+        return found
+
+
+def merge_intervals(intervals):
+    """Unisce intervalli [inizio, fine) sovrapposti o adiacenti"""
+    merged = []
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return [tuple(interval) for interval in merged]
+
+
+class AvailabilityIntervalIndex:
+    """Alberi per i 7 giorni della settimana, aggiornabili una finestra alla volta"""
+
+    def __init__(self):
+        # Intervalli uniti per rider: tutte le finestre e solo le preferite
+        self.days = [DayIntervalTree() for _ in range(7)]
+        self.preferred_days = [DayIntervalTree() for _ in range(7)]
+        # availability_id -> (rider_id, day, inizio, fine, is_preferred)
+        self.windows = {}
+        # rider_id -> {availability_id}
+        self.riders = defaultdict(set)
+        # rider_id -> intervalli inseriti negli alberi [(preferita, giorno, inizio, fine)]
+        self.inserted = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.windows)
+
+    def add(self, availability_id, rider_id, day, start, end, preferred):
+        """Inserisce o sostituisce una finestra (time di inizio e fine)"""
+        with self.lock:
+            changed = self._remove(availability_id)
+            self._add(availability_id, rider_id, day, start, end, preferred)
+            self._merge(changed | {rider_id})
+
+    def remove(self, availability_id):
+        with self.lock:
+            self._merge(self._remove(availability_id))
+
+    def remove_rider(self, rider_id):
+        """Toglie tutte le finestre di un rider (es. disattivato)"""
+        with self.lock:
+            for availability_id in list(self.riders.get(rider_id, ())):
+                self._remove(availability_id)
+            self._merge({rider_id})
+
+    def replace(self, availability_ids, rows):
+        """Toglie alcune finestre e ne aggiunge altre, unendo una volta sola per rider"""
+        with self.lock:
+            changed = set()
+            for availability_id in availability_ids:
+                changed |= self._remove(availability_id)
+            for row in rows:
+                changed |= self._remove(row[0])
+                self._add(*row)
+                changed.add(row[1])
+            self._merge(changed)
+
+    def _add(self, availability_id, rider_id, day, start, end, preferred):
+        self.windows[availability_id] = (rider_id, day, start, end, preferred)
+        self.riders[rider_id].add(availability_id)
+
+    def _remove(self, availability_id):
+        """Toglie la finestra, restituisce i rider da riunire"""
+        window = self.windows.pop(availability_id, None)
+        if window is None:
+            return set()
+        owned = self.riders[window[0]]
+        owned.discard(availability_id)
+        if not owned:
+            del self.riders[window[0]]
+        return {window[0]}
+
+    def _merge(self, rider_ids):
+        """Ricalcola gli intervalli uniti dei rider negli alberi"""
+        for rider_id in rider_ids:
+            for preferred, day, first, last in self.inserted.pop(rider_id, ()):
+                trees = self.preferred_days if preferred else self.days
+                trees[day].remove(first, last, rider_id)
+
+            pieces = defaultdict(list)
+            for availability_id in self.riders.get(rider_id, ()):
+                _, day, start, end, preferred = self.windows[availability_id]
+                for piece_day, first, last in day_pieces(day, start, end):
+                    pieces[(False, piece_day)].append((first, last))
+                    if preferred:
+                        pieces[(True, piece_day)].append((first, last))
+
+            inserted = []
+            for (preferred, day), intervals in pieces.items():
+                trees = self.preferred_days if preferred else self.days
+                for first, last in merge_intervals(intervals):
+                    trees[day].add(first, last, rider_id)
+                    inserted.append((preferred, day, first, last))
+            if inserted:
+                self.inserted[rider_id] = inserted
+
+    def covering(self, day, start, end):
+        """Rider con finestre che coprono l'intervallo: {rider_id: is_preferred}.
+        Un turno oltre la mezzanotte deve essere coperto in entrambi i giorni."""
+        pieces = day_pieces(day, start, end)
+        if not pieces:
+            return {}
+
+        with self.lock:
+            riders = preferred = None
+            for piece_day, first, last in pieces:
+                covered = self.days[piece_day].covering(first, last)
+                covered_preferred = self.preferred_days[piece_day].covering(first, last)
+                riders = covered if riders is None else riders & covered
+                preferred = covered_preferred if preferred is None else preferred & covered_preferred
+        return {rider_id: rider_id in preferred for rider_id in riders}
+
+
+def _load_windows(queryset):
+    return queryset.filter(rider__is_active=True).values_list(
+        'id', 'rider_id', 'day_of_week', 'start_time', 'end_time', 'is_preferred'
+    )
+
+
+_index = None
+# Istante (monotonic) dell'ultima costruzione completa
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _is_stale():
+    max_age = getattr(settings, 'AVAILABILITY_INDEX_MAX_AGE', 300)
+    return _index is None or time.monotonic() - _index_built_at > max_age
+
+
+def get_availability_index():
+    """Indice condiviso, (ri)costruito con una sola query alla prima richiesta o quando è vecchio"""
+    global _index, _index_built_at
+    if _is_stale():
+        with _index_lock:
+            if _is_stale():
+                from apps.riders.models import RiderAvailability
+
+                index = AvailabilityIntervalIndex()
+                index.replace((), _load_windows(RiderAvailability.objects.all()))
+                _index = index
+                _index_built_at = time.monotonic()
+    return _index
+
+
+def reload_days(days):
+    """Ricarica dal DB le finestre che toccano i giorni indicati (modifiche di altri processi)"""
+    if _index is None:
+        return
+    from apps.riders.models import RiderAvailability
+
+    days = set(days)
+    # Una finestra oltre la mezzanotte tocca anche il giorno dopo
+    source_days = days | {(day - 1) % 7 for day in days}
+    with _index_lock:
+        _index.replace(
+            [
+                availability_id for availability_id, (_, day, start, end, _) in list(_index.windows.items())
+                if any(piece_day in days for piece_day, _, _ in day_pieces(day, start, end))
+            ],
+            _load_windows(RiderAvailability.objects.filter(day_of_week__in=source_days))
+        )
+
+
+def update_availability(availability):
+    """Aggiornamento incrementale dopo il salvataggio di una finestra"""
+    if _index is None:
+        return
+    if availability.rider.is_active:
+        _index.add(
+            availability.id, availability.rider_id, availability.day_of_week,
+            availability.start_time, availability.end_time, availability.is_preferred
+        )
+    else:
+        _index.remove(availability.id)
+
+
+def remove_availability(availability_id):
+    if _index is not None:
+        _index.remove(availability_id)
+
+
+def update_rider(rider):
+    """Rider attivato/disattivato: aggiunge o toglie tutte le sue finestre"""
+    if _index is None:
+        return
+    _index.remove_rider(rider.id)
+    if rider.is_active:
+        _index.replace((), _load_windows(rider.rideravailability_set.all()))
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+
+from apps.riders.cache import invalidate_rider
+from apps.riders.models import Rider
+from ridermatch.importing import BulkUpserter, ImportCommand
+
+
+class RiderUpserter(BulkUpserter):
+    """Rider per telegram_id, con l'utente Django telegram_<id> come nella registrazione dal bot"""
+
+    model = Rider
+    key = 'telegram_id'
+    # is_active resta fuori: cambia le finestre nell'indice delle disponibilità (usa l'admin)
+    fields = ('telegram_id', 'phone', 'transport_type', 'max_distance_km', 'home_latitude', 'home_longitude', 'rating')
+    user_fields = ('first_name', 'last_name')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Utenti del blocco corrente per telegram_id
+        self.users = {}
+
+    def build(self, row):
+        rider = super().build(row)
+        self.users[rider.telegram_id] = User(
+            username=f"telegram_{rider.telegram_id}",
+            first_name=str(row.get('first_name') or '').strip()[:150],
+            last_name=str(row.get('last_name') or '').strip()[:150]
+        )
+        return rider
+
+    def save(self, riders):
+        users = [self.users.pop(rider.telegram_id) for rider in riders]
+        self.upsert(User, users, ['username'], [name for name in self.user_fields if name in self.columns])
+
+        # Id degli utenti (nuovi o esistenti) con una query per blocco
+        user_ids = dict(
+            User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id')
+        )
+        for rider in riders:
+            rider.user_id = user_ids[f"telegram_{rider.telegram_id}"]
+        super().save(riders)
+
+    def after_save(self, riders):
+        for rider in riders:
+            invalidate_rider(rider.telegram_id)
+
+
+class Command(ImportCommand):
+    help = "Importa o aggiorna rider da CSV/JSONL (chiave: telegram_id)"
+    upserter_class = RiderUpserter
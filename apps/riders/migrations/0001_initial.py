@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rider',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('telegram_id', models.BigIntegerField(unique=True)),
+                ('phone', models.CharField(max_length=15)),
+                ('transport_type', models.CharField(choices=[('bike', 'Bicicletta'), ('scooter', 'Scooter'), ('car', 'Auto')], max_length=20)),
+                ('max_distance_km', models.IntegerField(default=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('rating', models.DecimalField(decimal_places=2, default=5.0, max_digits=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RiderAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.IntegerField(choices=[(0, 'Lunedì'), (1, 'Martedì'), (2, 'Mercoledì'), (3, 'Giovedì'), (4, 'Venerdì'), (5, 'Sabato'), (6, 'Domenica')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('is_preferred', models.BooleanField(default=False)),
+                ('rider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='riders.rider')),
+            ],
+            options={
+                'unique_together': {('rider', 'day_of_week', 'start_time')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('riders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rider',
+            name='home_latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='rider',
+            name='home_longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('riders', '0002_rider_home_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rideravailability',
+            index=models.Index(fields=['day_of_week', 'start_time', 'end_time'], name='availability_day_time_idx'),
+        ),
+    ]
@@ -11,6 +11,9 @@ class Rider(models.Model):
         ('car', 'Auto')
     ])
     max_distance_km = models.IntegerField(default=10)
+    # Posizione di partenza del rider (per il filtro sulla distanza)
+    home_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    home_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=5.00)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -29,4 +32,9 @@ class RiderAvailability(models.Model):
     is_preferred = models.BooleanField(default=False)
 
     class Meta:
-        unique_together = ['rider', 'day_of_week', 'start_time']
\ No newline at end of file
+        # (rider, day_of_week, ...) è già coperto dall'indice di unique_together
+        unique_together = ['rider', 'day_of_week', 'start_time']
+        indexes = [
+            # Rider disponibili in un giorno/orario (candidati di un turno)
+            models.Index(fields=['day_of_week', 'start_time', 'end_time'], name='availability_day_time_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.riders import intervals
+from apps.riders.availability import invalidate_weekly_availability
+from apps.riders.cache import invalidate_rider
+from apps.riders.models import Rider, RiderAvailability
+
+
+@receiver([post_save, post_delete], sender=RiderAvailability)
+def availability_changed(sender, instance, **kwargs):
+    invalidate_weekly_availability(instance.rider_id)
+    if kwargs.get('signal') is post_delete:
+        intervals.remove_availability(instance.id)
+    else:
+        intervals.update_availability(instance)
+
+
+@receiver([post_save, post_delete], sender=Rider)
+def rider_changed(sender, instance, update_fields=None, **kwargs):
+    invalidate_rider(instance.telegram_id)
+    if kwargs.get('signal') is post_delete:
+        return
+    # Le finestre nell'indice dipendono solo da is_active
+    if update_fields and 'is_active' not in update_fields:
+        return
+    intervals.update_rider(instance)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Il login aggiorna solo last_login, non mostrato dal bot
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    for telegram_id in Rider.objects.filter(user_id=instance.id).values_list('telegram_id', flat=True):
+        invalidate_rider(telegram_id)
\ No newline at end of file
@@ -0,0 +1,228 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.riders import intervals
+from apps.riders.availability import WeeklyAvailability
+from apps.riders.cache import get_rider, riders_by_telegram_id
+from apps.riders.intervals import AvailabilityIntervalIndex
+from apps.riders.models import Rider, RiderAvailability
+from apps.shifts.candidates import rider_candidates, shift_candidates
+from apps.shifts.matching import ShiftMatcher
+from ridermatch.cache import ReadThroughCache, model_version
+from ridermatch.factories import create_pizzeria, create_rider, create_shift
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class WeeklyAvailabilityTests(TestCase):
+    def test_window_not_aligned_to_quarter_hours(self):
+        weekly = WeeklyAvailability([(0, time(19, 10), time(23, 0), False)])
+        self.assertTrue(weekly.covers(0, time(19, 10), time(22, 0)))
+        self.assertTrue(weekly.covers(0, time(19, 10), time(23, 0)))
+        self.assertFalse(weekly.covers(0, time(19, 9), time(22, 0)))
+        self.assertFalse(weekly.covers(0, time(19, 10), time(23, 1)))
+
+    def test_adjacent_windows_cover_the_whole_span(self):
+        weekly = WeeklyAvailability([
+            (2, time(18, 0), time(20, 0), True),
+            (2, time(20, 0), time(23, 0), False),
+        ])
+        self.assertTrue(weekly.covers(2, time(19, 0), time(22, 0)))
+        self.assertFalse(weekly.is_preferred(2, time(19, 0), time(22, 0)))
+        self.assertTrue(weekly.is_preferred(2, time(18, 0), time(20, 0)))
+
+    def test_window_across_midnight(self):
+        weekly = WeeklyAvailability([(6, time(22, 0), time(1, 30), False)])
+        self.assertEqual(weekly.active_days(), [0, 6])
+        self.assertTrue(weekly.covers(6, time(23, 0), time(1, 30)))
+        self.assertFalse(weekly.covers(6, time(23, 0), time(1, 31)))
+
+    def test_empty_interval_is_not_covered(self):
+        weekly = WeeklyAvailability([(0, time(9, 0), time(18, 0), False)])
+        self.assertFalse(weekly.covers(0, time(10, 0), time(10, 0)))
+
+
+class MatcherCoverageTests(TestCase):
+    def test_matcher_uses_minute_precise_windows(self):
+        shift_date = date.today() + timedelta(days=7)
+        day = shift_date.weekday()
+        pizzeria = create_pizzeria()
+        fits = create_rider(1, windows=[(day, '19:10', '23:00')])
+        create_rider(2, windows=[(day, '19:20', '23:00')])
+        shift = create_shift(pizzeria, shift_date, start='19:10', end='22:00')
+
+        matcher = ShiftMatcher()
+        matcher.load()
+        scores, rider_ids = matcher.score_matrix([shift])
+        feasible = {rider_id for rider_id, score in zip(rider_ids, scores[0]) if score > 0}
+        self.assertEqual(feasible, {fits.id})
+
+
+class IntervalIndexTests(SimpleTestCase):
+    def test_adjacent_windows_are_merged(self):
+        index = AvailabilityIntervalIndex()
+        index.add(1, 7, 2, time(18, 0), time(20, 0), True)
+        index.add(2, 7, 2, time(20, 0), time(23, 0), False)
+        self.assertEqual(index.covering(2, time(19, 0), time(22, 0)), {7: False})
+        self.assertEqual(index.covering(2, time(18, 0), time(20, 0)), {7: True})
+
+        index.remove(2)
+        self.assertEqual(index.covering(2, time(19, 0), time(22, 0)), {})
+        self.assertEqual(index.covering(2, time(18, 30), time(19, 30)), {7: True})
+
+    def test_windows_of_different_riders_are_not_merged(self):
+        index = AvailabilityIntervalIndex()
+        index.add(1, 7, 2, time(18, 0), time(20, 0), False)
+        index.add(2, 8, 2, time(20, 0), time(23, 0), False)
+        self.assertEqual(index.covering(2, time(19, 0), time(22, 0)), {})
+
+    def test_shift_across_midnight(self):
+        index = AvailabilityIntervalIndex()
+        index.add(1, 7, 6, time(22, 0), time(0, 0), False)
+        index.add(2, 7, 0, time(0, 0), time(2, 0), False)
+        self.assertEqual(index.covering(6, time(23, 0), time(1, 0)), {7: False})
+        index.remove_rider(7)
+        self.assertEqual(index.covering(6, time(23, 0), time(1, 0)), {})
+        self.assertEqual(len(index), 0)
+
+
+class CandidateAgreementTests(TestCase):
+    def setUp(self):
+        intervals._index = None
+        self.addCleanup(setattr, intervals, '_index', None)
+
+    def test_both_directions_agree_on_adjacent_windows(self):
+        shift_date = date.today() + timedelta(days=7)
+        day = shift_date.weekday()
+        rider = create_rider(1, windows=[(day, '18:00', '20:00', True), (day, '20:00', '23:00')])
+        shift = create_shift(create_pizzeria(), shift_date, start='19:00', end='22:00')
+
+        self.assertEqual(shift_candidates(shift), [(rider.id, False)])
+        self.assertEqual(rider_candidates(rider.id), [(shift.id, False)])
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    def test_window_moved_to_another_day_by_another_process(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        shift_date = date.today() + timedelta(days=7)
+        day = shift_date.weekday()
+        rider = create_rider(1, windows=[(day, '18:00', '23:00')])
+        shift = create_shift(create_pizzeria(), shift_date, start='19:00', end='22:00')
+        self.assertEqual(shift_candidates(shift), [(rider.id, False)])
+
+        # Salvataggio in un altro processo: qui cambiano solo le versioni condivise
+        window = RiderAvailability.objects.get(rider=rider)
+        # Giorno non adiacente: la ricarica dei giorni vicini al nuovo non la toglierebbe
+        window.day_of_week = (day + 3) % 7
+        with mock.patch('apps.riders.signals.intervals.update_availability'):
+            window.save()
+        self.assertEqual(shift_candidates(shift), [])
+
+    def test_rebuilt_after_max_age(self):
+        shift_date = date.today() + timedelta(days=7)
+        day = shift_date.weekday()
+        rider = create_rider(1, windows=[(day, '18:00', '20:00')])
+        shift = create_shift(create_pizzeria(), shift_date, start='19:00', end='22:00')
+        self.assertEqual(shift_candidates(shift), [])
+
+        # Modifica fatta da un altro processo: nessun signal, versioni invariate (DummyCache)
+        RiderAvailability.objects.filter(rider=rider).update(end_time=time(23, 0))
+        self.assertEqual(shift_candidates(shift), [])
+        with override_settings(AVAILABILITY_INDEX_MAX_AGE=60), \
+                mock.patch('apps.riders.intervals.time.monotonic', return_value=intervals._index_built_at + 61):
+            self.assertEqual(shift_candidates(shift), [(rider.id, False)])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReadThroughCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.loads = []
+
+    def make_cache(self, version='1', **options):
+        def loader(key):
+            self.loads.append(key)
+            return {'key': key} if key != 'assente' else None
+        return ReadThroughCache('test_read_through', loader, version=version, **options)
+
+    def test_local_shared_and_miss(self):
+        read_cache = self.make_cache()
+        self.assertEqual(read_cache.get('a'), {'key': 'a'})
+        self.assertEqual(read_cache.get('a'), {'key': 'a'})
+        # Un altro processo: LRU vuota, cache condivisa già piena
+        other = self.make_cache()
+        self.assertEqual(other.get('a'), {'key': 'a'})
+        self.assertEqual(self.loads, ['a'])
+        self.assertEqual((read_cache.misses, read_cache.local_hits, other.shared_hits), (1, 1, 1))
+
+    def test_missing_values_are_cached(self):
+        read_cache = self.make_cache()
+        self.assertIsNone(read_cache.get('assente'))
+        self.assertIsNone(read_cache.get('assente'))
+        self.assertEqual(self.loads, ['assente'])
+
+    def test_returns_copies(self):
+        read_cache = self.make_cache()
+        read_cache.get('a')['key'] = 'modificato'
+        self.assertEqual(read_cache.get('a'), {'key': 'a'})
+
+    def test_invalidate(self):
+        read_cache = self.make_cache()
+        read_cache.get('a')
+        read_cache.invalidate('a')
+        read_cache.get('a')
+        self.assertEqual(self.loads, ['a', 'a'])
+
+    def test_local_entries_are_bounded(self):
+        read_cache = self.make_cache(max_entries=2)
+        for key in 'abc':
+            read_cache.get(key)
+        self.assertEqual(list(read_cache.local), ['b', 'c'])
+
+    def test_new_version_ignores_old_keys(self):
+        self.make_cache(version='1').get('a')
+        self.make_cache(version='2').get('a')
+        self.assertEqual(self.loads, ['a', 'a'])
+        self.assertNotEqual(model_version(Rider), model_version(Rider, User))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RiderCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        riders_by_telegram_id.local.clear()
+        self.addCleanup(riders_by_telegram_id.local.clear)
+
+    def test_registration_replaces_cached_miss(self):
+        self.assertIsNone(get_rider(1))
+        rider = create_rider(1)
+        self.assertEqual(get_rider(1).id, rider.id)
+
+    def test_hit_needs_no_query(self):
+        create_rider(1)
+        get_rider(1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_rider(1).user.first_name, 'Rider 1')
+
+    def test_saving_rider_or_user_invalidates(self):
+        rider = create_rider(1)
+        get_rider(1)
+        rider.phone = '+39444'
+        rider.save()
+        self.assertEqual(get_rider(1).phone, '+39444')
+        rider.user.first_name = 'Nuovo'
+        rider.user.save()
+        self.assertEqual(get_rider(1).user.first_name, 'Nuovo')
+
+    def test_login_only_save_keeps_entry(self):
+        rider = create_rider(1)
+        get_rider(1)
+        rider.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            get_rider(1)
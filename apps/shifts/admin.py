@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import ShiftTemplate
+
+@admin.register(ShiftTemplate)
+class ShiftTemplateAdmin(admin.ModelAdmin):
+    list_display = ['pizzeria', 'day_of_week', 'start_time', 'end_time', 'hourly_rate', 'headcount', 'is_active']
+    list_filter = ['day_of_week', 'is_active']
+    search_fields = ['pizzeria__name']
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class ShiftsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.shifts'
+    
+    def ready(self):
+        from apps.shifts import signals  # noqa: F401
@@ -0,0 +1,103 @@
+"""
+Cache dei candidati per il matching incrementale
+- Rider -> turni aperti compatibili con le sue disponibilità
+- Turno -> rider con una finestra che lo copre (indice a intervalli in memoria)
+Le chiavi sono versionate per giorno della settimana: i signal su
+RiderAvailability e Shift incrementano le versioni invece di cercare
+e cancellare le singole chiavi.
+"""
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.riders.availability import get_weekly_availability
+from apps.riders.intervals import get_availability_index, reload_days
+from apps.shifts.models import Shift
+from ridermatch.cache import bump_version
+
+CANDIDATES_TTL = 600
+DAYS = range(7)
+
+# Versioni delle disponibilità già caricate nell'indice di questo processo
+_index_versions = {}
+
+
+def _shifts_version_key(day):
+    return f"match:v:shifts:{day}"
+
+
+def _availability_version_key(day):
+    return f"match:v:avail:{day}"
+
+
+def _rider_version_key(rider_id):
+    return f"match:v:rider:{rider_id}"
+
+
+def invalidate_shifts(day):
+    """Turni del giorno creati o modificati"""
+    bump_version(_shifts_version_key(day))
+
+
+def invalidate_availability(rider_id, day):
+    """Disponibilità di un rider modificata"""
+    bump_version(_availability_version_key(day))
+    bump_version(_rider_version_key(rider_id))
+
+
+def rider_candidates(rider_id, today=None):
+    """Turni aperti futuri coperti dalle disponibilità del rider: [(shift_id, is_preferred)]"""
+    today = today or timezone.localdate()
+    version_keys = [_rider_version_key(rider_id)] + [_shifts_version_key(day) for day in DAYS]
+    versions = cache.get_many(version_keys)
+    key = "match:rider:{}:{}:{}".format(
+        rider_id, today.isoformat(), '.'.join(str(versions.get(k, 1)) for k in version_keys)
+    )
+
+    candidates = cache.get(key)
+    if candidates is not None:
+        return candidates
+
+    weekly = get_weekly_availability(rider_id)
+
+    candidates = []
+    if weekly:
+        shifts = Shift.objects.filter(
+            status='open',
+            date__gte=today,
+            # iso_week_day: 1 = lunedì
+            date__iso_week_day__in=[day + 1 for day in weekly.active_days()]
+        ).values_list('id', 'date', 'start_time', 'end_time')
+
+        for shift_id, date, start, end in shifts:
+            day = date.weekday()
+            if weekly.covers(day, start, end):
+                candidates.append((shift_id, weekly.is_preferred(day, start, end)))
+
+    cache.set(key, candidates, CANDIDATES_TTL)
+    return candidates
+
+
+def _sync_index(day):
+    """Ricarica i giorni modificati da altri processi (versioni in cache diverse)"""
+    index = get_availability_index()
+    # Il turno può continuare il giorno dopo; le finestre del giorno prima possono arrivare qui
+    days = [(day - 1) % 7, day, (day + 1) % 7]
+    versions = cache.get_many([_availability_version_key(d) for d in days])
+    stale = []
+    for d in days:
+        version = versions.get(_availability_version_key(d), 1)
+        if _index_versions.setdefault(d, version) != version:
+            _index_versions[d] = version
+            stale.append(d)
+    if stale:
+        # Una finestra del giorno d tocca anche d + 1
+        reload_days(set(stale) | {(d + 1) % 7 for d in stale})
+    return index
+
+
+def shift_candidates(shift):
+    """Rider attivi con una finestra che copre il turno: [(rider_id, is_preferred)]"""
+    day = shift.date.weekday()
+    index = _sync_index(day)
+    return list(index.covering(day, shift.start_time, shift.end_time).items())
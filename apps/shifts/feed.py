@@ -0,0 +1,129 @@
+"""
+Turni disponibili per un rider, ordinati per pertinenza
+- Solo turni aperti e futuri coperti dalle disponibilità (candidati in cache)
+  e di pizzerie entro max_distance_km
+- Punteggio: preferenza, paga oraria, vicinanza (stessi pesi del matching)
+- Classifica in cache per FEED_CACHE_SECONDS; le pagine usano un cursore
+  (punteggio, id) e non un offset: la pagina successiva resta corretta
+  anche se nel frattempo la classifica viene ricalcolata
+- Ogni pagina è una sola query per chiave primaria (pizzeria in join)
+"""
+
+from bisect import bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.pizzerias.geo import get_pizzeria_index, has_location
+from apps.shifts.candidates import rider_candidates
+from apps.shifts.matching import CHUNK_SIZE, WEIGHT_DISTANCE, WEIGHT_HOURLY_RATE, WEIGHT_PREFERRED
+from apps.shifts.models import Shift
+
+PAGE_SIZE = 5
+# Punteggi salvati come interi (millesimi): cursori esatti e brevi
+SCORE_SCALE = 1000
+
+
+def _feed_key(rider_id):
+    return f"feed:rider:{rider_id}"
+
+
+def parse_cursor(value):
+    """'<punteggio>.<shift_id>' -> (punteggio, shift_id)"""
+    score, shift_id = value.split('.')
+    return int(score), int(shift_id)
+
+
+def format_cursor(key):
+    """Chiave di classifica (-punteggio, shift_id) -> testo per il callback"""
+    return f"{-key[0]}.{key[1]}"
+
+
+def rank_shifts(rider, now=None):
+    """Classifica [(-punteggio, shift_id)] dei turni adatti al rider"""
+    now = now or timezone.localtime()
+    today = now.date()
+    preferred = dict(rider_candidates(rider.id, today))
+    if not preferred:
+        return []
+
+    pizzerias = get_pizzeria_index()
+    distances = None
+    if has_location(rider.home_latitude, rider.home_longitude):
+        distances = pizzerias.within(rider.home_latitude, rider.home_longitude, rider.max_distance_km)
+
+    shift_ids = list(preferred)
+    rows = []
+    for i in range(0, len(shift_ids), CHUNK_SIZE):
+        rows.extend(
+            Shift.objects.filter(id__in=shift_ids[i:i + CHUNK_SIZE], status='open', shiftassignment__isnull=True)
+            .values_list('id', 'pizzeria_id', 'date', 'start_time', 'hourly_rate')
+        )
+
+    shifts = []
+    for shift_id, pizzeria_id, date, start_time, hourly_rate in rows:
+        # Turni di oggi già iniziati
+        if date == today and start_time <= now.time():
+            continue
+        distance = None
+        if distances is not None:
+            distance = distances.get(pizzeria_id)
+            # Pizzerie senza posizione restano visibili, quelle troppo lontane no
+            if distance is None and pizzerias.location(pizzeria_id) is not None:
+                continue
+        shifts.append((shift_id, float(hourly_rate), distance))
+    if not shifts:
+        return []
+
+    max_rate = max(rate for _, rate, _ in shifts) or 1.0
+    max_km = max(rider.max_distance_km, 1)
+    ranked = []
+    for shift_id, rate, distance in shifts:
+        score = WEIGHT_PREFERRED * preferred[shift_id] + WEIGHT_HOURLY_RATE * rate / max_rate
+        if distance is not None:
+            score += WEIGHT_DISTANCE * min(max(1 - distance / max_km, 0), 1)
+        ranked.append((-round(score * SCORE_SCALE), shift_id))
+    ranked.sort()
+    return ranked
+
+
+def ranked_shifts(rider):
+    """Classifica dalla cache (ricalcolata dopo FEED_CACHE_SECONDS)"""
+    key = _feed_key(rider.id)
+    ranked = cache.get(key)
+    if ranked is None:
+        ranked = rank_shifts(rider)
+        cache.set(key, ranked, getattr(settings, 'FEED_CACHE_SECONDS', 60))
+    return ranked
+
+
+def invalidate_feed(rider_id):
+    cache.delete(_feed_key(rider_id))
+
+
+def feed_page(rider, cursor=None, page_size=PAGE_SIZE):
+    """Pagina dopo il cursore: (turni con pizzeria, posizione del primo, cursore successivo o None)"""
+    ranked = ranked_shifts(rider)
+    start = bisect_right(ranked, (-cursor[0], cursor[1])) if cursor else 0
+
+    page = []
+    end = start
+    while len(page) < page_size and end < len(ranked):
+        # Qualche turno in più: alcuni possono essere stati assegnati dopo il calcolo
+        window = ranked[end:end + (page_size - len(page)) * 2]
+        shifts = Shift.objects.filter(
+            id__in=[shift_id for _, shift_id in window],
+            status='open'
+        ).select_related('pizzeria').only(
+            'date', 'start_time', 'end_time', 'hourly_rate', 'pizzeria__name', 'pizzeria__address'
+        ).in_bulk()
+        for _, shift_id in window:
+            end += 1
+            if shift_id in shifts:
+                page.append(shifts[shift_id])
+                if len(page) == page_size:
+                    break
+
+    cursor = format_cursor(ranked[end - 1]) if 0 < end < len(ranked) else None
+    return page, start + 1, cursor
@@ -0,0 +1,61 @@
+from datetime import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.riders.models import Rider, RiderAvailability
+from apps.shifts.models import Shift, ShiftAssignment
+from apps.telegram_bot.models import OutboundMessage
+
+
+class Command(BaseCommand):
+    help = "Mostra il piano di esecuzione (EXPLAIN) delle query più frequenti"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help="Esegue davvero le query (solo PostgreSQL)")
+
+    def hot_queries(self):
+        """Query del matching, delle notifiche e del bot"""
+        now = timezone.now()
+        today = timezone.localdate()
+        start = time(19, 0)
+        end = time(23, 0)
+
+        return [
+            ("Turni aperti futuri (matching, turni disponibili)",
+             Shift.objects.filter(status='open', date__gte=today).order_by('date', 'start_time')),
+            ("Turni occupati per data (rider impegnati)",
+             Shift.objects.filter(status__in=['assigned', 'confirmed'], date__gte=today)),
+            ("Assegnazioni da notificare",
+             ShiftAssignment.objects.filter(
+                 notified_at__isnull=True,
+                 confirmed_by_rider=False
+             ).order_by('assigned_at')),
+            ("Disponibilità di un rider per giorno",
+             RiderAvailability.objects.filter(rider_id=1, day_of_week=today.weekday())),
+            ("Rider che coprono un turno",
+             RiderAvailability.objects.filter(
+                 day_of_week=today.weekday(),
+                 start_time__lte=start,
+                 end_time__gte=end
+             )),
+            ("Rider per Telegram ID",
+             Rider.objects.filter(telegram_id=1000)),
+            ("Messaggi outbox pronti",
+             OutboundMessage.objects.filter(
+                 status='pending',
+                 next_attempt_at__lte=now
+             ).order_by('next_attempt_at')),
+        ]
+
+    def handle(self, *args, **options):
+        explain_options = {'analyze': True} if options['analyze'] else {}
+
+        for title, queryset in self.hot_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n🔎 {title}"))
+            self.stdout.write(str(queryset.query))
+            try:
+                self.stdout.write(queryset.explain(**explain_options))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Errore EXPLAIN: {e}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.shifts.recurring import WEEKS, generate_shifts
+from apps.shifts.tasks import request_matching
+
+
+class Command(BaseCommand):
+    help = "Crea i turni delle prossime settimane dai modelli ricorrenti (da schedulare, es. ogni notte)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, default=WEEKS)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Conta i turni mancanti senza crearli")
+        parser.add_argument('--no-matching', action='store_true',
+                            help="Non pianifica il matching dei nuovi turni")
+
+    def handle(self, *args, **options):
+        created = generate_shifts(weeks=options['weeks'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"📅 Turni da creare: {created}")
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Turni creati: {created}"))
+        if created and not options['no_matching']:
+            request_matching()
@@ -0,0 +1,64 @@
+from django.core.management.base import CommandError
+from django.db.models import Q
+
+from apps.pizzerias.models import Pizzeria
+from apps.shifts.candidates import invalidate_shifts
+from apps.shifts.models import Shift
+from apps.shifts.tasks import request_matching
+from ridermatch.importing import BulkUpserter, ImportCommand, ImportRowError
+
+
+class ShiftUpserter(BulkUpserter):
+    """Turni per external_id; la pizzeria è indicata dal suo external_id"""
+
+    model = Shift
+    key = 'external_id'
+    # Lo stato non si importa: un turno già assegnato resta assegnato
+    fields = ('external_id', 'date', 'start_time', 'end_time', 'hourly_rate', 'description')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Mappa external_id -> id caricata una volta: nessuna query per riga
+        self.pizzerias = dict(
+            Pizzeria.objects.filter(~Q(external_id=None)).values_list('external_id', 'id')
+        )
+        # Giorni della settimana con turni nuovi o modificati, invalidati a fine import
+        self.days = set()
+
+    def set_columns(self, row):
+        super().set_columns(row)
+        if 'pizzeria' not in self.columns:
+            raise CommandError("Colonna obbligatoria mancante: pizzeria")
+        self.update_fields.append('pizzeria')
+
+    def build(self, row):
+        shift = super().build(row)
+        pizzeria = str(row.get('pizzeria') or '').strip()
+        if pizzeria not in self.pizzerias:
+            raise ImportRowError(f"pizzeria: '{pizzeria}' non trovata")
+        shift.pizzeria_id = self.pizzerias[pizzeria]
+        if shift.start_time == shift.end_time:
+            raise ImportRowError("start_time e end_time coincidono")
+        return shift
+
+    def save(self, shifts):
+        # Un turno aggiornato può aver cambiato data (come nel signal di Shift: tutti i giorni)
+        if len(self.days) < 7 and Shift.objects.filter(
+            external_id__in=[shift.external_id for shift in shifts]
+        ).exists():
+            self.days.update(range(7))
+        self.days.update(shift.date.weekday() for shift in shifts)
+        super().save(shifts)
+
+    def finish(self):
+        # Candidati del matching da ricalcolare, una volta per giorno toccato
+        for day in sorted(self.days):
+            invalidate_shifts(day)
+        # Turni nuovi o spostati da assegnare: un solo matching per tutto l'import
+        if self.days:
+            request_matching()
+
+
+class Command(ImportCommand):
+    help = "Importa o aggiorna turni da CSV/JSONL (chiave: external_id, pizzeria = external_id della pizzeria)"
+    upserter_class = ShiftUpserter
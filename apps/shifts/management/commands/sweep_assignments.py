@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.shifts.sweeper import BATCH_SIZE, sweep_expired_assignments
+from apps.telegram_bot.notifications import notify_expired_assignments, notify_new_assignments
+
+
+class Command(BaseCommand):
+    help = "Rilascia le assegnazioni non confermate in tempo e riassegna i turni"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help="Ripete il controllo ogni --interval secondi")
+        parser.add_argument('--interval', type=int, default=60)
+        parser.add_argument('--no-notify', action='store_true',
+                            help="Non accoda le notifiche ai rider")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                released, reassigned = sweep_expired_assignments(batch_size=options['batch_size'])
+                if released:
+                    self.stdout.write(
+                        f"⌛ Assegnazioni scadute: {len(released)}, turni riassegnati: {reassigned}"
+                    )
+                    if not options['no_notify']:
+                        notify_expired_assignments(released)
+                        if reassigned:
+                            notify_new_assignments()
+
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("\n🛑 Sweeper fermato")
@@ -0,0 +1,460 @@
+"""
+Matching automatico turni -> rider
+- Caricamento bulk di turni aperti, rider attivi e disponibilità
+- Filtro sulla distanza pizzeria/rider (max_distance_km)
+- Assegnazione ottima (bipartite matching pesato) giorno per giorno
+- Tutte le assegnazioni scritte con un bulk_create in un'unica transazione
+- Matching incrementale per un singolo rider o turno modificato
+"""
+
+import time
+from collections import defaultdict
+from functools import wraps
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from django.db import transaction
+from django.utils import timezone
+
+from apps.pizzerias.geo import get_pizzeria_index, has_location, haversine_km, haversine_matrix
+from apps.riders.availability import MASK_WORDS, MINUTES_PER_DAY, load_weekly_availabilities, mask_words, need_masks
+from apps.riders.models import Rider
+from apps.shifts.candidates import rider_candidates, shift_candidates
+from apps.shifts.models import Shift, ShiftAssignment
+from ridermatch.metrics import COUNT_BUCKETS, Histogram
+
+# Pesi del punteggio rider/turno
+WEIGHT_PREFERRED = 2.0
+WEIGHT_RATING = 1.0
+WEIGHT_HOURLY_RATE = 1.0
+# Bonus massimo per pizzerie vicine (decresce fino a 0 a max_distance_km)
+WEIGHT_DISTANCE = 1.5
+
+# Oltre questa dimensione (turni x rider) si usa l'assegnazione greedy
+MAX_DENSE_CELLS = 1_000_000
+
+# Dimensione dei blocchi per le query con id__in
+CHUNK_SIZE = 1000
+
+
+MATCHING_SECONDS = Histogram('ridermatch_matching_seconds', "Durata dei run di matching", ['kind'])
+MATCHING_ASSIGNMENTS = Histogram(
+    'ridermatch_matching_assignments', "Assegnazioni create per run di matching", ['kind'],
+    buckets=COUNT_BUCKETS
+)
+
+
+def _measured(kind):
+    """Registra durata e assegnazioni di un run di matching"""
+    def decorator(method):
+        seconds = MATCHING_SECONDS.labels(kind)
+        assignments = MATCHING_ASSIGNMENTS.labels(kind)
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            created = method(*args, **kwargs)
+            seconds.observe(time.perf_counter() - started)
+            assignments.observe(created)
+            return created
+        return wrapper
+    return decorator
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _span(start, end):
+    """Minuti di inizio/fine; un turno che passa la mezzanotte finisce oltre 1440"""
+    start, end = _minutes(start), _minutes(end)
+    return start, end + MINUTES_PER_DAY if end <= start else end
+
+
+def _overlaps(start_a, end_a, start_b, end_b):
+    start_a, end_a = _span(start_a, end_a)
+    start_b, end_b = _span(start_b, end_b)
+    return start_a < end_b and start_b < end_a
+
+
+def _words_array(masks):
+    """Bitmap in una matrice uint64 (elementi x MASK_WORDS)"""
+    return np.array([mask_words(mask) for mask in masks], dtype=np.uint64).reshape(len(masks), MASK_WORDS)
+
+
+class DayWindows:
+    """Bitmap di disponibilità dei rider per un giorno della settimana, in array NumPy"""
+
+    def __init__(self, day, weekly_by_rider):
+        self.rider_ids = np.array(
+            sorted(rider_id for rider_id, weekly in weekly_by_rider.items() if weekly.masks[day]),
+            dtype=np.int64
+        )
+        self.masks = _words_array([weekly_by_rider[rider_id].masks[day] for rider_id in self.rider_ids])
+        self.preferred_masks = _words_array(
+            [weekly_by_rider[rider_id].preferred_masks[day] for rider_id in self.rider_ids]
+        )
+
+    def covering(self, needs, preferred=False):
+        """Matrice turni x rider: True se la bitmap del rider contiene tutti i minuti del turno"""
+        masks = self.preferred_masks if preferred else self.masks
+        result = np.ones((len(needs), len(masks)), dtype=bool)
+        # Solo le parole toccate da almeno un turno (poche: un turno dura qualche ora)
+        for word in np.flatnonzero(needs.any(axis=0)):
+            need = needs[:, word][:, None]
+            result &= (masks[None, :, word] & need) == need
+        return result
+
+    def covering_for(self, rider_ids, needs, preferred=False):
+        """Come covering, ma sulle colonne di un altro elenco di rider"""
+        result = np.zeros((len(needs), len(rider_ids)), dtype=bool)
+        if not len(self.rider_ids):
+            return result
+        position = np.minimum(np.searchsorted(self.rider_ids, rider_ids), len(self.rider_ids) - 1)
+        found = self.rider_ids[position] == rider_ids
+        result[:, found] = self.covering(needs, preferred)[:, position[found]]
+        return result
+
+
+class ShiftMatcher:
+    """Assegna i turni aperti ai rider disponibili"""
+
+    def __init__(self, today=None):
+        self.today = today or timezone.localdate()
+        self.shifts = []
+        self.riders = {}
+        # day_of_week -> DayWindows
+        self.windows = {}
+        # date -> intervalli già occupati [(rider_id, start, end)]
+        self.busy = defaultdict(list)
+        self.max_hourly_rate = 1.0
+        self.pizzerias = None
+        # shift_id -> rider da non riproporre (es. assegnazione scaduta)
+        self.excluded = {}
+
+    def load(self, shift_ids=None):
+        """Carica in memoria turni, rider e disponibilità con poche query"""
+        shifts = Shift.objects.filter(
+            status='open',
+            date__gte=self.today,
+            shiftassignment__isnull=True
+        ).only('id', 'pizzeria_id', 'date', 'start_time', 'end_time', 'hourly_rate')
+        if shift_ids is None:
+            self.shifts = list(shifts.order_by('date', 'start_time'))
+        else:
+            self.shifts = sorted(
+                (shift for chunk in _chunks(shift_ids) for shift in shifts.filter(id__in=chunk)),
+                key=lambda shift: (shift.date, shift.start_time)
+            )
+
+        self.riders = {
+            rider.id: rider
+            for rider in Rider.objects.filter(is_active=True).only(
+                'id', 'rating', 'max_distance_km', 'home_latitude', 'home_longitude'
+            )
+        }
+        self.pizzerias = get_pizzeria_index()
+
+        # Stessa struttura settimanale usata dal bot (una query)
+        weekly = load_weekly_availabilities()
+        self.windows = {day: DayWindows(day, weekly) for day in range(7)}
+
+        busy = ShiftAssignment.objects.filter(
+            shift__status__in=['assigned', 'confirmed'],
+            shift__date__gte=self.today
+        ).values_list('rider_id', 'shift__date', 'shift__start_time', 'shift__end_time')
+
+        self.busy = defaultdict(list)
+        for rider_id, date, start, end in busy:
+            self.busy[date].append((rider_id, *_span(start, end)))
+
+        if self.shifts:
+            self.max_hourly_rate = float(max(shift.hourly_rate for shift in self.shifts)) or 1.0
+
+    def score_matrix(self, shifts):
+        """Punteggi turni x rider per turni dello stesso giorno (0 = non compatibile)"""
+        weekday = shifts[0].date.weekday()
+        day = self.windows.get(weekday)
+        if day is None or not len(day.rider_ids):
+            return None, None
+
+        spans = np.array([_span(shift.start_time, shift.end_time) for shift in shifts])
+        shift_start, shift_end = spans[:, 0], spans[:, 1]
+        hourly_rate = np.array([float(shift.hourly_rate) for shift in shifts])
+
+        # Disponibilità per tutti i minuti del turno
+        pieces = [need_masks(weekday, shift.start_time, shift.end_time) for shift in shifts]
+        needs = _words_array([p[0][1] if p else 0 for p in pieces])
+        feasible = day.covering(needs) & needs.any(axis=1)[:, None]
+        preferred = day.covering(needs, preferred=True)
+
+        # Turni oltre la mezzanotte: servono anche i minuti del giorno dopo
+        overnight = [i for i, p in enumerate(pieces) if len(p) > 1]
+        if overnight:
+            next_day = self.windows[(weekday + 1) % 7]
+            next_needs = _words_array([pieces[i][1][1] for i in overnight])
+            feasible[overnight] &= next_day.covering_for(day.rider_ids, next_needs)
+            preferred[overnight] &= next_day.covering_for(day.rider_ids, next_needs, preferred=True)
+
+        # Esclude rider inattivi e già occupati in orari sovrapposti
+        active = np.array([rider_id in self.riders for rider_id in day.rider_ids], dtype=bool)
+        feasible &= active[None, :]
+        column = {rider_id: j for j, rider_id in enumerate(day.rider_ids)}
+        for i, shift in enumerate(shifts):
+            j = column.get(self.excluded.get(shift.id))
+            if j is not None:
+                feasible[i, j] = False
+        for rider_id, start, end in self.busy.get(shifts[0].date, ()):
+            j = column.get(rider_id)
+            if j is not None:
+                feasible[:, j] &= ~((shift_start < end) & (start < shift_end))
+
+        riders = [self.riders.get(rider_id) for rider_id in day.rider_ids]
+        rating = np.array([float(rider.rating) if rider else 0.0 for rider in riders])
+        scores = (
+            1.0
+            + WEIGHT_PREFERRED * preferred
+            + WEIGHT_RATING * rating[None, :] / 5
+            + WEIGHT_HOURLY_RATE * hourly_rate[:, None] / self.max_hourly_rate
+        )
+
+        # Distanza: applicata solo se sono note entrambe le posizioni
+        shift_locations = [self.pizzerias.location(shift.pizzeria_id) for shift in shifts]
+        shift_known = np.array([location is not None for location in shift_locations])
+        rider_known = np.array([
+            bool(rider) and has_location(rider.home_latitude, rider.home_longitude) for rider in riders
+        ])
+        if shift_known.any() and rider_known.any():
+            distance = haversine_matrix(
+                [location[0] if location else 0.0 for location in shift_locations],
+                [location[1] if location else 0.0 for location in shift_locations],
+                [float(rider.home_latitude) if known else 0.0 for rider, known in zip(riders, rider_known)],
+                [float(rider.home_longitude) if known else 0.0 for rider, known in zip(riders, rider_known)],
+            )
+            max_km = np.array([max(rider.max_distance_km, 1) if rider else 1 for rider in riders], dtype=float)
+            known = shift_known[:, None] & rider_known[None, :]
+            feasible &= ~known | (distance <= max_km[None, :])
+            scores += np.where(known, WEIGHT_DISTANCE * np.clip(1 - distance / max_km[None, :], 0, 1), 0.0)
+
+        return np.where(feasible, scores, 0.0), day.rider_ids
+
+    def solve(self, shifts):
+        """Assegnazione ottima per un gruppo di turni dello stesso giorno"""
+        scores, rider_ids = self.score_matrix(shifts)
+        if scores is None:
+            return {}
+
+        has_edges = scores.any(axis=1)
+        if not has_edges.any():
+            return {}
+        n_shifts, n_riders = scores.shape
+
+        # Componenti connesse del grafo turni/rider: risolte separatamente
+        rows, cols = np.nonzero(scores)
+        graph = coo_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, cols + n_shifts)),
+            shape=(n_shifts + n_riders, n_shifts + n_riders)
+        )
+        _, labels = connected_components(graph, directed=False)
+        shift_labels, rider_labels = labels[:n_shifts], labels[n_shifts:]
+
+        pairs = {}
+        for label in np.unique(shift_labels[has_edges]):
+            shift_idx = np.flatnonzero(shift_labels == label)
+            rider_idx = np.flatnonzero(rider_labels == label)
+            matrix = scores[np.ix_(shift_idx, rider_idx)]
+
+            if matrix.size > MAX_DENSE_CELLS:
+                assigned_rows, assigned_cols = self._solve_greedy(matrix)
+            else:
+                assigned_rows, assigned_cols = linear_sum_assignment(matrix, maximize=True)
+
+            for r, c in zip(assigned_rows, assigned_cols):
+                if matrix[r, c] > 0:
+                    pairs[shifts[shift_idx[r]].id] = int(rider_ids[rider_idx[c]])
+        return pairs
+
+    def _solve_greedy(self, matrix):
+        """Fallback per componenti enormi: ogni turno prende il miglior rider libero"""
+        free = np.ones(matrix.shape[1], dtype=bool)
+        assigned_rows, assigned_cols = [], []
+        for r in np.argsort(-matrix.max(axis=1), kind='stable'):
+            row = np.where(free, matrix[r], 0)
+            c = int(np.argmax(row))
+            if row[c] <= 0:
+                continue
+            assigned_rows.append(r)
+            assigned_cols.append(c)
+            free[c] = False
+        return assigned_rows, assigned_cols
+
+    def match(self):
+        """Calcola gli abbinamenti {shift_id: rider_id} (al massimo un turno per rider al giorno)"""
+        by_date = defaultdict(list)
+        for shift in self.shifts:
+            by_date[shift.date].append(shift)
+
+        pairs = {}
+        for date_shifts in by_date.values():
+            pairs.update(self.solve(date_shifts))
+        return pairs
+
+    def save(self, pairs):
+        """Scrive le assegnazioni in un'unica transazione"""
+        with transaction.atomic():
+            # Solo i turni ancora aperti; quelli bloccati da un altro matcher vengono saltati
+            still_open = set()
+            for chunk in _chunks(pairs):
+                still_open.update(
+                    Shift.objects.select_for_update(skip_locked=True)
+                    .filter(id__in=chunk, status='open')
+                    .values_list('id', flat=True)
+                )
+
+            assignments = ShiftAssignment.objects.bulk_create(
+                [ShiftAssignment(shift_id=shift_id, rider_id=pairs[shift_id]) for shift_id in still_open],
+                batch_size=CHUNK_SIZE
+            )
+            for chunk in _chunks(still_open):
+                Shift.objects.filter(id__in=chunk).update(status='assigned')
+
+        return assignments
+
+    def score(self, shift, rating, preferred, distance_km=None, max_distance_km=None):
+        """Punteggio di un singolo abbinamento (stessa formula della matrice)"""
+        score = (
+            1.0
+            + WEIGHT_PREFERRED * preferred
+            + WEIGHT_RATING * float(rating) / 5
+            + WEIGHT_HOURLY_RATE * float(shift.hourly_rate) / self.max_hourly_rate
+        )
+        if distance_km is not None:
+            score += WEIGHT_DISTANCE * min(max(1 - distance_km / max(max_distance_km, 1), 0), 1)
+        return score
+
+    @_measured('rider')
+    def assign_for_rider(self, rider):
+        """Matching incrementale: solo i turni compatibili con un rider"""
+        if not rider.is_active:
+            return 0
+
+        preferred = dict(rider_candidates(rider.id, self.today))
+        if not preferred:
+            return 0
+
+        shifts = []
+        for chunk in _chunks(preferred):
+            shifts.extend(
+                Shift.objects.filter(id__in=chunk, status='open', shiftassignment__isnull=True)
+                .only('id', 'pizzeria_id', 'date', 'start_time', 'end_time', 'hourly_rate')
+            )
+
+        # Solo pizzerie entro la distanza massima (se la posizione è nota)
+        pizzerias = get_pizzeria_index()
+        distances = {}
+        if has_location(rider.home_latitude, rider.home_longitude):
+            distances = pizzerias.within(rider.home_latitude, rider.home_longitude, rider.max_distance_km)
+            shifts = [
+                shift for shift in shifts
+                if shift.pizzeria_id in distances or pizzerias.location(shift.pizzeria_id) is None
+            ]
+        if not shifts:
+            return 0
+        self.max_hourly_rate = float(max(shift.hourly_rate for shift in shifts)) or 1.0
+
+        busy = defaultdict(list)
+        for date, start, end in ShiftAssignment.objects.filter(
+            rider=rider,
+            shift__status__in=['assigned', 'confirmed'],
+            shift__date__gte=self.today
+        ).values_list('shift__date', 'shift__start_time', 'shift__end_time'):
+            busy[date].append(_span(start, end))
+
+        # Come nel matching in blocco: esclusi i turni sovrapposti a quelli già
+        # assegnati, al massimo un turno nuovo per giorno (il migliore per punteggio)
+        best = {}
+        for shift in shifts:
+            start, end = _span(shift.start_time, shift.end_time)
+            if any(start < busy_end and busy_start < end for busy_start, busy_end in busy[shift.date]):
+                continue
+            score = self.score(
+                shift, rider.rating, preferred[shift.id],
+                distances.get(shift.pizzeria_id), rider.max_distance_km
+            )
+            if shift.date not in best or score > best[shift.date][0]:
+                best[shift.date] = (score, shift.id)
+
+        return len(self.save({shift_id: rider.id for _, shift_id in best.values()}))
+
+    @_measured('shift')
+    def assign_for_shift(self, shift, exclude_riders=()):
+        """Matching incrementale: solo i rider compatibili con un turno"""
+        if shift.status != 'open' or shift.date < self.today:
+            return 0
+
+        preferred = {
+            rider_id: is_preferred
+            for rider_id, is_preferred in shift_candidates(shift)
+            if rider_id not in exclude_riders
+        }
+        if not preferred:
+            return 0
+
+        # Rider già occupati in orari sovrapposti
+        busy = set()
+        for chunk in _chunks(preferred):
+            busy.update(
+                rider_id for rider_id, start, end in ShiftAssignment.objects.filter(
+                    rider_id__in=chunk,
+                    shift__date=shift.date,
+                    shift__status__in=['assigned', 'confirmed']
+                ).values_list('rider_id', 'shift__start_time', 'shift__end_time')
+                if _overlaps(shift.start_time, shift.end_time, start, end)
+            )
+
+        location = get_pizzeria_index().location(shift.pizzeria_id)
+
+        best = None
+        for chunk in _chunks(set(preferred) - busy):
+            for rider_id, rating, latitude, longitude, max_km in Rider.objects.filter(
+                id__in=chunk, is_active=True
+            ).values_list('id', 'rating', 'home_latitude', 'home_longitude', 'max_distance_km'):
+                distance = None
+                if location and has_location(latitude, longitude):
+                    distance = haversine_km(latitude, longitude, *location)
+                    if distance > max_km:
+                        continue
+                score = self.score(shift, rating, preferred[rider_id], distance, max_km)
+                if best is None or score > best[0]:
+                    best = (score, rider_id)
+
+        if best is None:
+            return 0
+        return len(self.save({shift.id: best[1]}))
+
+    @_measured('reassign')
+    def reassign_shifts(self, excluded):
+        """Matching in blocco dei turni liberati {shift_id: rider_precedente}"""
+        self.load(shift_ids=list(excluded))
+        self.excluded = excluded
+        pairs = self.match()
+        if not pairs:
+            return 0
+        return len(self.save(pairs))
+
+    @_measured('batch')
+    def batch_assign_shifts(self):
+        """Assegna tutti i turni aperti, restituisce il numero di assegnazioni"""
+        self.load()
+        pairs = self.match()
+        if not pairs:
+            return 0
+        return len(self.save(pairs))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('pizzerias', '0001_initial'),
+        ('riders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('open', 'Aperto'), ('assigned', 'Assegnato'), ('confirmed', 'Confermato'), ('completed', 'Completato'), ('cancelled', 'Cancellato')], default='open', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pizzeria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pizzerias.pizzeria')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ShiftAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assigned_at', models.DateTimeField(auto_now_add=True)),
+                ('confirmed_by_rider', models.BooleanField(default=False)),
+                ('confirmed_by_pizzeria', models.BooleanField(default=False)),
+                ('rider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='riders.rider')),
+                ('shift', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='shifts.shift')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shifts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['date', 'start_time'], name='shift_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['status', 'date'], name='shift_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shiftassignment',
+            index=models.Index(condition=models.Q(('confirmed_by_rider', False)), fields=['assigned_at'], name='assignment_unconfirmed_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzerias', '0002_external_id'),
+        ('shifts', '0003_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.IntegerField(choices=[(0, 'Lunedì'), (1, 'Martedì'), (2, 'Mercoledì'), (3, 'Giovedì'), (4, 'Venerdì'), (5, 'Sabato'), (6, 'Domenica')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('headcount', models.PositiveSmallIntegerField(default=1)),
+                ('description', models.TextField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='template_slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shifttemplate',
+            name='pizzeria',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pizzerias.pizzeria'),
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='shifts.shifttemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='shift',
+            constraint=models.UniqueConstraint(fields=('template', 'date', 'template_slot'), name='shift_template_slot_unique'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:45
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_notified(apps, schema_editor):
+    # Le assegnazioni esistenti sono già state notificate dal vecchio meccanismo
+    ShiftAssignment = apps.get_model('shifts', 'ShiftAssignment')
+    ShiftAssignment.objects.filter(notified_at__isnull=True).update(notified_at=F('assigned_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shifts', '0004_shift_templates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shiftassignment',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_notified, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='shiftassignment',
+            index=models.Index(condition=models.Q(('notified_at__isnull', True)), fields=['assigned_at'], name='assignment_unnotified_idx'),
+        ),
+    ]
@@ -1,5 +1,24 @@
 from django.db import models
 
+class ShiftTemplate(models.Model):
+    """Turno ricorrente settimanale: generate_shifts crea i Shift delle prossime settimane"""
+    pizzeria = models.ForeignKey('pizzerias.Pizzeria', on_delete=models.CASCADE)
+    day_of_week = models.IntegerField(choices=[
+        (0, 'Lunedì'), (1, 'Martedì'), (2, 'Mercoledì'),
+        (3, 'Giovedì'), (4, 'Venerdì'), (5, 'Sabato'), (6, 'Domenica')
+    ])
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    hourly_rate = models.DecimalField(max_digits=6, decimal_places=2)
+    # Rider richiesti: un Shift per ognuno
+    headcount = models.PositiveSmallIntegerField(default=1)
+    description = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.pizzeria.name} - {self.get_day_of_week_display()} {self.start_time} x{self.headcount}"
+
 class Shift(models.Model):
     STATUS_CHOICES = [
         ('open', 'Aperto'),
@@ -9,7 +28,12 @@ class Shift(models.Model):
         ('cancelled', 'Cancellato')
     ]
     
+    # Codice del sistema di origine (import in blocco)
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
     pizzeria = models.ForeignKey('pizzerias.Pizzeria', on_delete=models.CASCADE)
+    # Modello ricorrente da cui è stato generato e posto (0..headcount-1)
+    template = models.ForeignKey(ShiftTemplate, on_delete=models.SET_NULL, null=True, blank=True)
+    template_slot = models.PositiveSmallIntegerField(null=True, blank=True)
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
@@ -18,6 +42,25 @@ class Shift(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Turni aperti per data/ora (matching, turni disponibili)
+            models.Index(
+                fields=['date', 'start_time'],
+                condition=models.Q(status='open'),
+                name='shift_open_date_idx'
+            ),
+            # Turni assegnati/confermati per data (rider occupati)
+            models.Index(fields=['status', 'date'], name='shift_status_date_idx'),
+        ]
+        constraints = [
+            # Un solo turno per modello, data e posto (generazione ripetibile)
+            models.UniqueConstraint(
+                fields=['template', 'date', 'template_slot'],
+                name='shift_template_slot_unique'
+            ),
+        ]
+    
     def __str__(self):
         return f"{self.pizzeria.name} - {self.date} {self.start_time}"
 
@@ -27,6 +70,24 @@ class ShiftAssignment(models.Model):
     assigned_at = models.DateTimeField(auto_now_add=True)
     confirmed_by_rider = models.BooleanField(default=False)
     confirmed_by_pizzeria = models.BooleanField(default=False)
+    # Notifica accodata per il rider (ogni assegnazione notificata una volta sola)
+    notified_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Assegnazioni ancora da confermare (scadenza conferma)
+            models.Index(
+                fields=['assigned_at'],
+                condition=models.Q(confirmed_by_rider=False),
+                name='assignment_unconfirmed_idx'
+            ),
+            # Assegnazioni da notificare
+            models.Index(
+                fields=['assigned_at'],
+                condition=models.Q(notified_at__isnull=True),
+                name='assignment_unnotified_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.rider} -> {self.shift}"
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Generazione dei turni dai modelli ricorrenti (ShiftTemplate)
+- Le istanze attese (modello, data, posto) delle prossime N settimane
+  sono calcolate in memoria
+- Quelle già esistenti arrivano con una sola query: si creano solo
+  quelle mancanti (differenza di insiemi) con un unico bulk_create
+- Il vincolo unique su (template, date, template_slot) rende sicure
+  due generazioni in parallelo
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.shifts.candidates import invalidate_shifts
+from apps.shifts.models import Shift, ShiftTemplate
+
+WEEKS = 4
+BATCH_SIZE = 1000
+
+
+def template_dates(day_of_week, start, days):
+    """Date del giorno della settimana tra start e start + days (escluso)"""
+    first = start + timedelta(days=(day_of_week - start.weekday()) % 7)
+    return [first + timedelta(weeks=week) for week in range((days - (first - start).days + 6) // 7)]
+
+
+def expected_slots(templates, start, days):
+    """{(template_id, data, posto): modello} per il periodo"""
+    slots = {}
+    for template in templates:
+        for shift_date in template_dates(template.day_of_week, start, days):
+            for slot in range(template.headcount):
+                slots[(template.id, shift_date, slot)] = template
+    return slots
+
+
+def generate_shifts(weeks=WEEKS, today=None, templates=None, dry_run=False):
+    """Crea i turni mancanti dei modelli attivi per le prossime settimane.
+    Restituisce il numero di turni (da) creare."""
+    start = today or timezone.localdate()
+    end = start + timedelta(weeks=weeks)
+    if templates is None:
+        templates = ShiftTemplate.objects.filter(is_active=True, pizzeria__is_active=True)
+    templates = list(templates)
+    if not templates:
+        return 0
+
+    expected = expected_slots(templates, start, (end - start).days)
+    existing = set(
+        Shift.objects.filter(
+            template__in=[template.id for template in templates],
+            date__gte=start,
+            date__lt=end
+        ).values_list('template_id', 'date', 'template_slot')
+    )
+    missing = expected.keys() - existing
+    if dry_run or not missing:
+        return len(missing)
+
+    shifts = []
+    for template_id, shift_date, slot in sorted(missing, key=lambda key: (key[1], key[0], key[2])):
+        template = expected[(template_id, shift_date, slot)]
+        shifts.append(Shift(
+            pizzeria_id=template.pizzeria_id,
+            template=template,
+            template_slot=slot,
+            date=shift_date,
+            start_time=template.start_time,
+            end_time=template.end_time,
+            hourly_rate=template.hourly_rate,
+            description=template.description
+        ))
+    # Creati nel frattempo da un'altra generazione: saltati dal vincolo unique
+    Shift.objects.bulk_create(shifts, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    # bulk_create non invia i signal: candidati del matching da ricalcolare
+    for day in {shift_date.weekday() for _, shift_date, _ in missing}:
+        invalidate_shifts(day)
+    return len(missing)
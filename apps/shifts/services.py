@@ -0,0 +1,59 @@
+"""
+Transizioni di stato di turni e assegnazioni
+- Ogni transizione è un update condizionato (compare-and-set) o avviene
+  sotto lock della sola riga coinvolta: nessun lock globale
+- Ripetere la stessa operazione (doppio tap, callback riconsegnato)
+  non cambia il risultato
+"""
+
+from django.db import transaction
+
+from apps.shifts.models import Shift, ShiftAssignment
+
+# Esiti delle transizioni
+ACCEPTED = 'accepted'
+ALREADY_ACCEPTED = 'already_accepted'
+REJECTED = 'rejected'
+NOT_FOUND = 'not_found'
+
+
+def accept_assignment(assignment_id, telegram_id):
+    """Conferma l'assegnazione del rider: (esito, assegnazione o None)"""
+    updated = ShiftAssignment.objects.filter(
+        id=assignment_id,
+        rider__telegram_id=telegram_id,
+        confirmed_by_rider=False,
+        shift__status='assigned'
+    ).update(confirmed_by_rider=True)
+
+    assignment = ShiftAssignment.objects.select_related('shift__pizzeria').filter(
+        id=assignment_id,
+        rider__telegram_id=telegram_id
+    ).first()
+    if assignment is None:
+        # Rifiutata, scaduta o non del rider
+        return NOT_FOUND, None
+    if updated:
+        return ACCEPTED, assignment
+    if assignment.confirmed_by_rider:
+        return ALREADY_ACCEPTED, assignment
+    return NOT_FOUND, None
+
+
+def reject_assignment(assignment_id, telegram_id):
+    """Rifiuta l'assegnazione e riapre il turno: (esito, turno o None, rider_id o None)"""
+    with transaction.atomic():
+        assignment = (
+            ShiftAssignment.objects.select_for_update(of=('self',))
+            .filter(id=assignment_id, rider__telegram_id=telegram_id)
+            .values_list('shift_id', 'rider_id')
+            .first()
+        )
+        if assignment is None:
+            return NOT_FOUND, None, None
+        shift_id, rider_id = assignment
+
+        ShiftAssignment.objects.filter(id=assignment_id).delete()
+        Shift.objects.filter(id=shift_id, status__in=['assigned', 'confirmed']).update(status='open')
+
+    return REJECTED, Shift.objects.filter(id=shift_id).first(), rider_id
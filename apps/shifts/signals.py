@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.riders.models import RiderAvailability
+from apps.shifts.candidates import invalidate_availability, invalidate_shifts
+from apps.shifts.feed import invalidate_feed
+from apps.shifts.models import Shift
+
+
+@receiver([post_save, post_delete], sender=RiderAvailability)
+def availability_changed(sender, instance, created=False, **kwargs):
+    if created or kwargs.get('signal') is post_delete:
+        invalidate_availability(instance.rider_id, instance.day_of_week)
+    else:
+        # Il giorno può essere cambiato e quello precedente non è noto: gli indici
+        # degli altri processi terrebbero la finestra nel giorno vecchio
+        for day in range(7):
+            invalidate_availability(instance.rider_id, day)
+    invalidate_feed(instance.rider_id)
+
+
+@receiver([post_save, post_delete], sender=Shift)
+def shift_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # Un cambio di solo stato non cambia i candidati (lo stato è filtrato a query time)
+    if update_fields and set(update_fields) <= {'status'}:
+        return
+    if created or kwargs.get('signal') is post_delete:
+        invalidate_shifts(instance.date.weekday())
+    else:
+        # La data può essere cambiata: il giorno precedente non è noto
+        for day in range(7):
+            invalidate_shifts(day)
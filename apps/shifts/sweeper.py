@@ -0,0 +1,70 @@
+"""
+Scadenza delle assegnazioni non confermate
+- Assegnazioni più vecchie di SHIFT_CONFIRM_TIMEOUT_MINUTES trovate con
+  l'indice parziale sulle assegnazioni non confermate
+- Rilascio a blocchi con update/delete in blocco (righe bloccate con skip_locked:
+  più sweeper in parallelo non rilasciano la stessa assegnazione)
+- I turni liberati tornano al matcher tutti insieme
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.shifts.models import Shift, ShiftAssignment
+
+BATCH_SIZE = 500
+
+
+def confirm_deadline(now=None):
+    """Le assegnazioni precedenti a questo istante sono scadute"""
+    now = now or timezone.now()
+    return now - timedelta(minutes=getattr(settings, 'SHIFT_CONFIRM_TIMEOUT_MINUTES', 30))
+
+
+def release_expired_assignments(now=None, batch_size=BATCH_SIZE):
+    """Rilascia un blocco di assegnazioni scadute: {shift_id: rider_id}"""
+    with transaction.atomic():
+        expired = list(
+            ShiftAssignment.objects.select_for_update(skip_locked=True).filter(
+                confirmed_by_rider=False,
+                assigned_at__lt=confirm_deadline(now),
+                shift__status='assigned'
+            ).values_list('id', 'shift_id', 'rider_id')[:batch_size]
+        )
+        if not expired:
+            return {}
+
+        ShiftAssignment.objects.filter(
+            id__in=[assignment_id for assignment_id, _, _ in expired],
+            confirmed_by_rider=False
+        ).delete()
+        Shift.objects.filter(
+            id__in=[shift_id for _, shift_id, _ in expired],
+            status='assigned'
+        ).update(status='open')
+
+    return {shift_id: rider_id for _, shift_id, rider_id in expired}
+
+
+def sweep_expired_assignments(now=None, batch_size=BATCH_SIZE, rematch=True):
+    """Rilascia tutte le assegnazioni scadute e riassegna i turni in un solo matching.
+    Restituisce ({shift_id: rider_precedente}, turni riassegnati)."""
+    released = {}
+    while True:
+        batch = release_expired_assignments(now, batch_size)
+        if not batch:
+            break
+        released.update(batch)
+        if len(batch) < batch_size:
+            break
+
+    reassigned = 0
+    if released and rematch:
+        from apps.shifts.matching import ShiftMatcher
+
+        # Il rider che non ha confermato non riceve di nuovo lo stesso turno
+        reassigned = ShiftMatcher().reassign_shifts(released)
+    return released, reassigned
@@ -0,0 +1,106 @@
+"""
+Task Celery del matching
+- batch_matching: matching completo, le richieste ravvicinate ne producono uno solo
+- match_shift: matching incrementale di un turno liberato
+- match_rider: matching incrementale di un rider che ha cambiato disponibilità
+- sweep_assignments: scadenza delle assegnazioni non confermate (Celery beat)
+- generate_recurring_shifts: turni delle prossime settimane dai modelli ricorrenti (Celery beat)
+"""
+
+from celery import shared_task
+from django.conf import settings
+
+from ridermatch.cache import debounce
+
+DEBOUNCE_KEY = 'match:debounce:batch'
+
+
+def _rider_debounce_key(rider_id):
+    return f"match:debounce:rider:{rider_id}"
+
+
+def request_matching():
+    """Pianifica un matching completo tra MATCHING_DEBOUNCE_SECONDS.
+    Le richieste che arrivano nel frattempo sono già coperte da quello pianificato.
+    Senza worker (eager) il countdown è ignorato: il matching parte subito e le
+    richieste seguenti nell'intervallo vengono saltate."""
+    delay = getattr(settings, 'MATCHING_DEBOUNCE_SECONDS', 60)
+    if not debounce(DEBOUNCE_KEY, delay):
+        return False
+    batch_matching.apply_async(countdown=delay)
+    return True
+
+
+def request_rider_matching(rider_id):
+    """Come request_matching, ma solo per i turni del rider (modifiche alle sue disponibilità)"""
+    delay = getattr(settings, 'MATCHING_DEBOUNCE_SECONDS', 60)
+    if not debounce(_rider_debounce_key(rider_id), delay):
+        return False
+    match_rider.apply_async((rider_id,), countdown=delay)
+    return True
+
+
+@shared_task
+def batch_matching():
+    from apps.shifts.matching import ShiftMatcher
+    from apps.telegram_bot.tasks import notify_new_assignments
+
+    assignments = ShiftMatcher().batch_assign_shifts()
+    if assignments:
+        print(f"🎯 Matching automatico: {assignments} turni assegnati")
+        notify_new_assignments.delay()
+    return assignments
+
+
+@shared_task
+def match_shift(shift_id, exclude_riders=()):
+    from apps.shifts.matching import ShiftMatcher
+    from apps.shifts.models import Shift
+    from apps.telegram_bot.tasks import notify_new_assignments
+
+    shift = Shift.objects.filter(id=shift_id).first()
+    if shift is None:
+        return 0
+    assignments = ShiftMatcher().assign_for_shift(shift, exclude_riders=set(exclude_riders))
+    if assignments:
+        notify_new_assignments.delay()
+    return assignments
+
+
+@shared_task
+def match_rider(rider_id):
+    from apps.riders.models import Rider
+    from apps.shifts.matching import ShiftMatcher
+    from apps.telegram_bot.tasks import notify_new_assignments
+
+    rider = Rider.objects.filter(id=rider_id).first()
+    if rider is None:
+        return 0
+    assignments = ShiftMatcher().assign_for_rider(rider)
+    if assignments:
+        notify_new_assignments.delay()
+    return assignments
+
+
+@shared_task
+def sweep_assignments():
+    from apps.shifts.sweeper import sweep_expired_assignments
+    from apps.telegram_bot.tasks import notify_expired_assignments, notify_new_assignments
+
+    released, reassigned = sweep_expired_assignments()
+    if released:
+        # Coppie (turno, rider): le chiavi JSON dei dict diventerebbero stringhe
+        notify_expired_assignments.delay(list(released.items()))
+    if reassigned:
+        notify_new_assignments.delay()
+    return len(released)
+
+
+@shared_task
+def generate_recurring_shifts(weeks=None):
+    from apps.shifts.recurring import WEEKS, generate_shifts
+
+    created = generate_shifts(weeks=weeks or WEEKS)
+    if created:
+        request_matching()
+    return created
@@ -0,0 +1,342 @@
+import os
+import time as time_module
+from datetime import date, time, timedelta
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.pizzerias import geo
+from apps.riders import intervals
+from apps.shifts import services
+from apps.shifts.candidates import _shifts_version_key
+from apps.shifts.matching import ShiftMatcher
+from apps.shifts.models import Shift, ShiftAssignment, ShiftTemplate
+from apps.shifts.recurring import generate_shifts, template_dates
+from apps.shifts.tasks import (
+    DEBOUNCE_KEY, match_rider, match_shift, request_matching, request_rider_matching, sweep_assignments
+)
+from apps.telegram_bot.models import OutboundMessage
+from ridermatch import cache as ridermatch_cache
+from ridermatch.factories import assign, create_pizzeria, create_rider, create_shift
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def tomorrow():
+    return timezone.localdate() + timedelta(days=1)
+
+
+class AssignmentTransitionTests(TestCase):
+    def setUp(self):
+        self.rider = create_rider(1)
+        self.shift = create_shift(create_pizzeria(), tomorrow())
+        self.assignment = assign(self.shift, self.rider)
+
+    def test_accept_twice(self):
+        outcome, _ = services.accept_assignment(self.assignment.id, 1)
+        self.assertEqual(outcome, services.ACCEPTED)
+        outcome, _ = services.accept_assignment(self.assignment.id, 1)
+        self.assertEqual(outcome, services.ALREADY_ACCEPTED)
+
+    def test_accept_by_another_rider(self):
+        create_rider(2)
+        outcome, assignment = services.accept_assignment(self.assignment.id, 2)
+        self.assertEqual((outcome, assignment), (services.NOT_FOUND, None))
+        self.assertFalse(ShiftAssignment.objects.get(id=self.assignment.id).confirmed_by_rider)
+
+    def test_reject_reopens_shift_once(self):
+        outcome, shift, rider_id = services.reject_assignment(self.assignment.id, 1)
+        self.assertEqual((outcome, shift.status, rider_id), (services.REJECTED, 'open', self.rider.id))
+        outcome, _, _ = services.reject_assignment(self.assignment.id, 1)
+        self.assertEqual(outcome, services.NOT_FOUND)
+
+    def test_accept_after_reject(self):
+        services.reject_assignment(self.assignment.id, 1)
+        outcome, _ = services.accept_assignment(self.assignment.id, 1)
+        self.assertEqual(outcome, services.NOT_FOUND)
+        self.assertEqual(Shift.objects.get(id=self.shift.id).status, 'open')
+
+
+class RequestMatchingTests(TestCase):
+    """Con la DummyCache dei settings di sviluppo: conta il debounce in processo"""
+
+    def setUp(self):
+        ridermatch_cache._debounced.clear()
+        self.addCleanup(ridermatch_cache._debounced.clear)
+
+    @mock.patch('apps.shifts.matching.ShiftMatcher.batch_assign_shifts', return_value=0)
+    def test_many_requests_run_one_matching(self, batch_assign_shifts):
+        results = [request_matching() for _ in range(50)]
+        self.assertEqual(batch_assign_shifts.call_count, 1)
+        self.assertEqual(results.count(True), 1)
+
+    @mock.patch('apps.shifts.matching.ShiftMatcher.batch_assign_shifts', return_value=0)
+    def test_runs_again_after_the_window(self, batch_assign_shifts):
+        request_matching()
+        with mock.patch('ridermatch.cache.time.monotonic', return_value=time_module.monotonic() + 61):
+            request_matching()
+        self.assertEqual(batch_assign_shifts.call_count, 2)
+
+    @mock.patch('apps.shifts.matching.ShiftMatcher.assign_for_rider', return_value=0)
+    def test_rider_edits_run_one_matching_per_rider(self, assign_for_rider):
+        first, second = create_rider(1), create_rider(2)
+        for _ in range(50):
+            request_rider_matching(first.id)
+        request_rider_matching(second.id)
+        self.assertEqual(
+            sorted(call.args[0].id for call in assign_for_rider.call_args_list), [first.id, second.id]
+        )
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    @mock.patch('apps.shifts.matching.ShiftMatcher.batch_assign_shifts', return_value=0)
+    def test_key_taken_by_another_process(self, batch_assign_shifts):
+        cache.add(DEBOUNCE_KEY, 1, 60)
+        self.addCleanup(cache.delete, DEBOUNCE_KEY)
+        self.assertFalse(request_matching())
+        self.assertEqual(batch_assign_shifts.call_count, 0)
+
+
+class IncrementalMatchingTests(TestCase):
+    def setUp(self):
+        self.shift_date = tomorrow()
+        self.day = self.shift_date.weekday()
+        self.pizzeria = create_pizzeria()
+        # Indice delle disponibilità per processo: le righe dei test precedenti sono state annullate
+        intervals._index = None
+        self.addCleanup(setattr, intervals, '_index', None)
+
+    def test_rider_gets_one_shift_per_free_day(self):
+        rider = create_rider(1, windows=[(self.day, '12:00', '23:00')])
+        create_shift(self.pizzeria, self.shift_date, start='12:00', end='15:00')
+        create_shift(self.pizzeria, self.shift_date, start='19:00', end='22:00', hourly_rate='15.00')
+        create_shift(self.pizzeria, self.shift_date + timedelta(days=1))
+
+        self.assertEqual(ShiftMatcher().assign_for_rider(rider), 1)
+        assignment = ShiftAssignment.objects.get(rider=rider)
+        self.assertEqual(assignment.shift.hourly_rate, 15)
+
+    def test_rider_busy_skips_only_overlapping_shifts(self):
+        rider = create_rider(1, windows=[(self.day, '12:00', '23:00')])
+        assign(create_shift(self.pizzeria, self.shift_date, start='18:00', end='20:00'), rider)
+        create_shift(self.pizzeria, self.shift_date, hourly_rate='15.00')
+        lunch = create_shift(self.pizzeria, self.shift_date, start='12:00', end='15:00')
+
+        self.assertEqual(ShiftMatcher().assign_for_rider(rider), 1)
+        self.assertTrue(ShiftAssignment.objects.filter(rider=rider, shift=lunch).exists())
+
+    def test_shift_skips_overlapping_and_inactive_riders(self):
+        busy = create_rider(1, windows=[(self.day, '18:00', '23:00')], rating='5.0')
+        create_rider(2, windows=[(self.day, '18:00', '23:00')], is_active=False)
+        free = create_rider(3, windows=[(self.day, '18:00', '23:00')])
+        assign(create_shift(self.pizzeria, self.shift_date, start='18:00', end='20:00'), busy)
+        shift = create_shift(self.pizzeria, self.shift_date)
+
+        self.assertEqual(ShiftMatcher().assign_for_shift(shift), 1)
+        self.assertEqual(ShiftAssignment.objects.get(shift=shift).rider_id, free.id)
+
+    def test_shift_not_covered(self):
+        create_rider(1, windows=[(self.day, '20:00', '23:00')])
+        shift = create_shift(self.pizzeria, self.shift_date)
+        self.assertEqual(ShiftMatcher().assign_for_shift(shift), 0)
+        self.assertEqual(Shift.objects.get(id=shift.id).status, 'open')
+
+
+class BatchMatchingTests(TestCase):
+    def setUp(self):
+        self.shift_date = tomorrow()
+        self.day = self.shift_date.weekday()
+        # Indice delle pizzerie per processo: gli id dei test precedenti possono essere riusati
+        geo._index = None
+        self.addCleanup(setattr, geo, '_index', None)
+        self.pizzeria = create_pizzeria()
+
+    def assigned(self):
+        return dict(ShiftAssignment.objects.values_list('shift_id', 'rider_id'))
+
+    def test_optimal_assignment(self):
+        both = create_rider(1, windows=[(self.day, '12:00', '23:00')])
+        evening = create_rider(2, windows=[(self.day, '18:00', '23:00')], rating='3.0')
+        dinner = create_shift(self.pizzeria, self.shift_date, hourly_rate='15.00')
+        lunch = create_shift(self.pizzeria, self.shift_date, start='12:00', end='15:00')
+
+        # Il greedy darebbe la cena al rider migliore, lasciando scoperto il pranzo
+        with mock.patch('apps.shifts.matching.MAX_DENSE_CELLS', 0):
+            matcher = ShiftMatcher()
+            matcher.load()
+            self.assertEqual(len(matcher.match()), 1)
+
+        self.assertEqual(ShiftMatcher().batch_assign_shifts(), 2)
+        self.assertEqual(self.assigned(), {dinner.id: evening.id, lunch.id: both.id})
+
+    def test_shift_across_midnight(self):
+        next_day = (self.day + 1) % 7
+        create_rider(1, windows=[(self.day, '21:00', '00:00')])
+        overnight = create_rider(2, windows=[(self.day, '21:00', '00:00'), (next_day, '00:00', '02:00')], rating='3.0')
+        shift = create_shift(self.pizzeria, self.shift_date, start='22:00', end='01:00')
+
+        self.assertEqual(ShiftMatcher().batch_assign_shifts(), 1)
+        self.assertEqual(self.assigned(), {shift.id: overnight.id})
+
+    def test_distance_cutoff(self):
+        windows = [(self.day, '18:00', '23:00')]
+        # Roma, a più di 400 km dalla pizzeria di Milano
+        create_rider(1, windows=windows, home_latitude='41.902800', home_longitude='12.496400', max_distance_km=10)
+        near = create_rider(
+            2, windows=windows, rating='3.0', home_latitude='45.470000', home_longitude='9.190000', max_distance_km=10
+        )
+        create_shift(self.pizzeria, self.shift_date)
+        create_shift(self.pizzeria, self.shift_date, start='19:30', end='22:30')
+
+        self.assertEqual(ShiftMatcher().batch_assign_shifts(), 1)
+        self.assertEqual(list(self.assigned().values()), [near.id])
+
+    def test_busy_rider_skips_only_overlapping_shifts(self):
+        rider = create_rider(1, windows=[(self.day, '12:00', '23:00')])
+        assign(create_shift(self.pizzeria, self.shift_date, start='18:00', end='20:00'), rider)
+        dinner = create_shift(self.pizzeria, self.shift_date, hourly_rate='15.00')
+        lunch = create_shift(self.pizzeria, self.shift_date, start='12:00', end='15:00')
+
+        self.assertEqual(ShiftMatcher().batch_assign_shifts(), 1)
+        self.assertTrue(ShiftAssignment.objects.filter(rider=rider, shift=lunch).exists())
+        self.assertEqual(Shift.objects.get(id=dinner.id).status, 'open')
+
+
+class MatchingTaskTests(TestCase):
+    """Task eseguiti in eager (settings di sviluppo)"""
+
+    def setUp(self):
+        self.shift_date = tomorrow()
+        self.day = self.shift_date.weekday()
+        self.pizzeria = create_pizzeria()
+        # Indice delle disponibilità per processo: le righe dei test precedenti sono state annullate
+        intervals._index = None
+        self.addCleanup(setattr, intervals, '_index', None)
+
+    def test_match_rider_assigns_compatible_shift(self):
+        rider = create_rider(1, windows=[(self.day, '18:00', '23:00')])
+        shift = create_shift(self.pizzeria, self.shift_date)
+        create_shift(self.pizzeria, self.shift_date + timedelta(days=1))
+
+        self.assertEqual(match_rider.delay(rider.id).get(), 1)
+        self.assertEqual(ShiftAssignment.objects.get().shift_id, shift.id)
+        self.assertEqual(OutboundMessage.objects.filter(chat_id=1).count(), 1)
+
+    def test_match_rider_unknown(self):
+        self.assertEqual(match_rider.delay(999).get(), 0)
+
+    def test_match_shift_skips_excluded_rider(self):
+        excluded = create_rider(1, windows=[(self.day, '18:00', '23:00')], rating='5.0')
+        other = create_rider(2, windows=[(self.day, '18:00', '23:00')])
+        shift = create_shift(self.pizzeria, self.shift_date)
+
+        self.assertEqual(match_shift.delay(shift.id, [excluded.id]).get(), 1)
+        self.assertEqual(ShiftAssignment.objects.get(shift=shift).rider_id, other.id)
+
+    def test_sweep_releases_and_reassigns(self):
+        late = create_rider(1, windows=[(self.day, '18:00', '23:00')])
+        other = create_rider(2, windows=[(self.day, '18:00', '23:00')])
+        shift = create_shift(self.pizzeria, self.shift_date)
+        assignment = assign(shift, late)
+        ShiftAssignment.objects.filter(id=assignment.id).update(assigned_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(sweep_assignments.delay().get(), 1)
+        self.assertEqual(ShiftAssignment.objects.get(shift=shift).rider_id, other.id)
+        self.assertIn('TURNO SCADUTO', OutboundMessage.objects.get(chat_id=1).text)
+        self.assertEqual(OutboundMessage.objects.filter(chat_id=2).count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ImportShiftsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        ridermatch_cache._debounced.clear()
+        self.addCleanup(ridermatch_cache._debounced.clear)
+        self.pizzeria = create_pizzeria(external_id='p1')
+
+    def import_rows(self, *rows, **options):
+        with NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write("external_id,pizzeria,date,start_time,end_time,hourly_rate\n")
+            for row in rows:
+                source.write(row + "\n")
+        self.addCleanup(os.unlink, source.name)
+        call_command('import_shifts', source.name, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def versions(self):
+        return [cache.get(_shifts_version_key(day), 1) for day in range(7)]
+
+    def test_moved_shift_invalidates_every_day(self):
+        shift_date = tomorrow()
+        create_shift(self.pizzeria, shift_date, external_id='s1')
+        cache.clear()
+
+        self.import_rows(f"s1,p1,{shift_date + timedelta(days=1)},19:00,22:00,12.00")
+        self.assertTrue(all(version > 1 for version in self.versions()))
+
+    def test_matching_and_invalidation_once_per_import(self):
+        first = tomorrow()
+        rows = [f"s{i},p1,{first + timedelta(days=i % 2)},19:00,22:00,12.00" for i in range(6)]
+        with mock.patch('apps.shifts.management.commands.import_shifts.request_matching') as request_matching, \
+                mock.patch('apps.shifts.management.commands.import_shifts.invalidate_shifts') as invalidate:
+            self.import_rows(*rows, batch_size=2)
+        self.assertEqual(request_matching.call_count, 1)
+        self.assertEqual(
+            sorted(call.args[0] for call in invalidate.call_args_list),
+            sorted({first.weekday(), (first + timedelta(days=1)).weekday()})
+        )
+
+    def test_new_shifts_are_matched(self):
+        shift_date = tomorrow()
+        rider = create_rider(1, windows=[(shift_date.weekday(), '18:00', '23:00')])
+
+        self.import_rows(f"s1,p1,{shift_date},19:00,22:00,12.00")
+        versions = self.versions()
+        self.assertGreater(versions[shift_date.weekday()], 1)
+        self.assertEqual(versions.count(1), 6)
+        self.assertEqual(Shift.objects.get(external_id='s1').shiftassignment.rider_id, rider.id)
+
+
+class RecurringShiftTests(TestCase):
+    def setUp(self):
+        self.pizzeria = create_pizzeria()
+        # Lunedì
+        self.today = date(2026, 10, 19)
+
+    def create_template(self, **fields):
+        fields.setdefault('day_of_week', 4)
+        return ShiftTemplate.objects.create(
+            pizzeria=self.pizzeria, start_time=time(19), end_time=time(23), hourly_rate='12.00', **fields
+        )
+
+    def test_template_dates(self):
+        self.assertEqual(template_dates(0, self.today, 14), [self.today, self.today + timedelta(days=7)])
+        self.assertEqual(template_dates(6, self.today, 7), [self.today + timedelta(days=6)])
+        self.assertEqual(template_dates(6, self.today, 6), [])
+
+    def test_one_shift_per_slot_and_week(self):
+        template = self.create_template(headcount=2)
+        self.assertEqual(generate_shifts(weeks=4, today=self.today), 8)
+        shifts = Shift.objects.filter(template=template)
+        self.assertEqual(shifts.count(), 8)
+        self.assertEqual({shift.date.weekday() for shift in shifts}, {4})
+        self.assertEqual(sorted(set(shifts.values_list('template_slot', flat=True))), [0, 1])
+
+    def test_second_run_creates_nothing(self):
+        self.create_template()
+        generate_shifts(weeks=2, today=self.today)
+        self.assertEqual(generate_shifts(weeks=2, today=self.today), 0)
+        # Una settimana in più: solo quella nuova
+        self.assertEqual(generate_shifts(weeks=3, today=self.today), 1)
+        self.assertEqual(Shift.objects.count(), 3)
+
+    def test_dry_run_and_inactive_templates(self):
+        self.create_template()
+        self.create_template(day_of_week=5, is_active=False)
+        self.assertEqual(generate_shifts(weeks=2, today=self.today, dry_run=True), 2)
+        self.assertFalse(Shift.objects.exists())
+        self.assertEqual(generate_shifts(weeks=2, today=self.today), 2)
@@ -0,0 +1,111 @@
+"""
+Client HTTP per la Telegram Bot API
+- TelegramAPI: sincrono, sessione requests con pool keep-alive
+- AsyncTelegramAPI: asyncio, sessione aiohttp condivisa
+"""
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from ridermatch.metrics import Counter, Histogram
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def api_base_url(token):
+    """URL base dei metodi Bot API"""
+    api_url = getattr(settings, 'TELEGRAM_API_URL', 'https://api.telegram.org')
+    return f"{api_url.rstrip('/')}/bot{token}"
+
+
+API_SECONDS = Histogram(
+    'ridermatch_telegram_api_seconds', "Round trip delle chiamate Bot API", ['method']
+)
+API_ERRORS = Counter(
+    'ridermatch_telegram_api_errors_total', "Chiamate Bot API fallite (rete o JSON)", ['method']
+)
+
+
+class TelegramAPI:
+    """Chiamate Bot API sincrone su connessioni riutilizzate"""
+
+    def __init__(self, token, pool_size=None, timeout=None):
+        self.base_url = api_base_url(token)
+        self.timeout = timeout or getattr(settings, 'BOT_HTTP_TIMEOUT', 10)
+        pool_size = pool_size or getattr(settings, 'BOT_HTTP_POOL_SIZE', 100)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def call(self, method, data=None, timeout=None):
+        """Esegue un metodo Bot API e restituisce il JSON di risposta"""
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/{method}",
+                data=data,
+                timeout=timeout or self.timeout
+            )
+            return response.json()
+        except Exception as e:
+            print(f"Errore chiamata {method}: {e}")
+            API_ERRORS.labels(method).inc()
+            return None
+        finally:
+            API_SECONDS.labels(method).observe(time.perf_counter() - started)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncTelegramAPI:
+    """Chiamate Bot API asincrone su un pool keep-alive condiviso"""
+
+    def __init__(self, token, pool_size=None, timeout=None):
+        self.base_url = api_base_url(token)
+        self.timeout = timeout or getattr(settings, 'BOT_HTTP_TIMEOUT', 10)
+        self.pool_size = pool_size or getattr(settings, 'BOT_HTTP_POOL_SIZE', 100)
+        self.session = None
+
+    async def start(self):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp non installato: pip install aiohttp")
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def call(self, method, data=None, timeout=None):
+        """Esegue un metodo Bot API e restituisce il JSON di risposta"""
+        started = time.perf_counter()
+        try:
+            async with self.session.post(
+                f"{self.base_url}/{method}",
+                data=data,
+                timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)
+            ) as response:
+                return await response.json(content_type=None)
+        except Exception as e:
+            print(f"Errore chiamata {method}: {e}")
+            API_ERRORS.labels(method).inc()
+            return None
+        finally:
+            API_SECONDS.labels(method).observe(time.perf_counter() - started)
@@ -0,0 +1,127 @@
+"""
+Runtime asyncio del bot RiderMatch
+- Long polling asincrono
+- Pool di connessioni keep-alive condiviso da tutte le chiamate Bot API
+- Handler ORM eseguiti in un thread pool tramite sync_to_async
+- Ordine garantito per singolo utente, concorrenza limitata
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.telegram_bot.api import AsyncTelegramAPI
+from apps.telegram_bot.complete_bot import RiderMatchBot
+from apps.telegram_bot.dispatcher import update_telegram_id
+from ridermatch.metrics import QUEUE_DEPTH
+
+
+class AsyncRiderMatchBot(RiderMatchBot):
+    """RiderMatchBot eseguito su event loop asyncio"""
+
+    def __init__(self):
+        super().__init__()
+        self.async_api = None
+        self.concurrency = getattr(settings, 'BOT_ASYNC_CONCURRENCY', 1000)
+        self.executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BOT_ASYNC_ORM_THREADS', 8),
+            thread_name_prefix='ridermatch-orm'
+        )
+        # Ultimo task in corso per ogni utente
+        self.chat_tails = {}
+
+    def api_call(self, method, data=None, timeout=None):
+        """Chiamata Bot API dagli handler sincroni, eseguita sull'event loop"""
+        return async_to_sync(self.async_api.call)(method, data, timeout=timeout)
+
+    def _process_update_sync(self, update):
+        try:
+            self.process_update(update)
+        finally:
+            close_old_connections()
+
+    async def process_update_async(self, update):
+        """Processa un update in un thread del pool ORM"""
+        await sync_to_async(
+            self._process_update_sync,
+            thread_sensitive=False,
+            executor=self.executor
+        )(update)
+
+    async def _run_after(self, previous, update, slots):
+        try:
+            if previous:
+                await asyncio.wait([previous])
+            await self.process_update_async(update)
+        except Exception as e:
+            print(f"Errore processamento update: {e}")
+        finally:
+            slots.release()
+
+    async def dispatch(self, update, slots):
+        """Avvia un update dopo quelli precedenti dello stesso utente"""
+        await slots.acquire()
+        key = update_telegram_id(update)
+        task = asyncio.create_task(self._run_after(self.chat_tails.get(key), update, slots))
+        self.chat_tails[key] = task
+
+        def cleanup(finished, key=key):
+            if self.chat_tails.get(key) is finished:
+                del self.chat_tails[key]
+
+        task.add_done_callback(cleanup)
+
+    async def get_updates_async(self, offset=None):
+        """Recupera aggiornamenti con long polling asincrono"""
+        poll_timeout = getattr(settings, 'BOT_POLL_TIMEOUT', 30)
+        params = {'timeout': poll_timeout}
+        if offset:
+            params['offset'] = offset
+        return await self.async_api.call('getUpdates', params, timeout=poll_timeout + 10)
+
+    async def run_async(self):
+        """Loop principale asincrono"""
+        slots = asyncio.Semaphore(self.concurrency)
+        offset = None
+
+        async with AsyncTelegramAPI(self.token) as api:
+            self.async_api = api
+            try:
+                while True:
+                    updates = await self.get_updates_async(offset)
+
+                    if updates and updates.get('ok'):
+                        for update in updates['result']:
+                            await self.dispatch(update, slots)
+                            offset = update['update_id'] + 1
+                    elif updates is None:
+                        await asyncio.sleep(1)
+            finally:
+                pending = list(self.chat_tails.values())
+                if pending:
+                    await asyncio.wait(pending)
+
+    def run_polling(self):
+        """Avvia il bot in modalità asyncio"""
+        print("🤖 RiderMatch Bot (asyncio) avviato!")
+        print(f"🔗 Token: {self.token[:10]}...")
+        print(f"⚙️  Update concorrenti max: {self.concurrency}")
+        print("⚠️  Per fermare: Ctrl+C")
+
+        outbox_stop = self.start_outbox_sender()
+        self.start_metrics_server()
+        QUEUE_DEPTH.labels('async_chats').set_function(lambda: len(self.chat_tails))
+
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print("\n🛑 Bot fermato!")
+        except Exception as e:
+            print(f"❌ Errore bot: {e}")
+        finally:
+            self.executor.shutdown(wait=False)
+            if outbox_stop:
+                outbox_stop.set()
@@ -0,0 +1,409 @@
+"""
+Benchmark del bot senza Telegram
+- Server HTTP locale che imita la Bot API: getUpdates serve lo stream
+  di update a blocchi, gli altri metodi rispondono ok
+- Scenari fissi (rider, pizzerie, turni, mix di update) generati con un seed,
+  per confrontare commit diversi sugli stessi dati
+- Stream sintetico (registrazioni, disponibilità, consultazioni, accetta/rifiuta)
+  o registrato (un update JSON per riga)
+- Misura update/s, latenza per update (p50/p99) e query per update
+"""
+
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from apps.pizzerias.models import Pizzeria
+from apps.riders.models import Rider, RiderAvailability
+from apps.shifts.models import Shift, ShiftAssignment
+from apps.telegram_bot.router import callbacks, command_key
+from ridermatch.metrics import QueryCounter
+
+# Scenari: dimensione dei dati e peso di ogni tipo di sequenza nello stream
+SCENARIOS = {
+    'smoke': {
+        'riders': 200, 'pizzerias': 20, 'shifts': 400, 'days': 7, 'saturday_share': 0.0,
+        'sequences': 300,
+        'mix': {'registration': 2, 'availability': 2, 'browse': 4, 'accept': 2, 'reject': 1},
+    },
+    'city': {
+        'riders': 5000, 'pizzerias': 500, 'shifts': 10000, 'days': 14, 'saturday_share': 0.0,
+        'sequences': 3000,
+        'mix': {'registration': 1, 'availability': 3, 'browse': 5, 'accept': 2, 'reject': 1},
+    },
+    # Sabato sera: gran parte dei turni sullo stesso giorno, molti accetta/rifiuta
+    'saturday_rush': {
+        'riders': 5000, 'pizzerias': 500, 'shifts': 6000, 'days': 7, 'saturday_share': 0.8,
+        'sequences': 5000,
+        'mix': {'registration': 1, 'availability': 1, 'browse': 4, 'accept': 5, 'reject': 2},
+    },
+}
+
+# Telegram ID dei rider creati dal seed e dei nuovi utenti che si registrano
+SEED_TELEGRAM_ID = 10_000_000
+NEW_TELEGRAM_ID = 90_000_000
+
+
+class FakeBotAPI:
+    """Bot API locale: getUpdates restituisce lo stream, gli altri metodi sono contati"""
+
+    def __init__(self, updates=(), batch_size=100):
+        self.updates = list(updates)
+        self.batch_size = batch_size
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.server = None
+
+    def get_updates(self, offset):
+        """Blocco successivo a offset (stessa semantica della Bot API)"""
+        start = 0
+        if offset:
+            # update_id consecutivi da 1: l'offset è la posizione del prossimo
+            start = offset - 1
+        return self.updates[start:start + self.batch_size]
+
+    def start(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Header e corpo in due write: senza TCP_NODELAY ogni risposta attende l'ACK ritardato
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                data = parse_qs(self.rfile.read(length).decode())
+                method = self.path.rsplit('/', 1)[-1]
+                with api.lock:
+                    api.calls[method] += 1
+                if method == 'getUpdates':
+                    offset = int(data.get('offset', ['0'])[0])
+                    result = api.get_updates(offset)
+                else:
+                    result = {'message_id': 1}
+                body = json.dumps({'ok': True, 'result': result}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name='ridermatch-fake-api', daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def next_saturday(today):
+    return today + timedelta(days=(5 - today.weekday()) % 7 or 7)
+
+
+def seed_scenario(scenario, rnd, today=None):
+    """Crea pizzerie, rider con disponibilità e turni dello scenario"""
+    today = today or date.today()
+    pizzerias = Pizzeria.objects.bulk_create([
+        Pizzeria(
+            name=f"Pizzeria {i}",
+            address=f"Via Benchmark {i}",
+            phone='0200000000',
+            latitude=Decimal('45.40') + Decimal(rnd.randint(0, 2000)) / 10000,
+            longitude=Decimal('9.10') + Decimal(rnd.randint(0, 2000)) / 10000
+        )
+        for i in range(scenario['pizzerias'])
+    ])
+
+    users = User.objects.bulk_create([
+        User(username=f"telegram_{SEED_TELEGRAM_ID + i}", first_name=f"Rider{i}")
+        for i in range(scenario['riders'])
+    ])
+    riders = Rider.objects.bulk_create([
+        Rider(
+            user=user,
+            telegram_id=SEED_TELEGRAM_ID + i,
+            phone='+393330000000',
+            transport_type=rnd.choice(['bike', 'scooter', 'car']),
+            max_distance_km=rnd.choice([5, 10, 15, 20]),
+            home_latitude=Decimal('45.40') + Decimal(rnd.randint(0, 2000)) / 10000,
+            home_longitude=Decimal('9.10') + Decimal(rnd.randint(0, 2000)) / 10000,
+            rating=Decimal(rnd.randint(300, 500)) / 100
+        )
+        for i, user in enumerate(users)
+    ])
+
+    windows = []
+    for rider in riders:
+        for day in rnd.sample(range(7), 3):
+            start = rnd.choice([11, 17, 18, 19])
+            windows.append(RiderAvailability(
+                rider=rider,
+                day_of_week=day,
+                start_time=dtime(start),
+                end_time=dtime(23) if start > 11 else dtime(15),
+                is_preferred=rnd.random() < 0.3
+            ))
+    RiderAvailability.objects.bulk_create(windows, batch_size=1000)
+
+    saturday = next_saturday(today)
+    shifts = []
+    for _ in range(scenario['shifts']):
+        if rnd.random() < scenario['saturday_share']:
+            shift_date = saturday
+        else:
+            shift_date = today + timedelta(days=rnd.randrange(1, scenario['days'] + 1))
+        start, end = rnd.choice([(12, 14), (19, 22), (20, 23), (18, 22)])
+        shifts.append(Shift(
+            pizzeria=rnd.choice(pizzerias),
+            date=shift_date,
+            start_time=dtime(start),
+            end_time=dtime(end),
+            hourly_rate=Decimal(rnd.randint(800, 1500)) / 100
+        ))
+    Shift.objects.bulk_create(shifts, batch_size=1000)
+    return riders
+
+
+def _message(telegram_id, text=None, **extra):
+    message = {
+        'message_id': 1,
+        'chat': {'id': telegram_id, 'type': 'private'},
+        'from': {'id': telegram_id, 'first_name': f"U{telegram_id}"},
+    }
+    if text is not None:
+        message['text'] = text
+    message.update(extra)
+    return {'message': message}
+
+
+def _callback(telegram_id, data):
+    return {
+        'callback_query': {
+            'from': {'id': telegram_id, 'first_name': f"U{telegram_id}"},
+            'message': {'message_id': 1, 'chat': {'id': telegram_id, 'type': 'private'}},
+            'data': data,
+        }
+    }
+
+
+def _availability_sequence(telegram_id, rnd):
+    # Minuti diversi da quelli del seed: nessun conflitto con le finestre esistenti
+    start = f"{rnd.randint(10, 19)}:{rnd.choice(['05', '20', '35', '50'])}"
+    preferred = '*' if rnd.random() < 0.3 else ''
+    return [
+        _callback(telegram_id, 'manage_availability'),
+        _callback(telegram_id, 'add_availability'),
+        _callback(telegram_id, f'day_{rnd.randrange(7)}'),
+        _message(telegram_id, f"{start}-23:00{preferred}"),
+    ]
+
+
+def build_stream(scenario, rnd):
+    """Sequenze per utente mescolate tra loro (l'ordine di ogni utente resta).
+    Ogni utente compare in una sola sequenza, così le conversazioni non si accavallano."""
+    assignments = list(
+        ShiftAssignment.objects.order_by('id').values_list('id', 'rider__telegram_id')
+    )
+    rnd.shuffle(assignments)
+    riders = list(Rider.objects.order_by('id').values_list('telegram_id', flat=True))
+    rnd.shuffle(riders)
+    used = set()
+
+    def free_rider():
+        while riders:
+            telegram_id = riders.pop()
+            if telegram_id not in used:
+                return telegram_id
+        return None
+
+    def free_assignment():
+        while assignments:
+            assignment_id, telegram_id = assignments.pop()
+            if telegram_id not in used:
+                return assignment_id, telegram_id
+        return None, None
+
+    kinds = list(scenario['mix'])
+    weights = [scenario['mix'][kind] for kind in kinds]
+    sequences = []
+    new_users = 0
+    for _ in range(scenario['sequences']):
+        kind = rnd.choices(kinds, weights)[0]
+
+        if kind in ('accept', 'reject'):
+            assignment_id, telegram_id = free_assignment()
+            if assignment_id is None:
+                kind = 'registration'
+            else:
+                sequence = [
+                    _callback(telegram_id, 'my_shifts'),
+                    _callback(telegram_id, f'{kind}_shift_{assignment_id}'),
+                ]
+        elif kind != 'registration':
+            telegram_id = free_rider()
+            if telegram_id is None:
+                kind = 'registration'
+            elif kind == 'availability':
+                sequence = _availability_sequence(telegram_id, rnd)
+            else:
+                sequence = [
+                    _message(telegram_id, '/start'),
+                    _callback(telegram_id, 'my_shifts'),
+                    _callback(telegram_id, 'available_shifts'),
+                ]
+
+        # Registrazioni anche quando i rider esistenti sono esauriti
+        if kind == 'registration':
+            telegram_id = NEW_TELEGRAM_ID + new_users
+            new_users += 1
+            sequence = [
+                _message(telegram_id, '/start'),
+                _callback(telegram_id, 'register_rider'),
+                _message(telegram_id, contact={'phone_number': '+393331234567'}),
+                _callback(telegram_id, f"transport_{rnd.choice(['bike', 'scooter', 'car'])}"),
+                _callback(telegram_id, f"distance_{rnd.choice([5, 10, 15])}"),
+            ] + _availability_sequence(telegram_id, rnd)
+
+        used.add(telegram_id)
+        sequences.append(sequence)
+
+    # Interleaving casuale: ogni passo prende il prossimo update di una sequenza
+    stream = []
+    active = [iter(sequence) for sequence in sequences]
+    while active:
+        i = rnd.randrange(len(active))
+        update = next(active[i], None)
+        if update is None:
+            active[i] = active[-1]
+            active.pop()
+            continue
+        stream.append(update)
+    return number_updates(stream)
+
+
+def number_updates(updates):
+    """update_id consecutivi da 1 e id univoci per le callback query"""
+    for update_id, update in enumerate(updates, 1):
+        update['update_id'] = update_id
+        if 'callback_query' in update:
+            update['callback_query']['id'] = f"bench{update_id}"
+    return updates
+
+
+def load_stream(path):
+    """Stream registrato: un update JSON per riga"""
+    with open(path) as stream_file:
+        return number_updates([json.loads(line) for line in stream_file if line.strip()])
+
+
+def update_kind(update):
+    """Etichetta per raggruppare le latenze (route, comando o tipo di messaggio)"""
+    if 'callback_query' in update:
+        route, _ = callbacks.resolve(update['callback_query'].get('data', ''))
+        return f"callback {route.key}" if route else 'callback ?'
+    message = update.get('message', {})
+    if 'contact' in message:
+        return 'contact'
+    if 'location' in message:
+        return 'location'
+    text = message.get('text', '')
+    if text.startswith('/'):
+        return f"command {command_key(text)}"
+    return 'text'
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class BenchmarkRun:
+    """Esegue lo stream nel bot tramite getUpdates e raccoglie le misure"""
+
+    def __init__(self, bot, workers=1):
+        self.bot = bot
+        self.workers = workers
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def measured(self, update):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            self.bot.process_update(update)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.append((update_kind(update), elapsed, queries.count))
+
+    def run(self):
+        from apps.telegram_bot.dispatcher import ShardedDispatcher
+
+        dispatcher = None
+        if self.workers > 1:
+            dispatcher = ShardedDispatcher(self.measured, workers=self.workers)
+            dispatcher.start()
+
+        offset = None
+        started = time.perf_counter()
+        try:
+            while True:
+                updates = self.bot.get_updates(offset)
+                if not updates or not updates.get('ok') or not updates['result']:
+                    break
+                for update in updates['result']:
+                    if dispatcher:
+                        dispatcher.submit(update)
+                    else:
+                        self.measured(update)
+                    offset = update['update_id'] + 1
+            if dispatcher:
+                dispatcher.join()
+        finally:
+            if dispatcher:
+                dispatcher.stop()
+        return time.perf_counter() - started
+
+    def report(self, elapsed, api_calls):
+        """Riepilogo serializzabile in JSON"""
+        latencies = [sample[1] for sample in self.samples]
+        queries = [sample[2] for sample in self.samples]
+        by_kind = defaultdict(list)
+        for kind, latency, count in self.samples:
+            by_kind[kind].append((latency, count))
+
+        total = len(self.samples)
+        return {
+            'updates': total,
+            'elapsed_seconds': round(elapsed, 3),
+            'updates_per_second': round(total / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(max(latencies, default=0) * 1000, 2),
+            'queries_per_update': round(sum(queries) / total, 2) if total else 0.0,
+            'queries_p99': percentile(queries, 0.99),
+            'api_calls': dict(api_calls),
+            'by_kind': {
+                kind: {
+                    'count': len(values),
+                    'p50_ms': round(percentile([value[0] for value in values], 0.50) * 1000, 2),
+                    'p99_ms': round(percentile([value[0] for value in values], 0.99) * 1000, 2),
+                    'queries_per_update': round(sum(value[1] for value in values) / len(values), 2),
+                }
+                for kind, values in sorted(by_kind.items())
+            },
+        }
@@ -9,51 +9,128 @@ Bot RiderMatch Completo
 
 import os
 import django
-import json
 import re
+import threading
 from datetime import datetime, time
+from time import perf_counter
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ridermatch.settings')
 django.setup()
 
-import requests
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connection
+from apps.riders.availability import get_weekly_availability
+from apps.riders.cache import get_rider
 from apps.riders.models import Rider, RiderAvailability
-from apps.shifts.models import Shift, ShiftAssignment
+from apps.shifts.feed import feed_page, parse_cursor
+from apps.shifts.models import ShiftAssignment
+from apps.shifts.services import NOT_FOUND, accept_assignment, reject_assignment
+from apps.shifts.tasks import match_shift, request_matching, request_rider_matching
 from apps.pizzerias.models import Pizzeria
+from apps.telegram_bot.api import TelegramAPI
+from apps.telegram_bot import notifications
+from apps.telegram_bot.dispatcher import ShardedDispatcher
+from apps.telegram_bot.notifications import SHIFT_CARD_FIELDS
+from apps.telegram_bot.outbox import OutboxSender
+from apps.telegram_bot.rendering import (
+    ADD_AVAILABILITY_TEXT, AVAILABILITY_ADDED_KEYBOARD, AVAILABILITY_KEYBOARD, available_shifts_keyboard,
+    CONTACT_KEYBOARD, DAY_KEYBOARD, DAYS, DISTANCE_KEYBOARD, MAIN_MENU_KEYBOARD, MY_SHIFTS_KEYBOARD,
+    NO_AVAILABLE_SHIFTS_TEXT, NO_SHIFTS_KEYBOARD, NO_SHIFTS_TEXT, OTHER_SHIFTS_KEYBOARD, REGISTER_TEXT,
+    REGISTERED_KEYBOARD, RIDER_MENU_KEYBOARD, SHIFT_CONFIRMED_KEYBOARD, SHIFT_REJECTED_TEXT, TIME_FORMAT_TEXTS,
+    TRANSPORT_KEYBOARD, TRANSPORT_NAMES, WELCOME_KEYBOARD, WELCOME_TEXT, format_time, serialize_markup,
+    shift_card
+)
+from apps.telegram_bot.replies import (
+    EDIT_FALLBACK, EDIT_SKIPPED, EDITED_MARKUP, EDITED_TEXT, NOT_EDITABLE, MessageHashes, editing,
+    is_inline, keep_callback_message, take_editable
+)
+from apps.telegram_bot.router import callbacks, command_key, commands, route_stats
+from apps.telegram_bot.state import get_state_store
+from apps.telegram_bot.update_queue import claim_callback
+from ridermatch.cache import cache_stats
+from ridermatch.metrics import COUNT_BUCKETS, Histogram, QueryCounter, start_metrics_server
+
+UPDATE_SECONDS = Histogram('ridermatch_bot_update_seconds', "Durata del processamento di un update")
+UPDATE_QUERIES = Histogram(
+    'ridermatch_bot_update_db_queries', "Query al database per update", buckets=COUNT_BUCKETS
+)
 
 class RiderMatchBot:
     def __init__(self):
         self.token = settings.TELEGRAM_BOT_TOKEN
-        self.base_url = f"https://api.telegram.org/bot{self.token}"
-        # Stati utente per conversation flow
-        self.user_states = {}
+        # Sessione HTTP con connessioni keep-alive riutilizzate
+        self.api = TelegramAPI(self.token)
+        # Stati utente per conversation flow (memoria o Redis, con scadenza)
+        self.user_states = get_state_store()
+        # Ultimo contenuto dei messaggi inviati: le modifiche identiche si saltano
+        self.message_hashes = MessageHashes()
+    
+    def api_call(self, method, data=None, timeout=None):
+        """Chiama un metodo della Bot API"""
+        return self.api.call(method, data, timeout=timeout)
     
     def send_message(self, chat_id, text, reply_markup=None):
-        """Invia un messaggio"""
-        url = f"{self.base_url}/sendMessage"
+        """Invia un messaggio (durante un callback modifica quello del bottone)"""
+        # Le tastiere statiche arrivano già serializzate
+        reply_markup = serialize_markup(reply_markup)
+        message_id = take_editable(chat_id) if is_inline(reply_markup) else None
+        if message_id is not None:
+            result = self.edit_message(chat_id, message_id, text, reply_markup)
+            if result is not NOT_EDITABLE:
+                return result
+            EDIT_FALLBACK.inc()
+        
         data = {
             'chat_id': chat_id,
             'text': text,
             'parse_mode': 'HTML'
         }
         if reply_markup:
-            data['reply_markup'] = json.dumps(reply_markup)
+            data['reply_markup'] = reply_markup
         
-        try:
-            response = requests.post(url, data=data)
-            return response.json()
-        except Exception as e:
-            print(f"Errore invio messaggio: {e}")
-            return None
+        result = self.api_call('sendMessage', data)
+        if result and result.get('ok'):
+            self.message_hashes.remember(chat_id, result['result']['message_id'], text, reply_markup)
+        return result
+    
+    def edit_message(self, chat_id, message_id, text, reply_markup):
+        """Modifica un messaggio del bot; NOT_EDITABLE se Telegram la rifiuta
+        (troppo vecchio, cancellato), None per errore di rete"""
+        text_changed, markup_changed = self.message_hashes.changes(chat_id, message_id, text, reply_markup)
+        if not (text_changed or markup_changed):
+            # Es. "Aggiorna" senza novità: nessuna chiamata
+            EDIT_SKIPPED.inc()
+            return {'ok': True, 'result': True}
+        
+        data = {'chat_id': chat_id, 'message_id': message_id, 'reply_markup': reply_markup}
+        if text_changed:
+            data['text'] = text
+            data['parse_mode'] = 'HTML'
+            result = self.api_call('editMessageText', data)
+        else:
+            result = self.api_call('editMessageReplyMarkup', data)
+        
+        if result is None:
+            # Errore di rete: la modifica può essere arrivata, meglio non duplicare
+            return result
+        if result.get('ok') or 'message is not modified' in result.get('description', ''):
+            (EDITED_TEXT if text_changed else EDITED_MARKUP).inc()
+            self.message_hashes.remember(chat_id, message_id, text, reply_markup)
+            return result
+        return NOT_EDITABLE
+    
+    def answer_callback_query(self, callback_id):
+        """Conferma la ricezione di un callback"""
+        return self.api_call('answerCallbackQuery', {'callback_query_id': callback_id})
     
     def get_rider_by_telegram_id(self, telegram_id):
-        """Trova rider dal Telegram ID"""
-        try:
-            return Rider.objects.get(telegram_id=telegram_id)
-        except Rider.DoesNotExist:
-            return None
+        """Trova rider dal Telegram ID (cache read-through, user incluso)"""
+        return get_rider(telegram_id)
     
+    @callbacks.route('main_menu')
+    @commands.route('/start')
+    @commands.route('/menu')
+    @commands.route('/help')
     def handle_start(self, chat_id, telegram_id, user_name):
         """Gestisce comando /start"""
         rider = self.get_rider_by_telegram_id(telegram_id)
@@ -69,71 +146,26 @@ Sei registrato come <b>{rider.get_transport_type_display()}</b>
 ⭐ Rating: {rider.rating}/5.00
 
 <b>Cosa vuoi fare?</b>
-            """
+"""
             
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '📅 Gestisci Disponibilità', 'callback_data': 'manage_availability'}],
-                    [{'text': '🍕 I Miei Turni', 'callback_data': 'my_shifts'}],
-                    [{'text': '🆓 Turni Disponibili', 'callback_data': 'available_shifts'}],
-                    [{'text': '👤 Il Mio Profilo', 'callback_data': 'my_profile'}]
-                ]
-            }
+            keyboard = RIDER_MENU_KEYBOARD
         else:
             # Nuovo utente - registrazione
-            message = f"""
-🍕 <b>Benvenuto in RiderMatch, {user_name}!</b> 🏍️
-
-Non sei ancora registrato come rider.
-
-<b>RiderMatch</b> è il sistema che collega rider e pizzerie per turni di consegna.
-
-<b>Come rider potrai:</b>
-• 📅 Impostare le tue disponibilità
-• 🍕 Ricevere turni automaticamente
-• 💰 Guadagnare con consegne
-• ⭐ Costruire la tua reputazione
-
-<b>Vuoi registrarti?</b>
-            """
-            
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '✅ Registrati come Rider', 'callback_data': 'register_rider'}],
-                    [{'text': '❓ Più Informazioni', 'callback_data': 'more_info'}]
-                ]
-            }
+            message = WELCOME_TEXT.format(user_name=user_name)
+            keyboard = WELCOME_KEYBOARD
         
         self.send_message(chat_id, message, keyboard)
     
+    @callbacks.route('register_rider')
     def handle_register_rider(self, chat_id, telegram_id, user_name):
         """Inizia processo registrazione rider"""
-        message = """
-📝 <b>REGISTRAZIONE RIDER</b>
-
-Per registrarti ho bisogno di alcune informazioni:
-
-<b>Inviami il tuo numero di telefono</b>
-Esempio: +393331234567
-
-Oppure usa il pulsante qui sotto per condividerlo automaticamente.
-        """
-        
-        keyboard = {
-            'keyboard': [
-                [{'text': '📱 Condividi Numero', 'request_contact': True}]
-            ],
-            'resize_keyboard': True,
-            'one_time_keyboard': True
-        }
-        
         # Salva stato utente
-        self.user_states[telegram_id] = {
+        self.user_states.set(telegram_id, {
             'state': 'waiting_phone',
             'user_name': user_name
-        }
+        })
         
-        self.send_message(chat_id, message, keyboard)
+        self.send_message(chat_id, REGISTER_TEXT, CONTACT_KEYBOARD)
     
     def handle_phone_received(self, chat_id, telegram_id, phone):
         """Gestisce numero telefono ricevuto"""
@@ -141,56 +173,32 @@ Oppure usa il pulsante qui sotto per condividerlo automaticamente.
 ✅ <b>Numero salvato:</b> {phone}
 
 <b>Che mezzo di trasporto usi?</b>
-        """
-        
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '🚲 Bicicletta', 'callback_data': 'transport_bike'}],
-                [{'text': '🛵 Scooter', 'callback_data': 'transport_scooter'}],
-                [{'text': '🚗 Auto', 'callback_data': 'transport_car'}]
-            ]
-        }
+"""
         
         # Aggiorna stato
-        self.user_states[telegram_id]['state'] = 'waiting_transport'
-        self.user_states[telegram_id]['phone'] = phone
+        self.user_states.update(telegram_id, state='waiting_transport', phone=phone)
         
-        self.send_message(chat_id, message, keyboard)
+        self.send_message(chat_id, message, TRANSPORT_KEYBOARD)
     
+    @callbacks.route('transport_', arg='transport')
     def handle_transport_selected(self, chat_id, telegram_id, transport):
         """Gestisce selezione mezzo trasporto"""
-        transport_names = {
-            'bike': '🚲 Bicicletta',
-            'scooter': '🛵 Scooter', 
-            'car': '🚗 Auto'
-        }
-        
         message = f"""
-✅ <b>Mezzo di trasporto:</b> {transport_names[transport]}
+✅ <b>Mezzo di trasporto:</b> {TRANSPORT_NAMES[transport]}
 
 <b>Qual è la distanza massima che vuoi percorrere?</b>
 (in chilometri)
-        """
-        
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '5 km', 'callback_data': 'distance_5'}],
-                [{'text': '10 km', 'callback_data': 'distance_10'}],
-                [{'text': '15 km', 'callback_data': 'distance_15'}],
-                [{'text': '20 km', 'callback_data': 'distance_20'}],
-                [{'text': '25+ km', 'callback_data': 'distance_25'}]
-            ]
-        }
+"""
         
         # Aggiorna stato
-        self.user_states[telegram_id]['state'] = 'waiting_distance'
-        self.user_states[telegram_id]['transport'] = transport
+        self.user_states.update(telegram_id, state='waiting_distance', transport=transport)
         
-        self.send_message(chat_id, message, keyboard)
+        self.send_message(chat_id, message, DISTANCE_KEYBOARD)
     
+    @callbacks.route('distance_', arg='distance', parse=int)
     def handle_distance_selected(self, chat_id, telegram_id, distance):
         """Completa registrazione rider"""
-        user_data = self.user_states[telegram_id]
+        user_data = self.user_states.get(telegram_id) or {}
         
         try:
             # Crea utente Django
@@ -211,42 +219,50 @@ Oppure usa il pulsante qui sotto per condividerlo automaticamente.
                 max_distance_km=distance
             )
             
-            transport_names = {
-                'bike': '🚲 Bicicletta',
-                'scooter': '🛵 Scooter', 
-                'car': '🚗 Auto'
-            }
-            
             message = f"""
 🎉 <b>REGISTRAZIONE COMPLETATA!</b>
 
 <b>I tuoi dati:</b>
 👤 {django_user.first_name}
 📱 {user_data['phone']}
-🚗 {transport_names[user_data['transport']]}
+🚗 {TRANSPORT_NAMES[user_data['transport']]}
 📍 Distanza max: {distance}km
 ⭐ Rating iniziale: 5.00/5
 
 <b>Prossimo passo:</b> Imposta le tue disponibilità per ricevere turni automaticamente!
-            """
-            
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '📅 Imposta Disponibilità', 'callback_data': 'manage_availability'}],
-                    [{'text': '🏠 Menu Principale', 'callback_data': 'main_menu'}]
-                ]
-            }
+📍 Inviami la tua posizione per ricevere solo turni vicini a te.
+"""
             
             # Pulisci stato
-            if telegram_id in self.user_states:
-                del self.user_states[telegram_id]
+            self.user_states.delete(telegram_id)
             
-            self.send_message(chat_id, message, keyboard)
+            self.send_message(chat_id, message, REGISTERED_KEYBOARD)
             
         except Exception as e:
             print(f"Errore registrazione: {e}")
             self.send_message(chat_id, "❌ Errore durante la registrazione. Riprova più tardi.")
     
+    def handle_location_received(self, chat_id, telegram_id, latitude, longitude):
+        """Salva la posizione di partenza del rider"""
+        rider = self.get_rider_by_telegram_id(telegram_id)
+        if not rider:
+            self.send_message(chat_id, "❌ Devi prima registrarti come rider!")
+            return
+        
+        rider.home_latitude = round(latitude, 6)
+        rider.home_longitude = round(longitude, 6)
+        rider.save(update_fields=['home_latitude', 'home_longitude'])
+        
+        message = f"""
+📍 <b>Posizione salvata!</b>
+
+Riceverai solo turni di pizzerie entro <b>{rider.max_distance_km}km</b> da qui.
+"""
+        
+        self.send_message(chat_id, message, MAIN_MENU_KEYBOARD)
+    
+    @callbacks.route('manage_availability')
+    @commands.route('/disponibilita')
     def handle_manage_availability(self, chat_id, telegram_id):
         """Gestisce disponibilità rider"""
         rider = self.get_rider_by_telegram_id(telegram_id)
@@ -254,91 +270,47 @@ Oppure usa il pulsante qui sotto per condividerlo automaticamente.
             self.send_message(chat_id, "❌ Devi prima registrarti come rider!")
             return
         
-        # Mostra disponibilità attuali
-        availabilities = RiderAvailability.objects.filter(rider=rider)
+        # Mostra disponibilità attuali (una query, o nessuna se in cache)
+        weekly = get_weekly_availability(rider.id)
         
-        message = "<b>📅 LA TUA DISPONIBILITÀ</b>\n\n"
+        parts = ["<b>📅 LA TUA DISPONIBILITÀ</b>\n\n"]
         
-        days = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
-        
-        for i, day in enumerate(days):
-            day_avail = availabilities.filter(day_of_week=i)
-            message += f"<b>{day}:</b> "
+        for i, day in enumerate(DAYS):
+            day_avail = weekly.windows(i)
+            parts.append(f"<b>{day}:</b> ")
             
-            if day_avail.exists():
-                for avail in day_avail:
-                    pref = "⭐" if avail.is_preferred else ""
-                    message += f"{avail.start_time.strftime('%H:%M')}-{avail.end_time.strftime('%H:%M')}{pref} "
+            if day_avail:
+                for start_time, end_time, is_preferred in day_avail:
+                    pref = "⭐" if is_preferred else ""
+                    parts.append(f"{format_time(start_time)}-{format_time(end_time)}{pref} ")
             else:
-                message += "Non disponibile"
-            message += "\n"
+                parts.append("Non disponibile")
+            parts.append("\n")
         
-        message += "\n⭐ = Orario preferito (priorità alta)"
+        parts.append("\n⭐ = Orario preferito (priorità alta)")
         
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '➕ Aggiungi Disponibilità', 'callback_data': 'add_availability'}],
-                [{'text': '🗑️ Cancella Disponibilità', 'callback_data': 'remove_availability'}],
-                [{'text': '🏠 Menu Principale', 'callback_data': 'main_menu'}]
-            ]
-        }
-        
-        self.send_message(chat_id, message, keyboard)
+        self.send_message(chat_id, ''.join(parts), AVAILABILITY_KEYBOARD)
     
+    @callbacks.route('add_availability')
     def handle_add_availability(self, chat_id, telegram_id):
         """Aggiunge disponibilità"""
-        message = """
-📅 <b>AGGIUNGI DISPONIBILITÀ</b>
-
-<b>Seleziona il giorno:</b>
-        """
-        
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': 'Lunedì', 'callback_data': 'day_0'}],
-                [{'text': 'Martedì', 'callback_data': 'day_1'}],
-                [{'text': 'Mercoledì', 'callback_data': 'day_2'}],
-                [{'text': 'Giovedì', 'callback_data': 'day_3'}],
-                [{'text': 'Venerdì', 'callback_data': 'day_4'}],
-                [{'text': 'Sabato', 'callback_data': 'day_5'}],
-                [{'text': 'Domenica', 'callback_data': 'day_6'}],
-                [{'text': '🔙 Indietro', 'callback_data': 'manage_availability'}]
-            ]
-        }
-        
-        self.user_states[telegram_id] = {'state': 'selecting_day'}
-        self.send_message(chat_id, message, keyboard)
+        self.user_states.set(telegram_id, {'state': 'selecting_day'})
+        self.send_message(chat_id, ADD_AVAILABILITY_TEXT, DAY_KEYBOARD)
     
+    @callbacks.route('day_', arg='day_num', parse=int)
     def handle_day_selected(self, chat_id, telegram_id, day_num):
         """Giorno selezionato per disponibilità"""
-        days = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
-        
-        message = f"""
-📅 <b>DISPONIBILITÀ {days[day_num].upper()}</b>
-
-<b>Invia l'orario nel formato:</b>
-<code>HH:MM-HH:MM</code>
-
-<b>Esempi:</b>
-• <code>19:00-23:00</code> (sera)
-• <code>12:00-14:30</code> (pranzo)
-• <code>18:30-22:00</code> (sera)
-
-<b>Per orario preferito aggiungi *:</b>
-• <code>19:00-23:00*</code> (priorità alta)
-        """
-        
-        self.user_states[telegram_id] = {
+        self.user_states.set(telegram_id, {
             'state': 'waiting_time',
             'day': day_num
-        }
+        })
         
-        self.send_message(chat_id, message)
+        self.send_message(chat_id, TIME_FORMAT_TEXTS[day_num])
     
     def handle_time_received(self, chat_id, telegram_id, time_text):
         """Gestisce orario ricevuto"""
         rider = self.get_rider_by_telegram_id(telegram_id)
-        user_data = self.user_states[telegram_id]
+        user_data = self.user_states.get(telegram_id) or {}
         day_num = user_data['day']
         
         try:
@@ -365,30 +337,20 @@ Oppure usa il pulsante qui sotto per condividerlo automaticamente.
                 is_preferred=is_preferred
             )
             
-            days = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
             pref_text = " (⭐ Preferito)" if is_preferred else ""
             
             message = f"""
 ✅ <b>Disponibilità aggiunta!</b>
 
-<b>{days[day_num]}:</b> {start_time.strftime('%H:%M')}-{end_time.strftime('%H:%M')}{pref_text}
+<b>{DAYS[day_num]}:</b> {format_time(start_time)}-{format_time(end_time)}{pref_text}
 
 Ora puoi ricevere turni automaticamente in questo orario!
-            """
-            
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '➕ Aggiungi Altro Orario', 'callback_data': 'add_availability'}],
-                    [{'text': '📅 Vedi Disponibilità', 'callback_data': 'manage_availability'}],
-                    [{'text': '🏠 Menu Principale', 'callback_data': 'main_menu'}]
-                ]
-            }
+"""
             
             # Pulisci stato
-            if telegram_id in self.user_states:
-                del self.user_states[telegram_id]
+            self.user_states.delete(telegram_id)
             
-            self.send_message(chat_id, message, keyboard)
+            self.send_message(chat_id, message, AVAILABILITY_ADDED_KEYBOARD)
             
             # Triggera matching automatico
             self.check_automatic_matching(rider)
@@ -400,275 +362,153 @@ Ora puoi ricevere turni automaticamente in questo orario!
                 "Usa il formato: <code>HH:MM-HH:MM</code>\n"
                 "Esempio: <code>19:00-23:00</code>")
     
+    @callbacks.route('my_shifts')
+    @commands.route('/turni')
     def handle_my_shifts(self, chat_id, telegram_id):
         """Mostra turni del rider"""
-        rider = self.get_rider_by_telegram_id(telegram_id)
-        if not rider:
+        # Una sola query: assegnazioni + turno + pizzeria
+        assignments = list(
+            ShiftAssignment.objects.filter(
+                rider__telegram_id=telegram_id,
+                shift__status__in=['assigned', 'confirmed']
+            ).select_related('shift__pizzeria')
+            .only('confirmed_by_rider', *SHIFT_CARD_FIELDS)
+            .order_by('shift__date', 'shift__start_time')
+        )
+        
+        if not assignments and not self.get_rider_by_telegram_id(telegram_id):
             return
         
-        assignments = ShiftAssignment.objects.filter(
-            rider=rider,
-            shift__status__in=['assigned', 'confirmed']
-        ).order_by('shift__date', 'shift__start_time')
+        if not assignments:
+            self.send_message(chat_id, NO_SHIFTS_TEXT, NO_SHIFTS_KEYBOARD)
+            return
         
-        if not assignments.exists():
-            message = """
-📋 <b>I MIEI TURNI</b>
-
-Non hai turni assegnati al momento.
-
-<b>Suggerimenti:</b>
-• Controlla che la tua disponibilità sia aggiornata
-• I turni vengono assegnati automaticamente
-• Controlla i turni disponibili
-            """
-            
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '📅 Aggiorna Disponibilità', 'callback_data': 'manage_availability'}],
-                    [{'text': '🆓 Turni Disponibili', 'callback_data': 'available_shifts'}]
-                ]
-            }
-        else:
-            message = "<b>📋 I MIEI TURNI</b>\n\n"
-            
-            for assignment in assignments:
-                shift = assignment.shift
-                status_emoji = "✅" if assignment.confirmed_by_rider else "⏳"
-                
-                message += f"{status_emoji} <b>{shift.pizzeria.name}</b>\n"
-                message += f"   📅 {shift.date.strftime('%d/%m/%Y')}\n"
-                message += f"   ⏰ {shift.start_time.strftime('%H:%M')} - {shift.end_time.strftime('%H:%M')}\n"
-                message += f"   💰 €{shift.hourly_rate}/ora\n"
-                message += f"   📍 {shift.pizzeria.address}\n"
-                
-                if not assignment.confirmed_by_rider:
-                    message += "   ⚠️ <b>DA CONFERMARE</b>\n"
-                
-                message += "\n"
+        parts = ["<b>📋 I MIEI TURNI</b>\n\n"]
+        for assignment in assignments:
+            shift = assignment.shift
+            status_emoji = "✅" if assignment.confirmed_by_rider else "⏳"
             
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '✅ Conferma Turni', 'callback_data': 'confirm_shifts'}],
-                    [{'text': '🔄 Aggiorna', 'callback_data': 'my_shifts'}]
-                ]
-            }
-        
-        keyboard['inline_keyboard'].append([{'text': '🏠 Menu Principale', 'callback_data': 'main_menu'}])
-        self.send_message(chat_id, message, keyboard)
-    
-    def check_automatic_matching(self, rider=None):
-        """Esegue matching automatico"""
-        from apps.shifts.matching import ShiftMatcher
+            parts.append(shift_card(shift, f"{status_emoji} <b>{shift.pizzeria.name}</b>", indent='   '))
+            if not assignment.confirmed_by_rider:
+                parts.append("   ⚠️ <b>DA CONFERMARE</b>\n")
+            parts.append("\n")
         
+        self.send_message(chat_id, ''.join(parts), MY_SHIFTS_KEYBOARD)
+    
+    def check_automatic_matching(self, rider=None, shift=None, exclude_riders=()):
+        """Richiede il matching automatico (task Celery, fuori dal processo del bot)"""
         try:
-            matcher = ShiftMatcher()
-            assignments = matcher.batch_assign_shifts()
-            
-            if assignments > 0:
-                print(f"🎯 Matching automatico: {assignments} turni assegnati")
-                # Notifica i rider che hanno ricevuto nuovi turni
-                self.notify_new_assignments()
+            if shift:
+                # Turno liberato: matching incrementale del solo turno
+                match_shift.delay(shift.id, list(exclude_riders))
+            elif rider:
+                # Disponibilità cambiate: solo i turni del rider (modifiche ravvicinate raggruppate)
+                request_rider_matching(rider.id)
+            else:
+                # Altrimenti un matching completo (richieste ravvicinate raggruppate)
+                request_matching()
             
         except Exception as e:
             print(f"Errore matching automatico: {e}")
     
     def notify_new_assignments(self):
-        """Notifica rider di nuove assegnazioni"""
-        try:
-            # Trova assegnazioni recenti non ancora confermate
-            from datetime import timedelta
-            from django.utils import timezone
-            
-            recent_assignments = ShiftAssignment.objects.filter(
-                assigned_at__gte=timezone.now() - timedelta(minutes=5),
-                confirmed_by_rider=False
-            )
-            
-            for assignment in recent_assignments:
-                rider = assignment.rider
-                shift = assignment.shift
-                
-                message = f"""
-🎉 <b>NUOVO TURNO ASSEGNATO!</b>
-
-<b>🍕 {shift.pizzeria.name}</b>
-📅 {shift.date.strftime('%d/%m/%Y')}
-⏰ {shift.start_time.strftime('%H:%M')} - {shift.end_time.strftime('%H:%M')}
-💰 €{shift.hourly_rate}/ora
-📍 {shift.pizzeria.address}
-
-⚠️ <b>Conferma entro 30 minuti</b> o il turno verrà riassegnato!
-                """
-                
-                keyboard = {
-                    'inline_keyboard': [
-                        [{'text': '✅ Accetto il Turno', 'callback_data': f'accept_shift_{assignment.id}'}],
-                        [{'text': '❌ Rifiuta Turno', 'callback_data': f'reject_shift_{assignment.id}'}],
-                        [{'text': '📋 I Miei Turni', 'callback_data': 'my_shifts'}]
-                    ]
-                }
-                
-                self.send_message(rider.telegram_id, message, keyboard)
-                
-        except Exception as e:
-            print(f"Errore notifica assegnazioni: {e}")
+        """Notifica rider di nuove assegnazioni (accodate nell'outbox)"""
+        notifications.notify_new_assignments()
+    
+    def notify_expired_assignments(self, released):
+        """Avvisa i rider le cui assegnazioni sono scadute ({shift_id: rider_id})"""
+        notifications.notify_expired_assignments(released)
     
     def handle_callback(self, chat_id, telegram_id, message_id, callback_data, user_name):
-        """Gestisce callback dei bottoni"""
-        
-        if callback_data == 'main_menu':
-            self.handle_start(chat_id, telegram_id, user_name)
-        
-        elif callback_data == 'register_rider':
-            self.handle_register_rider(chat_id, telegram_id, user_name)
-        
-        elif callback_data.startswith('transport_'):
-            transport = callback_data.replace('transport_', '')
-            self.handle_transport_selected(chat_id, telegram_id, transport)
-        
-        elif callback_data.startswith('distance_'):
-            distance = int(callback_data.replace('distance_', ''))
-            self.handle_distance_selected(chat_id, telegram_id, distance)
-        
-        elif callback_data == 'manage_availability':
-            self.handle_manage_availability(chat_id, telegram_id)
-        
-        elif callback_data == 'add_availability':
-            self.handle_add_availability(chat_id, telegram_id)
-        
-        elif callback_data.startswith('day_'):
-            day_num = int(callback_data.replace('day_', ''))
-            self.handle_day_selected(chat_id, telegram_id, day_num)
-        
-        elif callback_data == 'my_shifts':
-            self.handle_my_shifts(chat_id, telegram_id)
-        
-        elif callback_data == 'available_shifts':
-            self.handle_available_shifts(chat_id, telegram_id)
-        
-        elif callback_data.startswith('accept_shift_'):
-            assignment_id = int(callback_data.replace('accept_shift_', ''))
-            self.handle_accept_shift(chat_id, telegram_id, assignment_id)
-        
-        elif callback_data.startswith('reject_shift_'):
-            assignment_id = int(callback_data.replace('reject_shift_', ''))
-            self.handle_reject_shift(chat_id, telegram_id, assignment_id)
+        """Gestisce callback dei bottoni (la risposta modifica il messaggio del bottone)"""
+        with editing(chat_id, message_id):
+            callbacks.dispatch(
+                self, callback_data,
+                chat_id=chat_id, telegram_id=telegram_id, message_id=message_id, user_name=user_name
+            )
     
-    def handle_available_shifts(self, chat_id, telegram_id):
-        """Mostra turni disponibili"""
-        shifts = Shift.objects.filter(status='open')[:5]
+    @callbacks.route('available_shifts')
+    @callbacks.route('available_shifts_', arg='cursor', parse=parse_cursor)
+    def handle_available_shifts(self, chat_id, telegram_id, cursor=None):
+        """Mostra i turni adatti al rider, dal più pertinente, una pagina alla volta"""
+        rider = self.get_rider_by_telegram_id(telegram_id)
+        if not rider:
+            self.send_message(chat_id, "❌ Devi prima registrarti come rider!")
+            return
         
-        if not shifts.exists():
-            message = """
-🔍 <b>TURNI DISPONIBILI</b>
-
-Nessun turno disponibile al momento.
-
-I turni vengono assegnati automaticamente in base alla tua disponibilità.
-            """
-        else:
-            message = "<b>🆓 TURNI DISPONIBILI</b>\n\n"
-            
-            for i, shift in enumerate(shifts, 1):
-                message += f"<b>{i}. 🍕 {shift.pizzeria.name}</b>\n"
-                message += f"   📅 {shift.date.strftime('%d/%m/%Y')}\n"
-                message += f"   ⏰ {shift.start_time.strftime('%H:%M')} - {shift.end_time.strftime('%H:%M')}\n"
-                message += f"   💰 €{shift.hourly_rate}/ora\n"
-                message += f"   📍 {shift.pizzeria.address}\n\n"
-            
-            message += "ℹ️ I turni vengono assegnati automaticamente in base alla disponibilità e posizione."
-        
-        keyboard = {
-            'inline_keyboard': [
-                [{'text': '🔄 Aggiorna Lista', 'callback_data': 'available_shifts'}],
-                [{'text': '📅 La Mia Disponibilità', 'callback_data': 'manage_availability'}],
-                [{'text': '🏠 Menu Principale', 'callback_data': 'main_menu'}]
-            ]
-        }
+        shifts, position, next_cursor = feed_page(rider, cursor)
         
-        self.send_message(chat_id, message, keyboard)
+        if not shifts:
+            message = NO_AVAILABLE_SHIFTS_TEXT
+        else:
+            parts = ["<b>🆓 TURNI DISPONIBILI PER TE</b>\n\n"]
+            for i, shift in enumerate(shifts, position):
+                parts.append(shift_card(shift, f"<b>{i}. 🍕 {shift.pizzeria.name}</b>", indent='   '))
+                parts.append("\n")
+            parts.append("ℹ️ Turni nei tuoi orari e entro la tua distanza, dal più adatto a te.")
+            message = ''.join(parts)
+        
+        self.send_message(chat_id, message, available_shifts_keyboard(next_cursor))
     
+    @callbacks.route('accept_shift_', arg='assignment_id', parse=int)
     def handle_accept_shift(self, chat_id, telegram_id, assignment_id):
         """Accetta un turno assegnato"""
+        # La notifica può essere un riepilogo con altri turni: resta con i suoi bottoni
+        keep_callback_message()
         try:
-            assignment = ShiftAssignment.objects.get(
-                id=assignment_id,
-                rider__telegram_id=telegram_id
-            )
-            
-            assignment.confirmed_by_rider = True
-            assignment.save()
+            # Conferma condizionata: doppio tap o assegnazione scaduta non creano stati incoerenti
+            outcome, assignment = accept_assignment(assignment_id, telegram_id)
+            if outcome == NOT_FOUND:
+                self.send_message(chat_id, "⌛ Questo turno non è più disponibile.")
+                return
             
             shift = assignment.shift
             
-            message = f"""
-✅ <b>TURNO CONFERMATO!</b>
-
-<b>🍕 {shift.pizzeria.name}</b>
-📅 {shift.date.strftime('%d/%m/%Y')}
-⏰ {shift.start_time.strftime('%H:%M')} - {shift.end_time.strftime('%H:%M')}
-💰 €{shift.hourly_rate}/ora
-📍 {shift.pizzeria.address}
-📞 {shift.pizzeria.phone}
-
-<b>Il turno è confermato!</b>
-La pizzeria è stata notificata.
-            """
-            
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '📋 I Miei Turni', 'callback_data': 'my_shifts'}],
-                    [{'text': '🏠 Menu Principale', 'callback_data': 'main_menu'}]
-                ]
-            }
+            message = (
+                "\n✅ <b>TURNO CONFERMATO!</b>\n\n"
+                + shift_card(shift, f"<b>🍕 {shift.pizzeria.name}</b>", phone=True)
+                + "\n<b>Il turno è confermato!</b>\nLa pizzeria è stata notificata.\n"
+            )
             
-            self.send_message(chat_id, message, keyboard)
+            self.send_message(chat_id, message, SHIFT_CONFIRMED_KEYBOARD)
             
         except Exception as e:
             print(f"Errore accettazione turno: {e}")
             self.send_message(chat_id, "❌ Errore nell'accettazione del turno.")
     
+    @callbacks.route('reject_shift_', arg='assignment_id', parse=int)
     def handle_reject_shift(self, chat_id, telegram_id, assignment_id):
         """Rifiuta un turno assegnato"""
+        keep_callback_message()
         try:
-            assignment = ShiftAssignment.objects.get(
-                id=assignment_id,
-                rider__telegram_id=telegram_id
-            )
-            
-            shift = assignment.shift
-            shift.status = 'open'  # Torna disponibile
-            shift.save()
+            # Rimuove l'assegnazione e riapre il turno in un'unica transazione
+            outcome, shift, rider_id = reject_assignment(assignment_id, telegram_id)
+            if outcome == NOT_FOUND:
+                self.send_message(chat_id, "⌛ Questo turno non è più disponibile.")
+                return
             
-            assignment.delete()  # Rimuovi assegnazione
+            self.send_message(chat_id, SHIFT_REJECTED_TEXT, OTHER_SHIFTS_KEYBOARD)
             
-            message = """
-❌ <b>TURNO RIFIUTATO</b>
-
-Il turno è stato rimosso e tornerà disponibile per altri rider.
-
-⚠️ <b>Attenzione:</b> Rifiutare troppi turni può influire sul tuo rating.
-            """
-            
-            keyboard = {
-                'inline_keyboard': [
-                    [{'text': '🆓 Altri Turni Disponibili', 'callback_data': 'available_shifts'}],
-                    [{'text': '🏠 Menu Principale', 'callback_data': 'main_menu'}]
-                ]
-            }
-            
-            self.send_message(chat_id, message, keyboard)
-            
-            # Triggera nuovo matching
-            self.check_automatic_matching()
+            # Triggera nuovo matching solo per il turno liberato
+            if shift:
+                self.check_automatic_matching(shift=shift, exclude_riders={rider_id})
             
         except Exception as e:
             print(f"Errore rifiuto turno: {e}")
             self.send_message(chat_id, "❌ Errore nel rifiuto del turno.")
     
     def process_update(self, update_data):
-        """Processa un aggiornamento da Telegram"""
+        """Processa un aggiornamento da Telegram (con durata e query contate)"""
+        queries = QueryCounter()
+        started = perf_counter()
+        try:
+            with connection.execute_wrapper(queries):
+                self._process_update(update_data)
+        finally:
+            UPDATE_SECONDS.observe(perf_counter() - started)
+            UPDATE_QUERIES.observe(queries.count)
+    
+    def _process_update(self, update_data):
         try:
             if 'message' in update_data:
                 message = update_data['message']
@@ -683,27 +523,27 @@ Il turno è stato rimosso e tornerà disponibile per altri rider.
                     self.handle_phone_received(chat_id, telegram_id, phone)
                     return
                 
+                # Gestisci posizione condivisa
+                if 'location' in message:
+                    location = message['location']
+                    self.handle_location_received(chat_id, telegram_id, location['latitude'], location['longitude'])
+                    return
+                
                 # Gestisci stati conversazione
-                if telegram_id in self.user_states:
-                    state = self.user_states[telegram_id]['state']
-                    
-                    if state == 'waiting_time':
-                        self.handle_time_received(chat_id, telegram_id, text)
-                        return
+                state = self.user_states.get_state(telegram_id)
+                if state == 'waiting_time':
+                    self.handle_time_received(chat_id, telegram_id, text)
+                    return
                 
                 # Comandi standard
-                if text.startswith('/start'):
-                    self.handle_start(chat_id, telegram_id, user_name)
-                elif text.startswith('/menu'):
-                    self.handle_start(chat_id, telegram_id, user_name)
-                elif text.startswith('/disponibilita'):
-                    self.handle_manage_availability(chat_id, telegram_id)
-                elif text.startswith('/turni'):
-                    self.handle_my_shifts(chat_id, telegram_id)
-                elif text.startswith('/help'):
-                    self.handle_start(chat_id, telegram_id, user_name)
+                if text.startswith('/') and commands.dispatch(
+                    self, command_key(text),
+                    chat_id=chat_id, telegram_id=telegram_id, user_name=user_name
+                ):
+                    return
+                
                 # Gestisci numero telefono manuale
-                elif telegram_id in self.user_states and self.user_states[telegram_id]['state'] == 'waiting_phone':
+                if state == 'waiting_phone':
                     self.handle_phone_received(chat_id, telegram_id, text)
                 else:
                     self.send_message(chat_id, 
@@ -718,29 +558,51 @@ Il turno è stato rimosso e tornerà disponibile per altri rider.
                 message_id = callback['message']['message_id']
                 callback_data = callback['data']
                 
-                self.handle_callback(chat_id, telegram_id, message_id, callback_data, user_name)
+                # Conferma subito il callback (Telegram lo riconsegna se la risposta tarda)
+                self.answer_callback_query(callback['id'])
                 
-                # Conferma callback
-                callback_id = callback['id']
-                requests.post(f"{self.base_url}/answerCallbackQuery", 
-                            data={'callback_query_id': callback_id})
+                # Callback già processato: riconsegna, da ignorare
+                if not claim_callback(callback['id']):
+                    return
+                
+                self.handle_callback(chat_id, telegram_id, message_id, callback_data, user_name)
         
         except Exception as e:
             print(f"Errore processamento update: {e}")
     
     def get_updates(self, offset=None):
         """Recupera aggiornamenti"""
-        url = f"{self.base_url}/getUpdates"
-        params = {'timeout': 30}
+        poll_timeout = getattr(settings, 'BOT_POLL_TIMEOUT', 30)
+        params = {'timeout': poll_timeout}
         if offset:
             params['offset'] = offset
         
-        try:
-            response = requests.get(url, params=params)
-            return response.json()
-        except Exception as e:
-            print(f"Errore get updates: {e}")
+        # Il long poll resta aperto fino a poll_timeout secondi
+        return self.api_call('getUpdates', params, timeout=poll_timeout + 10)
+    
+    def start_outbox_sender(self):
+        """Avvia il sender dell'outbox in un thread (se abilitato)"""
+        if not getattr(settings, 'BOT_OUTBOX_SENDER_THREAD', True):
             return None
+        
+        stop_event = threading.Event()
+        sender = OutboxSender(TelegramAPI(self.token))
+        threading.Thread(
+            target=sender.run_forever,
+            args=(stop_event,),
+            name='ridermatch-outbox',
+            daemon=True
+        ).start()
+        return stop_event
+    
+    def start_metrics_server(self):
+        """Espone /metrics sulla porta BOT_METRICS_PORT (se impostata)"""
+        port = getattr(settings, 'BOT_METRICS_PORT', None)
+        if not port:
+            return None
+        host = getattr(settings, 'BOT_METRICS_HOST', '127.0.0.1')
+        print(f"📊 Metriche su {host}:{port}/metrics")
+        return start_metrics_server(port, host)
     
     def run_polling(self):
         """Avvia il bot"""
@@ -755,19 +617,49 @@ Il turno è stato rimosso e tornerà disponibile per altri rider.
         
         offset = None
         
+        # Con più worker gli update vengono processati in parallelo,
+        # mantenendo l'ordine per singolo utente
+        workers = getattr(settings, 'BOT_WORKERS', 1)
+        dispatcher = None
+        if workers > 1:
+            dispatcher = ShardedDispatcher(
+                self.process_update,
+                workers=workers,
+                queue_size=getattr(settings, 'BOT_SHARD_QUEUE_SIZE', 100)
+            )
+            dispatcher.start()
+            dispatcher.export_queue_depths()
+            print(f"⚙️  Dispatcher concorrente: {workers} worker")
+        
+        outbox_stop = self.start_outbox_sender()
+        self.start_metrics_server()
+        
         try:
             while True:
                 updates = self.get_updates(offset)
                 
                 if updates and updates.get('ok'):
                     for update in updates['result']:
-                        self.process_update(update)
+                        if dispatcher:
+                            dispatcher.submit(update)
+                        else:
+                            self.process_update(update)
                         offset = update['update_id'] + 1
                 
         except KeyboardInterrupt:
             print("\n🛑 Bot fermato!")
         except Exception as e:
             print(f"❌ Errore bot: {e}")
+        finally:
+            if dispatcher:
+                dispatcher.stop()
+            if outbox_stop:
+                outbox_stop.set()
+            for name, stats in cache_stats().items():
+                print(f"📦 Cache {name}: hit rate {stats['hit_rate']:.0%} ({stats['misses']} miss)")
+            for router_name, routes in route_stats().items():
+                for key, stats in list(routes.items())[:5]:
+                    print(f"⏱️ {router_name} {key}: {stats['calls']} chiamate, media {stats['avg_ms']:.1f}ms, max {stats['max_ms']:.0f}ms")
 
 if __name__ == "__main__":
     if not settings.TELEGRAM_BOT_TOKEN or settings.TELEGRAM_BOT_TOKEN == 'your_telegram_bot_token_here':
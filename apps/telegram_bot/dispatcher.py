@@ -0,0 +1,105 @@
+"""
+Dispatcher concorrente per gli update Telegram
+- Pool di worker di dimensione fissa
+- Sharding per telegram_id: gli update dello stesso utente
+  vengono processati sempre dallo stesso worker, in ordine
+- Code per shard limitate (backpressure sul long polling)
+- Conteggio degli update in corso, per limitare quelli prelevati in anticipo
+"""
+
+import queue
+import threading
+
+from django.db import close_old_connections
+
+from ridermatch.metrics import QUEUE_DEPTH
+
+_STOP = object()
+
+
+def update_telegram_id(update):
+    """Estrae il Telegram ID del mittente da un update"""
+    for key in ('message', 'edited_message', 'callback_query'):
+        if key in update:
+            sender = update[key].get('from')
+            if sender:
+                return sender['id']
+    # Update senza mittente: distribuiti per update_id
+    return update.get('update_id', 0)
+
+
+class ShardedDispatcher:
+    """Esegue gli update in parallelo mantenendo l'ordine per chat"""
+
+    def __init__(self, handler, workers=4, queue_size=100):
+        self.handler = handler
+        self.shards = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.threads = []
+        # Update accodati o in esecuzione
+        self.in_flight = 0
+        self._in_flight_changed = threading.Condition()
+
+    def start(self):
+        """Avvia un thread worker per ogni shard"""
+        for i, shard in enumerate(self.shards):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(shard,),
+                name=f"ridermatch-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, update):
+        """Accoda un update nello shard del mittente (blocca se la coda è piena)"""
+        shard = self.shards[update_telegram_id(update) % len(self.shards)]
+        with self._in_flight_changed:
+            self.in_flight += 1
+        shard.put(update)
+
+    def wait_for_room(self, limit, timeout=None):
+        """Attende che gli update in corso scendano sotto limit; restituisce i posti liberi"""
+        with self._in_flight_changed:
+            self._in_flight_changed.wait_for(lambda: self.in_flight < limit, timeout)
+            return max(limit - self.in_flight, 0)
+
+    def queue_depths(self):
+        """Numero di update in attesa per ogni shard"""
+        return [shard.qsize() for shard in self.shards]
+
+    def export_queue_depths(self):
+        """Profondità degli shard nelle metriche (letta all'esportazione)"""
+        for i, shard in enumerate(self.shards):
+            QUEUE_DEPTH.labels(f'shard_{i}').set_function(shard.qsize)
+
+    def join(self):
+        """Attende che tutti gli update accodati siano processati"""
+        for shard in self.shards:
+            shard.join()
+
+    def stop(self):
+        """Svuota le code e ferma i worker"""
+        for shard in self.shards:
+            shard.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _worker(self, shard):
+        while True:
+            update = shard.get()
+            try:
+                if update is _STOP:
+                    return
+                self.handler(update)
+            except Exception as e:
+                print(f"Errore worker dispatcher: {e}")
+            finally:
+                # Ogni thread ha la sua connessione DB: chiudi quelle scadute
+                close_old_connections()
+                if update is not _STOP:
+                    with self._in_flight_changed:
+                        self.in_flight -= 1
+                        self._in_flight_changed.notify_all()
+                shard.task_done()
@@ -0,0 +1,117 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from apps.telegram_bot.benchmark import SCENARIOS, BenchmarkRun, FakeBotAPI, build_stream, load_stream, seed_scenario
+
+
+class Command(BaseCommand):
+    help = "Misura throughput e latenza del bot su un database di test e una Bot API finta"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='smoke')
+        parser.add_argument('--seed', type=int, default=42,
+                            help="Seed di dati e stream (stesso seed = stesso benchmark)")
+        parser.add_argument('--replay', help="Stream registrato: un update JSON per riga")
+        parser.add_argument('--save-stream', help="Salva lo stream generato (JSON per riga)")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Worker del dispatcher (1 = sequenziale)")
+        parser.add_argument('--output', help="Salva il risultato in JSON")
+        parser.add_argument('--compare', help="Confronta con un risultato salvato in precedenza")
+
+    def handle(self, *args, **options):
+        scenario = SCENARIOS[options['scenario']]
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "⚠️  SQLite serializza le scritture: con più worker usa PostgreSQL per risultati affidabili"
+            ))
+        rnd = random.Random(options['seed'])
+
+        # Database di test separato: il benchmark non tocca i dati reali
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        api = FakeBotAPI()
+        try:
+            with override_settings(
+                TELEGRAM_API_URL=api.start(),
+                TELEGRAM_BOT_TOKEN='benchmark',
+                BOT_STATE_BACKEND='memory',
+                BOT_OUTBOX_SENDER_THREAD=False,
+                BOT_METRICS_PORT=None,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ):
+                result = self.run_benchmark(api, scenario, rnd, options)
+        finally:
+            api.stop()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.print_result(result)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(result, output_file, indent=2)
+        if options['compare']:
+            self.print_comparison(result, options['compare'])
+
+    def run_benchmark(self, api, scenario, rnd, options):
+        from apps.shifts.matching import ShiftMatcher
+        from apps.telegram_bot.complete_bot import RiderMatchBot
+
+        self.stdout.write(f"🌱 Scenario {options['scenario']}: {scenario['riders']} rider, "
+                          f"{scenario['pizzerias']} pizzerie, {scenario['shifts']} turni")
+        seed_scenario(scenario, rnd)
+        # Assegnazioni iniziali: servono agli update accetta/rifiuta
+        assigned = ShiftMatcher().batch_assign_shifts()
+        self.stdout.write(f"🎯 Assegnazioni iniziali: {assigned}")
+
+        if options['replay']:
+            try:
+                api.updates = load_stream(options['replay'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Stream non leggibile: {e}")
+        else:
+            api.updates = build_stream(scenario, rnd)
+        if options['save_stream']:
+            with open(options['save_stream'], 'w') as stream_file:
+                for update in api.updates:
+                    stream_file.write(json.dumps(update) + '\n')
+
+        self.stdout.write(f"▶️  Update da processare: {len(api.updates)}")
+        run = BenchmarkRun(RiderMatchBot(), workers=options['workers'])
+        elapsed = run.run()
+
+        result = run.report(elapsed, api.calls)
+        result.update(scenario=options['scenario'], seed=options['seed'], workers=options['workers'])
+        return result
+
+    def print_result(self, result):
+        self.stdout.write(
+            f"\n📊 {result['updates']} update in {result['elapsed_seconds']}s: "
+            f"{result['updates_per_second']} update/s"
+        )
+        self.stdout.write(
+            f"   Latenza p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, max {result['max_ms']}ms"
+        )
+        self.stdout.write(f"   Query per update: {result['queries_per_update']} (p99 {result['queries_p99']})")
+        self.stdout.write(f"   Chiamate Bot API: {result['api_calls']}")
+        self.stdout.write("\n   Tipo update                      n     p50ms    p99ms  query")
+        for kind, stats in result['by_kind'].items():
+            self.stdout.write(
+                f"   {kind:<30} {stats['count']:>5} {stats['p50_ms']:>9} {stats['p99_ms']:>8} "
+                f"{stats['queries_per_update']:>6}"
+            )
+
+    def print_comparison(self, result, path):
+        try:
+            with open(path) as baseline_file:
+                baseline = json.load(baseline_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Risultato di confronto non leggibile: {e}")
+
+        self.stdout.write(f"\n🔍 Confronto con {path}")
+        for key in ('updates_per_second', 'p50_ms', 'p99_ms', 'queries_per_update'):
+            before, after = baseline.get(key, 0), result[key]
+            change = f"{(after - before) / before:+.1%}" if before else "n/d"
+            self.stdout.write(f"   {key:<20} {before:>10} -> {after:<10} ({change})")
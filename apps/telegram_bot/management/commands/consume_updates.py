@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.telegram_bot.dispatcher import ShardedDispatcher
+from apps.telegram_bot.update_queue import claim_updates, complete_update, purge_processed
+
+
+class Command(BaseCommand):
+    help = "Processa gli update ricevuti via webhook (un solo consumer per deployment)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--idle-sleep', type=float, default=0.5,
+                            help="Secondi di attesa quando la coda è vuota")
+        parser.add_argument('--once', action='store_true',
+                            help="Svuota la coda ed esce")
+
+    def handle(self, *args, **options):
+        from apps.telegram_bot.complete_bot import RiderMatchBot
+
+        bot = RiderMatchBot()
+
+        def handle_update(update):
+            try:
+                bot.process_update(update)
+            finally:
+                complete_update(update['update_id'])
+
+        workers = getattr(settings, 'BOT_WORKERS', 1)
+        dispatcher = None
+        if workers > 1:
+            dispatcher = ShardedDispatcher(
+                handle_update,
+                workers=workers,
+                queue_size=getattr(settings, 'BOT_SHARD_QUEUE_SIZE', 100)
+            )
+            dispatcher.start()
+            dispatcher.export_queue_depths()
+
+        bot.start_metrics_server()
+        self.stdout.write("📥 Consumer update webhook avviato")
+        processed = 0
+        last_purge = time.monotonic()
+
+        try:
+            while True:
+                limit = options['batch_size']
+                if dispatcher:
+                    # Al massimo batch_size update prelevati e non completati, come
+                    # nel processamento sequenziale: il lease non scade in coda
+                    limit = dispatcher.wait_for_room(limit, options['idle_sleep'])
+                    if not limit:
+                        continue
+                updates = claim_updates(limit)
+
+                for update in updates:
+                    if dispatcher:
+                        dispatcher.submit(update)
+                    else:
+                        handle_update(update)
+                processed += len(updates)
+
+                if time.monotonic() - last_purge > 3600:
+                    purge_processed()
+                    last_purge = time.monotonic()
+
+                if not updates:
+                    if options['once']:
+                        break
+                    time.sleep(options['idle_sleep'])
+
+        except KeyboardInterrupt:
+            self.stdout.write("\n🛑 Consumer fermato")
+        finally:
+            if dispatcher:
+                dispatcher.stop()
+
+        self.stdout.write(f"✅ Update processati: {processed}")
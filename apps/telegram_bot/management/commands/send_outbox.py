@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.telegram_bot.api import TelegramAPI
+from apps.telegram_bot.outbox import OutboxSender, pending_count
+
+
+class Command(BaseCommand):
+    help = "Invia i messaggi in coda nell'outbox rispettando i rate limit"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--once', action='store_true',
+                            help="Invia i messaggi pronti ed esce")
+
+    def handle(self, *args, **options):
+        sender = OutboxSender(TelegramAPI(settings.TELEGRAM_BOT_TOKEN), batch_size=options['batch_size'])
+        self.stdout.write(f"📤 Outbox: {pending_count()} messaggi in attesa")
+
+        if options['once']:
+            total = 0
+            while True:
+                processed = sender.run_once()
+                if not processed:
+                    break
+                total += processed
+            self.stdout.write(f"✅ Messaggi processati: {total}")
+            return
+
+        try:
+            sender.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("\n🛑 Sender fermato")
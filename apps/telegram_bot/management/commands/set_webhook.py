@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.telegram_bot.api import TelegramAPI
+
+
+class Command(BaseCommand):
+    help = "Registra (o rimuove) il webhook Telegram"
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='?', default=getattr(settings, 'TELEGRAM_WEBHOOK_URL', ''),
+                            help="URL pubblico di /telegram/webhook/")
+        parser.add_argument('--delete', action='store_true',
+                            help="Rimuove il webhook e torna al long polling")
+
+    def handle(self, *args, **options):
+        api = TelegramAPI(settings.TELEGRAM_BOT_TOKEN)
+
+        if options['delete']:
+            result = api.call('deleteWebhook')
+        else:
+            secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+            if not options['url'] or not secret:
+                raise CommandError("Configura TELEGRAM_WEBHOOK_URL e TELEGRAM_WEBHOOK_SECRET")
+            result = api.call('setWebhook', {
+                'url': options['url'],
+                'secret_token': secret,
+                'allowed_updates': '["message", "callback_query"]'
+            })
+
+        if not result or not result.get('ok'):
+            raise CommandError(f"Errore Telegram: {result}")
+        self.stdout.write(f"✅ {result.get('description', 'OK')}")
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_bot', '0002_outboundmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('callback_id', models.CharField(max_length=64, unique=True)),
+                ('processed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_bot', '0004_update_claimed_until'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outboundmessage',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['chat_id', 'id'], name='outbox_chat_pending_idx'),
+        ),
+    ]
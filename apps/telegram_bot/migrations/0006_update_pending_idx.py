@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_bot', '0005_outbox_chat_pending_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='telegramupdate',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['update_id'], name='update_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils import timezone
+
+class TelegramUpdate(models.Model):
+    """Update ricevuto via webhook, in attesa del consumer"""
+    update_id = models.BigIntegerField(unique=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    # Prelevato da un consumer fino a questo istante (poi torna disponibile)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    # Impostato solo dopo che l'handler ha processato l'update
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Update da processare, in ordine di arrivo (claim e conteggio della coda)
+            models.Index(
+                fields=['update_id'],
+                condition=models.Q(processed_at__isnull=True),
+                name='update_pending_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Update {self.update_id}"
+
+class ProcessedCallback(models.Model):
+    """Callback query già processata (chiave di idempotenza)"""
+    callback_id = models.CharField(max_length=64, unique=True)
+    processed_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Callback {self.callback_id}"
+
+class OutboundMessage(models.Model):
+    """Messaggio in uscita (outbox), inviato dal sender rispettando i rate limit"""
+    STATUS_CHOICES = [
+        ('pending', 'In attesa'),
+        ('sent', 'Inviato'),
+        ('failed', 'Fallito')
+    ]
+    
+    chat_id = models.BigIntegerField()
+    text = models.TextField()
+    # Tastiera già serializzata in JSON
+    reply_markup = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+            # Messaggi precedenti ancora in attesa nella stessa chat (ordine per chat)
+            models.Index(
+                fields=['chat_id', 'id'],
+                condition=models.Q(status='pending'),
+                name='outbox_chat_pending_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.chat_id}: {self.text[:30]}"
@@ -0,0 +1,135 @@
+"""
+Notifiche ai rider, accodate nell'outbox
+- Usate dal bot, dallo sweeper delle assegnazioni e dai task Celery
+- Nuove assegnazioni raggruppate per rider in un solo messaggio, ognuna
+  notificata una volta sola (notified_at)
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.riders.models import Rider
+from apps.shifts.models import Shift, ShiftAssignment
+from apps.telegram_bot.outbox import enqueue_messages
+from apps.telegram_bot.rendering import OTHER_SHIFTS_KEYBOARD, assignment_keyboard, digest_keyboard, shift_card
+
+# Campi dei turni mostrati nei messaggi (letti con una sola query insieme alla pizzeria)
+SHIFT_CARD_FIELDS = (
+    'shift__date', 'shift__start_time', 'shift__end_time', 'shift__hourly_rate',
+    'shift__pizzeria__name', 'shift__pizzeria__address'
+)
+# Assegnazioni prelevate per transazione
+BATCH_SIZE = 500
+# Turni per messaggio (testo e tastiera restano nei limiti di Telegram)
+DIGEST_MAX_SHIFTS = 10
+
+
+def claim_new_assignments(batch_size=BATCH_SIZE):
+    """Segna come notificato un blocco di assegnazioni mai notificate e lo restituisce
+
+    L'UPDATE condizionato imposta un istante proprio di questa chiamata: si
+    rileggono solo le righe con quel valore, così due run sovrapposte non
+    notificano mai la stessa assegnazione. Va eseguita in una transazione
+    insieme all'accodamento dei messaggi.
+    """
+    ids = list(
+        ShiftAssignment.objects.select_for_update(skip_locked=True).filter(
+            notified_at__isnull=True,
+            confirmed_by_rider=False
+        ).order_by('assigned_at', 'id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    claimed_at = timezone.now()
+    ShiftAssignment.objects.filter(id__in=ids, notified_at__isnull=True).update(notified_at=claimed_at)
+    return list(
+        ShiftAssignment.objects.filter(id__in=ids, notified_at=claimed_at)
+        .select_related('rider', 'shift__pizzeria')
+        .only('rider__telegram_id', *SHIFT_CARD_FIELDS)
+        .order_by('rider_id', 'shift__date', 'shift__start_time')
+    )
+
+
+def assignment_digests(assignments):
+    """Un messaggio per rider (al massimo DIGEST_MAX_SHIFTS turni ciascuno)"""
+    by_rider = defaultdict(list)
+    for assignment in assignments:
+        by_rider[assignment.rider.telegram_id].append(assignment)
+
+    messages = []
+    for telegram_id, rider_assignments in by_rider.items():
+        for i in range(0, len(rider_assignments), DIGEST_MAX_SHIFTS):
+            messages.append(_digest(telegram_id, rider_assignments[i:i + DIGEST_MAX_SHIFTS]))
+    return messages
+
+
+def _digest(telegram_id, assignments):
+    minutes = settings.SHIFT_CONFIRM_TIMEOUT_MINUTES
+    if len(assignments) == 1:
+        assignment = assignments[0]
+        shift = assignment.shift
+        message = (
+            "\n🎉 <b>NUOVO TURNO ASSEGNATO!</b>\n\n"
+            + shift_card(shift, f"<b>🍕 {shift.pizzeria.name}</b>")
+            + f"\n⚠️ <b>Conferma entro {minutes} minuti</b> o il turno verrà riassegnato!\n"
+        )
+        return telegram_id, message, assignment_keyboard(assignment.id)
+
+    parts = [f"\n🎉 <b>{len(assignments)} NUOVI TURNI ASSEGNATI!</b>\n\n"]
+    for i, assignment in enumerate(assignments, 1):
+        shift = assignment.shift
+        parts.append(shift_card(shift, f"<b>{i}. 🍕 {shift.pizzeria.name}</b>", indent='   '))
+        parts.append("\n")
+    parts.append(f"⚠️ <b>Conferma ogni turno entro {minutes} minuti</b> o verrà riassegnato!\n")
+    return telegram_id, ''.join(parts), digest_keyboard([assignment.id for assignment in assignments])
+
+
+def notify_new_assignments():
+    """Notifica ai rider le assegnazioni nuove: un riepilogo per rider, una volta sola"""
+    try:
+        while True:
+            # Segno di notifica e messaggi nell'outbox nella stessa transazione
+            with transaction.atomic():
+                assignments = claim_new_assignments()
+                # Un solo INSERT: l'invio avviene dal sender dell'outbox
+                enqueue_messages(assignment_digests(assignments))
+            if len(assignments) < BATCH_SIZE:
+                break
+
+    except Exception as e:
+        print(f"Errore notifica assegnazioni: {e}")
+
+
+def notify_expired_assignments(released):
+    """Avvisa i rider le cui assegnazioni sono scadute ({shift_id: rider_id})"""
+    try:
+        telegram_ids = dict(
+            Rider.objects.filter(id__in=set(released.values())).values_list('id', 'telegram_id')
+        )
+        shifts = Shift.objects.filter(id__in=list(released)).select_related('pizzeria').only(
+            'date', 'start_time', 'end_time', 'pizzeria__name'
+        )
+
+        notifications = []
+        for shift in shifts:
+            telegram_id = telegram_ids.get(released[shift.id])
+            if telegram_id is None:
+                continue
+
+            message = (
+                "\n⌛ <b>TURNO SCADUTO</b>\n\n"
+                + shift_card(shift, f"<b>🍕 {shift.pizzeria.name}</b>", rate=False, address=False)
+                + "\nNon hai confermato in tempo: il turno non è più assegnato a te "
+                "ed è tornato disponibile.\n"
+            )
+
+            notifications.append((telegram_id, message, OTHER_SHIFTS_KEYBOARD))
+
+        enqueue_messages(notifications)
+
+    except Exception as e:
+        print(f"Errore notifica assegnazioni scadute: {e}")
@@ -0,0 +1,239 @@
+"""
+Coda persistente dei messaggi in uscita (outbox)
+- Il matching accoda le notifiche con un solo INSERT
+- Il sender le invia al ritmo massimo consentito da Telegram:
+  ~30 msg/s globali e 1 msg/s per chat (token bucket)
+- Ordine per chat: si preleva solo il primo messaggio in attesa di ogni chat,
+  quindi un messaggio in retry trattiene anche i successivi
+- 429: rispetta retry_after (per la chat e per tutto il bot); errori di rete:
+  retry con backoff esponenziale
+- Un solo sender attivo tra tutti i processi (lease nella cache condivisa):
+  i bucket sono in memoria e N sender invierebbero N volte più veloce
+"""
+
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.telegram_bot.models import OutboundMessage
+from apps.telegram_bot.rendering import serialize_markup
+from ridermatch.metrics import QUEUE_DEPTH
+
+# Tempo per cui un blocco prelevato resta riservato al sender
+LEASE_SECONDS = 60
+MAX_BACKOFF_SECONDS = 300
+# Sender attivo: rinnovato a ogni giro, scade se il processo muore
+SENDER_LEASE_KEY = 'outbox:sender'
+SENDER_LEASE_SECONDS = 30
+
+
+def enqueue_message(chat_id, text, reply_markup=None):
+    """Accoda un messaggio"""
+    return OutboundMessage.objects.create(
+        chat_id=chat_id,
+        text=text,
+        reply_markup=serialize_markup(reply_markup)
+    )
+
+
+def enqueue_messages(messages):
+    """Accoda più messaggi [(chat_id, text, reply_markup)] con un solo INSERT"""
+    return OutboundMessage.objects.bulk_create([
+        OutboundMessage(chat_id=chat_id, text=text, reply_markup=serialize_markup(reply_markup))
+        for chat_id, text, reply_markup in messages
+    ], batch_size=500)
+
+
+def pending_count():
+    return OutboundMessage.objects.filter(status='pending').count()
+
+
+# COUNT(*) a ogni lettura delle metriche: solo se richiesto
+if getattr(settings, 'METRICS_DB_GAUGES', False):
+    QUEUE_DEPTH.labels('outbox').set_function(pending_count)
+
+
+class TokenBucket:
+    """Token bucket: `rate` token al secondo, al massimo `capacity` accumulati"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Secondi da attendere prima che sia disponibile un token"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def block(self, seconds):
+        """Blocca il bucket (es. dopo un 429 con retry_after)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class OutboxSender:
+    """Svuota l'outbox rispettando i rate limit globali e per chat"""
+
+    def __init__(self, api, global_rate=None, chat_rate=None, batch_size=100, max_attempts=None):
+        self.api = api
+        self.global_bucket = TokenBucket(global_rate or getattr(settings, 'BOT_OUTBOX_GLOBAL_RATE', 30))
+        self.chat_rate = chat_rate or getattr(settings, 'BOT_OUTBOX_CHAT_RATE', 1)
+        self.chat_buckets = {}
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts or getattr(settings, 'BOT_OUTBOX_MAX_ATTEMPTS', 5)
+        self.token = uuid.uuid4().hex
+
+    def _prune_chat_buckets(self, limit=10000):
+        """Rimuove i bucket delle chat inattive (di nuovo pieni)"""
+        if len(self.chat_buckets) <= limit:
+            return
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if bucket.wait_time() == 0 and bucket.tokens >= bucket.capacity:
+                del self.chat_buckets[chat_id]
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1)
+        return bucket
+
+    def holds_lease(self):
+        """True se questo è il sender attivo (con la DummyCache ogni sender lo è)"""
+        if cache.get(SENDER_LEASE_KEY) == self.token:
+            cache.touch(SENDER_LEASE_KEY, SENDER_LEASE_SECONDS)
+            return True
+        return cache.add(SENDER_LEASE_KEY, self.token, SENDER_LEASE_SECONDS)
+
+    def claim(self):
+        """Preleva un blocco di messaggi da inviare, riservandolo per LEASE_SECONDS.
+        Solo il primo messaggio in attesa di ogni chat: i successivi aspettano il suo invio."""
+        now = timezone.now()
+        earlier = OutboundMessage.objects.filter(
+            chat_id=OuterRef('chat_id'), status='pending', id__lt=OuterRef('id')
+        )
+        with transaction.atomic():
+            batch = list(
+                OutboundMessage.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='pending', next_attempt_at__lte=now)
+                .exclude(Exists(earlier))
+                .order_by('next_attempt_at', 'id')[:self.batch_size]
+            )
+            if batch:
+                OutboundMessage.objects.filter(id__in=[m.id for m in batch]).update(
+                    next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+                )
+        return batch
+
+    def send(self, message):
+        data = {'chat_id': message.chat_id, 'text': message.text, 'parse_mode': 'HTML'}
+        if message.reply_markup:
+            data['reply_markup'] = message.reply_markup
+        return self.api.call('sendMessage', data)
+
+    def run_once(self):
+        """Invia un blocco di messaggi, restituisce quanti ne ha processati"""
+        self._prune_chat_buckets()
+        batch = self.claim()
+        sent_ids = []
+        deferred = []
+        # Chat rimandate in questo giro: i messaggi successivi restano in ordine
+        blocked_chats = set()
+
+        for message in batch:
+            chat_bucket = self._chat_bucket(message.chat_id)
+            chat_wait = chat_bucket.wait_time()
+            if message.chat_id in blocked_chats or chat_wait:
+                # Non blocca le altre chat: il messaggio torna in coda
+                blocked_chats.add(message.chat_id)
+                deferred.append((message, max(chat_wait, 1 / self.chat_rate)))
+                continue
+
+            wait = self.global_bucket.wait_time()
+            while wait:
+                time.sleep(wait)
+                wait = self.global_bucket.wait_time()
+
+            self.global_bucket.consume()
+            chat_bucket.consume()
+            result = self.send(message)
+
+            if result and result.get('ok'):
+                sent_ids.append(message.id)
+            else:
+                blocked_chats.add(message.chat_id)
+                self._handle_failure(message, result)
+
+        if sent_ids:
+            OutboundMessage.objects.filter(id__in=sent_ids).update(status='sent', sent_at=timezone.now())
+        now = timezone.now()
+        for message, delay in deferred:
+            OutboundMessage.objects.filter(id=message.id).update(
+                next_attempt_at=now + timedelta(seconds=delay)
+            )
+        return len(batch)
+
+    def _handle_failure(self, message, result):
+        message.attempts += 1
+        retry_after = None
+        if result:
+            message.last_error = result.get('description', '')[:500]
+            if result.get('error_code') == 429:
+                retry_after = result.get('parameters', {}).get('retry_after', 1)
+                # I limiti anti-flood di Telegram valgono per tutto il bot
+                self._chat_bucket(message.chat_id).block(retry_after)
+                self.global_bucket.block(retry_after)
+            elif result.get('error_code') in (400, 403):
+                # Chat inesistente o bot bloccato: inutile riprovare
+                message.status = 'failed'
+        else:
+            message.last_error = 'Errore di rete'
+
+        if message.status != 'failed':
+            if message.attempts >= self.max_attempts and retry_after is None:
+                message.status = 'failed'
+            else:
+                delay = retry_after or min(2 ** message.attempts, MAX_BACKOFF_SECONDS)
+                message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+        message.save(update_fields=['attempts', 'status', 'last_error', 'next_attempt_at'])
+
+    def run_forever(self, stop_event=None, idle_sleep=0.5):
+        """Loop del sender (si ferma quando stop_event è impostato)"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            if not self.holds_lease():
+                # Un altro processo sta inviando: si subentra se il suo lease scade
+                stop_event.wait(SENDER_LEASE_SECONDS / 3)
+                continue
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"Errore invio outbox: {e}")
+                processed = 0
+            finally:
+                close_old_connections()
+            if not processed:
+                stop_event.wait(idle_sleep)
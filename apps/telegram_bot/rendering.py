@@ -0,0 +1,250 @@
+"""
+Rendering dei messaggi del bot
+- Tastiere statiche serializzate in JSON una sola volta all'import
+- Tastiere con un ID (accetta/rifiuta turno) da un modello già serializzato
+- Testi fissi come costanti, senza ricostruirli a ogni risposta
+- Una sola scheda turno per I miei turni, turni disponibili, conferma e notifiche
+"""
+
+import json
+
+DAYS = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
+
+TRANSPORT_NAMES = {
+    'bike': '🚲 Bicicletta',
+    'scooter': '🛵 Scooter',
+    'car': '🚗 Auto'
+}
+
+
+def serialize_markup(reply_markup):
+    """reply_markup in JSON (le tastiere di questo modulo sono già stringhe)"""
+    if not reply_markup:
+        return ''
+    if isinstance(reply_markup, str):
+        return reply_markup
+    return json.dumps(reply_markup)
+
+
+def inline_keyboard(*buttons):
+    """Tastiera inline serializzata, un pulsante (testo, callback_data) per riga"""
+    return json.dumps({
+        'inline_keyboard': [[{'text': text, 'callback_data': data}] for text, data in buttons]
+    })
+
+
+# Pulsanti ricorrenti
+MAIN_MENU = ('🏠 Menu Principale', 'main_menu')
+MY_SHIFTS = ('📋 I Miei Turni', 'my_shifts')
+AVAILABLE_SHIFTS = ('🆓 Turni Disponibili', 'available_shifts')
+MANAGE_AVAILABILITY = ('📅 Gestisci Disponibilità', 'manage_availability')
+
+# Tastiere statiche
+RIDER_MENU_KEYBOARD = inline_keyboard(
+    MANAGE_AVAILABILITY,
+    ('🍕 I Miei Turni', 'my_shifts'),
+    AVAILABLE_SHIFTS,
+    ('👤 Il Mio Profilo', 'my_profile')
+)
+WELCOME_KEYBOARD = inline_keyboard(
+    ('✅ Registrati come Rider', 'register_rider'),
+    ('❓ Più Informazioni', 'more_info')
+)
+CONTACT_KEYBOARD = json.dumps({
+    'keyboard': [
+        [{'text': '📱 Condividi Numero', 'request_contact': True}]
+    ],
+    'resize_keyboard': True,
+    'one_time_keyboard': True
+})
+TRANSPORT_KEYBOARD = inline_keyboard(
+    *((name, f'transport_{transport}') for transport, name in TRANSPORT_NAMES.items())
+)
+DISTANCE_KEYBOARD = inline_keyboard(
+    ('5 km', 'distance_5'),
+    ('10 km', 'distance_10'),
+    ('15 km', 'distance_15'),
+    ('20 km', 'distance_20'),
+    ('25+ km', 'distance_25')
+)
+REGISTERED_KEYBOARD = inline_keyboard(('📅 Imposta Disponibilità', 'manage_availability'), MAIN_MENU)
+MAIN_MENU_KEYBOARD = inline_keyboard(MAIN_MENU)
+AVAILABILITY_KEYBOARD = inline_keyboard(
+    ('➕ Aggiungi Disponibilità', 'add_availability'),
+    ('🗑️ Cancella Disponibilità', 'remove_availability'),
+    MAIN_MENU
+)
+DAY_KEYBOARD = inline_keyboard(
+    *((day, f'day_{i}') for i, day in enumerate(DAYS)),
+    ('🔙 Indietro', 'manage_availability')
+)
+AVAILABILITY_ADDED_KEYBOARD = inline_keyboard(
+    ('➕ Aggiungi Altro Orario', 'add_availability'),
+    ('📅 Vedi Disponibilità', 'manage_availability'),
+    MAIN_MENU
+)
+NO_SHIFTS_KEYBOARD = inline_keyboard(
+    ('📅 Aggiorna Disponibilità', 'manage_availability'),
+    AVAILABLE_SHIFTS,
+    MAIN_MENU
+)
+MY_SHIFTS_KEYBOARD = inline_keyboard(
+    ('✅ Conferma Turni', 'confirm_shifts'),
+    ('🔄 Aggiorna', 'my_shifts'),
+    MAIN_MENU
+)
+AVAILABLE_SHIFTS_KEYBOARD = inline_keyboard(
+    ('🔄 Aggiorna Lista', 'available_shifts'),
+    ('📅 La Mia Disponibilità', 'manage_availability'),
+    MAIN_MENU
+)
+SHIFT_CONFIRMED_KEYBOARD = inline_keyboard(MY_SHIFTS, MAIN_MENU)
+OTHER_SHIFTS_KEYBOARD = inline_keyboard(('🆓 Altri Turni Disponibili', 'available_shifts'), MAIN_MENU)
+
+# Tastiera di una nuova assegnazione: serializzata una volta, si sostituisce solo l'ID
+_ASSIGNMENT_ID = '__assignment_id__'
+_ASSIGNMENT_KEYBOARD = inline_keyboard(
+    ('✅ Accetto il Turno', f'accept_shift_{_ASSIGNMENT_ID}'),
+    ('❌ Rifiuta Turno', f'reject_shift_{_ASSIGNMENT_ID}'),
+    MY_SHIFTS
+)
+
+
+def assignment_keyboard(assignment_id):
+    return _ASSIGNMENT_KEYBOARD.replace(_ASSIGNMENT_ID, str(assignment_id))
+
+
+def digest_keyboard(assignment_ids):
+    """Accetta/rifiuta per ogni turno del riepilogo, numerati come nel testo"""
+    rows = [
+        [
+            {'text': f'✅ Accetto {i}', 'callback_data': f'accept_shift_{assignment_id}'},
+            {'text': f'❌ Rifiuto {i}', 'callback_data': f'reject_shift_{assignment_id}'},
+        ]
+        for i, assignment_id in enumerate(assignment_ids, 1)
+    ]
+    rows.append([{'text': MY_SHIFTS[0], 'callback_data': MY_SHIFTS[1]}])
+    return json.dumps({'inline_keyboard': rows})
+
+
+# Turni disponibili con pagina successiva: si sostituisce solo il cursore
+_CURSOR = '__cursor__'
+_NEXT_PAGE_KEYBOARD = inline_keyboard(
+    ('➡️ Altri Turni', f'available_shifts_{_CURSOR}'),
+    ('🔄 Dall\'inizio', 'available_shifts'),
+    ('📅 La Mia Disponibilità', 'manage_availability'),
+    MAIN_MENU
+)
+
+
+def available_shifts_keyboard(cursor=None):
+    if cursor is None:
+        return AVAILABLE_SHIFTS_KEYBOARD
+    return _NEXT_PAGE_KEYBOARD.replace(_CURSOR, cursor)
+
+
+# Testi fissi
+WELCOME_TEXT = """
+🍕 <b>Benvenuto in RiderMatch, {user_name}!</b> 🏍️
+
+Non sei ancora registrato come rider.
+
+<b>RiderMatch</b> è il sistema che collega rider e pizzerie per turni di consegna.
+
+<b>Come rider potrai:</b>
+• 📅 Impostare le tue disponibilità
+• 🍕 Ricevere turni automaticamente
+• 💰 Guadagnare con consegne
+• ⭐ Costruire la tua reputazione
+
+<b>Vuoi registrarti?</b>
+"""
+
+REGISTER_TEXT = """
+📝 <b>REGISTRAZIONE RIDER</b>
+
+Per registrarti ho bisogno di alcune informazioni:
+
+<b>Inviami il tuo numero di telefono</b>
+Esempio: +393331234567
+
+Oppure usa il pulsante qui sotto per condividerlo automaticamente.
+"""
+
+ADD_AVAILABILITY_TEXT = """
+📅 <b>AGGIUNGI DISPONIBILITÀ</b>
+
+<b>Seleziona il giorno:</b>
+"""
+
+TIME_FORMAT_TEXT = """
+📅 <b>DISPONIBILITÀ {day}</b>
+
+<b>Invia l'orario nel formato:</b>
+<code>HH:MM-HH:MM</code>
+
+<b>Esempi:</b>
+• <code>19:00-23:00</code> (sera)
+• <code>12:00-14:30</code> (pranzo)
+• <code>18:30-22:00</code> (sera)
+
+<b>Per orario preferito aggiungi *:</b>
+• <code>19:00-23:00*</code> (priorità alta)
+"""
+
+NO_SHIFTS_TEXT = """
+📋 <b>I MIEI TURNI</b>
+
+Non hai turni assegnati al momento.
+
+<b>Suggerimenti:</b>
+• Controlla che la tua disponibilità sia aggiornata
+• I turni vengono assegnati automaticamente
+• Controlla i turni disponibili
+"""
+
+NO_AVAILABLE_SHIFTS_TEXT = """
+🔍 <b>TURNI DISPONIBILI</b>
+
+Nessun turno disponibile al momento.
+
+I turni vengono assegnati automaticamente in base alla tua disponibilità.
+"""
+
+SHIFT_REJECTED_TEXT = """
+❌ <b>TURNO RIFIUTATO</b>
+
+Il turno è stato rimosso e tornerà disponibile per altri rider.
+
+⚠️ <b>Attenzione:</b> Rifiutare troppi turni può influire sul tuo rating.
+"""
+
+# Testi per giorno già pronti (il giorno scelto è uno di 7)
+TIME_FORMAT_TEXTS = [TIME_FORMAT_TEXT.format(day=day.upper()) for day in DAYS]
+
+
+def format_date(value):
+    """dd/mm/YYYY senza strftime"""
+    return f"{value.day:02d}/{value.month:02d}/{value.year}"
+
+
+def format_time(value):
+    """HH:MM senza strftime"""
+    return f"{value.hour:02d}:{value.minute:02d}"
+
+
+def shift_card(shift, title, indent='', rate=True, address=True, phone=False):
+    """Scheda turno: titolo, data e orario, poi paga, indirizzo e telefono se richiesti"""
+    pizzeria = shift.pizzeria
+    parts = [
+        title, '\n',
+        indent, '📅 ', format_date(shift.date), '\n',
+        indent, '⏰ ', format_time(shift.start_time), ' - ', format_time(shift.end_time), '\n'
+    ]
+    if rate:
+        parts += [indent, '💰 €', str(shift.hourly_rate), '/ora\n']
+    if address:
+        parts += [indent, '📍 ', pizzeria.address, '\n']
+    if phone:
+        parts += [indent, '📞 ', pizzeria.phone, '\n']
+    return ''.join(parts)
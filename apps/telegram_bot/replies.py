@@ -0,0 +1,91 @@
+"""
+Risposte ai bottoni modificando il messaggio del bottone
+- Il messaggio del callback in corso è in una contextvar: la prima risposta
+  con tastiera inline lo modifica invece di inviare un messaggio nuovo
+- Risposte senza tastiera inline (errori, richieste di testo, tastiere di
+  contatto/posizione) e le successive alla prima restano messaggi nuovi
+- Hash di testo e tastiera dell'ultimo contenuto di ogni messaggio:
+  contenuto uguale = nessuna chiamata, solo tastiera diversa = editMessageReplyMarkup
+- Messaggio nuovo solo se Telegram rifiuta la modifica (NOT_EDITABLE): dopo un
+  errore di rete la modifica può essere arrivata e un invio la duplicherebbe
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ridermatch.metrics import Counter
+
+MESSAGE_EDITS = Counter(
+    'ridermatch_bot_message_edits_total', "Risposte ai callback per esito", ['outcome']
+)
+EDITED_TEXT = MESSAGE_EDITS.labels('text')
+EDITED_MARKUP = MESSAGE_EDITS.labels('markup')
+EDIT_SKIPPED = MESSAGE_EDITS.labels('unchanged')
+EDIT_FALLBACK = MESSAGE_EDITS.labels('fallback')
+
+# Esito di edit_message quando Telegram rifiuta la modifica (diverso da None = errore di rete)
+NOT_EDITABLE = object()
+
+# (chat_id, message_id) del bottone premuto, None fuori dai callback o dopo la prima modifica
+_callback_message = ContextVar('callback_message', default=None)
+
+
+@contextmanager
+def editing(chat_id, message_id):
+    """Nel blocco la prima risposta inline modifica il messaggio del bottone"""
+    token = _callback_message.set((chat_id, message_id))
+    try:
+        yield
+    finally:
+        _callback_message.reset(token)
+
+
+def take_editable(chat_id):
+    """message_id da modificare per questa risposta (una volta sola), o None"""
+    target = _callback_message.get()
+    if target is None or target[0] != chat_id:
+        return None
+    _callback_message.set(None)
+    return target[1]
+
+
+def keep_callback_message():
+    """Le risposte seguenti sono messaggi nuovi (il messaggio del bottone resta com'è)"""
+    _callback_message.set(None)
+
+
+def is_inline(reply_markup):
+    """Solo i messaggi con tastiera inline si possono modificare (senza tastiera o con tastiera di risposta: messaggio nuovo)"""
+    return reply_markup.startswith('{"inline_keyboard"')
+
+
+def content_hash(value):
+    return hashlib.blake2b(value.encode(), digest_size=8).digest()
+
+
+class MessageHashes:
+    """Hash (testo, tastiera) dell'ultimo contenuto per messaggio, LRU limitata"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def changes(self, chat_id, message_id, text, reply_markup):
+        """(testo cambiato, tastiera cambiata); messaggio sconosciuto = entrambi"""
+        with self.lock:
+            entry = self.entries.get((chat_id, message_id))
+        if entry is None:
+            return True, True
+        return entry[0] != content_hash(text), entry[1] != content_hash(reply_markup)
+
+    def remember(self, chat_id, message_id, text, reply_markup):
+        key = (chat_id, message_id)
+        with self.lock:
+            self.entries[key] = (content_hash(text), content_hash(reply_markup))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
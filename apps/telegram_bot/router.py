@@ -0,0 +1,161 @@
+"""
+Router di callback e comandi del bot
+- Chiavi fisse (es. 'main_menu') in un dizionario: un solo lookup
+- Chiavi con parametro (es. 'accept_shift_<id>') in un trie di prefissi:
+  si scorre solo la lunghezza della chiave, non l'elenco delle route
+- Route registrate con decoratore sui metodi del bot; gli argomenti da
+  passare sono ricavati una volta dalla firma del metodo
+- Il metodo è cercato per nome sul bot: le sottoclassi possono ridefinirlo
+- Tempi per route (istogramma Prometheus, errori, massimo) e log degli handler lenti
+"""
+
+import inspect
+import time
+
+from django.conf import settings
+
+from ridermatch.metrics import Counter, Histogram
+
+
+HANDLER_SECONDS = Histogram(
+    'ridermatch_bot_handler_seconds', "Durata degli handler del bot", ['router', 'route']
+)
+HANDLER_ERRORS = Counter(
+    'ridermatch_bot_handler_errors_total', "Handler terminati con eccezione", ['router', 'route']
+)
+
+
+class Route:
+    """Handler di una chiave, con le sue metriche di durata"""
+
+    def __init__(self, router_name, key, handler, arg=None, parse=str):
+        self.key = key
+        self.handler = handler
+        # Cercato sul bot a ogni chiamata (metodi ridefiniti nelle sottoclassi)
+        self.method = handler.__name__
+        self.arg = arg
+        self.parse = parse
+        # Parametri del metodo oltre a self, letti una volta sola
+        # (quelli con un default possono mancare nel contesto)
+        self.params = tuple(inspect.signature(handler).parameters)[1:]
+        # Serie delle metriche risolte alla registrazione: nessun lookup per chiamata
+        self.latency = HANDLER_SECONDS.labels(router_name, key)
+        self.errors = HANDLER_ERRORS.labels(router_name, key)
+        self.max = 0.0
+
+    def record(self, elapsed, failed):
+        self.latency.observe(elapsed)
+        if failed:
+            self.errors.inc()
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def stats(self):
+        calls = self.latency.count
+        return {
+            'calls': calls,
+            'errors': self.errors.value,
+            'total_seconds': self.latency.sum,
+            'avg_ms': self.latency.sum / calls * 1000 if calls else 0.0,
+            'max_ms': self.max * 1000,
+        }
+
+
+class _TrieNode:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+
+class Router:
+    """Route per chiave esatta o per prefisso (con il resto della chiave come argomento)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.exact = {}
+        self.prefixes = _TrieNode()
+        self.routes = []
+
+    def route(self, key, arg=None, parse=str):
+        """Decoratore: con arg la chiave è un prefisso e il resto, convertito con
+        parse, arriva all'handler nel parametro arg"""
+        def decorator(handler):
+            route = Route(self.name, key, handler, arg, parse)
+            if arg is None:
+                self.exact[key] = route
+            else:
+                node = self.prefixes
+                for char in key:
+                    node = node.children.setdefault(char, _TrieNode())
+                node.route = route
+            self.routes.append(route)
+            return handler
+        return decorator
+
+    def resolve(self, key):
+        """(route, argomento) per la chiave, o (None, None)"""
+        route = self.exact.get(key)
+        if route is not None:
+            return route, None
+
+        # Prefisso più lungo registrato
+        found = None
+        node = self.prefixes
+        for position, char in enumerate(key):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                found = (node.route, position + 1)
+        if found is None:
+            return None, None
+
+        route, length = found
+        try:
+            return route, route.parse(key[length:])
+        except ValueError:
+            return None, None
+
+    def dispatch(self, bot, key, **context):
+        """Esegue l'handler della chiave; False se nessuna route corrisponde"""
+        route, value = self.resolve(key)
+        if route is None:
+            return False
+        if route.arg is not None:
+            context[route.arg] = value
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            getattr(bot, route.method)(**{param: context[param] for param in route.params if param in context})
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - started
+            route.record(elapsed, failed)
+            if elapsed > getattr(settings, 'BOT_SLOW_HANDLER_SECONDS', 1.0):
+                print(f"⏱️ Handler lento {self.name} {route.key}: {elapsed * 1000:.0f}ms")
+        return True
+
+    def stats(self):
+        """Contatori per route, dalla più costosa"""
+        return {
+            route.key: route.stats()
+            for route in sorted(self.routes, key=lambda route: route.latency.sum, reverse=True)
+        }
+
+
+# Route del bot: callback dei bottoni e comandi testuali
+callbacks = Router('callback')
+commands = Router('command')
+
+
+def command_key(text):
+    """'/start@RiderMatchBot param' -> '/start'"""
+    return text.split(maxsplit=1)[0].split('@', 1)[0] if text else ''
+
+
+def route_stats():
+    """Statistiche di tutte le route del bot"""
+    return {router.name: router.stats() for router in (callbacks, commands)}
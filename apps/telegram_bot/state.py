@@ -0,0 +1,111 @@
+"""
+Stato delle conversazioni del bot (registrazione, disponibilità)
+- MemoryStateStore: LRU in processo con scadenza (TTL)
+- RedisStateStore: condiviso tra più processi del bot
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class BaseStateStore:
+    """Interfaccia comune: stato = dizionario JSON per telegram_id"""
+
+    def get(self, telegram_id):
+        raise NotImplementedError
+
+    def set(self, telegram_id, data):
+        raise NotImplementedError
+
+    def delete(self, telegram_id):
+        raise NotImplementedError
+
+    def update(self, telegram_id, **fields):
+        """Aggiorna alcuni campi dello stato (lo crea se manca)"""
+        data = self.get(telegram_id) or {}
+        data.update(fields)
+        self.set(telegram_id, data)
+        return data
+
+    def get_state(self, telegram_id):
+        """Solo il nome dello stato corrente (o None)"""
+        data = self.get(telegram_id)
+        return data.get('state') if data else None
+
+
+class MemoryStateStore(BaseStateStore):
+    """Stati in memoria con limite di elementi e scadenza"""
+
+    def __init__(self, ttl=3600, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, telegram_id):
+        with self.lock:
+            entry = self.entries.get(telegram_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.monotonic():
+                del self.entries[telegram_id]
+                return None
+            self.entries.move_to_end(telegram_id)
+            return dict(data)
+
+    def set(self, telegram_id, data):
+        with self.lock:
+            self.entries[telegram_id] = (time.monotonic() + self.ttl, dict(data))
+            self.entries.move_to_end(telegram_id)
+            # Elimina i meno recenti oltre il limite
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, telegram_id):
+        with self.lock:
+            self.entries.pop(telegram_id, None)
+
+
+class RedisStateStore(BaseStateStore):
+    """Stati su Redis, condivisi tra worker e processi"""
+
+    def __init__(self, client=None, url=None, ttl=3600, prefix='ridermatch:state:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, telegram_id):
+        return f"{self.prefix}{telegram_id}"
+
+    def get(self, telegram_id):
+        raw = self.client.get(self._key(telegram_id))
+        return json.loads(raw) if raw else None
+
+    def set(self, telegram_id, data):
+        self.client.set(self._key(telegram_id), json.dumps(data), ex=self.ttl)
+
+    def delete(self, telegram_id):
+        self.client.delete(self._key(telegram_id))
+
+
+def get_state_store():
+    """Crea lo store configurato in BOT_STATE_BACKEND"""
+    backend = getattr(settings, 'BOT_STATE_BACKEND', 'memory')
+    ttl = getattr(settings, 'BOT_STATE_TTL', 3600)
+
+    if backend == 'redis':
+        return RedisStateStore(url=settings.BOT_STATE_REDIS_URL, ttl=ttl)
+    if backend == 'memory':
+        return MemoryStateStore(ttl=ttl, max_entries=getattr(settings, 'BOT_STATE_MAX_ENTRIES', 10000))
+    raise ValueError(f"BOT_STATE_BACKEND non valido: {backend}")
@@ -0,0 +1,26 @@
+"""
+Task Celery delle notifiche (accodate nell'outbox, inviate dal sender)
+e pulizia delle tabelle di deduplica
+"""
+
+from celery import shared_task
+
+from apps.telegram_bot import notifications
+from apps.telegram_bot.update_queue import purge_processed
+
+
+@shared_task
+def notify_new_assignments():
+    notifications.notify_new_assignments()
+
+
+@shared_task
+def notify_expired_assignments(released):
+    """released: [(shift_id, rider_id)]"""
+    notifications.notify_expired_assignments(dict(released))
+
+
+@shared_task
+def purge_processed_updates():
+    """Toglie update e callback gestiti da più di un giorno (anche in polling, senza consumer)"""
+    purge_processed()
@@ -0,0 +1,53 @@
+"""
+Bot API finta per i test: nessuna chiamata di rete
+"""
+
+OK = {'ok': True, 'result': {'message_id': 1}}
+
+
+class FakeAPI:
+    """Risposte in ordine (poi sempre ok); ogni chiamata registrata come (metodo, dati)"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    @property
+    def sent(self):
+        return [data['text'] for _, data in self.calls if 'text' in data]
+
+    def call(self, method, data=None, timeout=None):
+        self.calls.append((method, data))
+        return self.results.pop(0) if self.results else OK
+
+
+def make_bot(*results):
+    from apps.telegram_bot.complete_bot import RiderMatchBot
+
+    bot = RiderMatchBot()
+    bot.api = FakeAPI(*results)
+    return bot
+
+
+def message_update(update_id, telegram_id=100, text='/start'):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'chat': {'id': telegram_id},
+            'from': {'id': telegram_id, 'first_name': 'Test'},
+            'text': text,
+        },
+    }
+
+
+def callback_update(update_id, telegram_id, data, message_id=10):
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': f'cb{update_id}',
+            'from': {'id': telegram_id, 'first_name': 'Test'},
+            'message': {'message_id': message_id, 'chat': {'id': telegram_id}},
+            'data': data,
+        },
+    }
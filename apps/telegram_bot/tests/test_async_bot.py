@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.telegram_bot.async_bot import AsyncRiderMatchBot
+from apps.telegram_bot.tests.fakes import message_update
+
+
+class SlowBot(AsyncRiderMatchBot):
+    """Handler bloccanti: ognuno aspetta che arrivino gli altri"""
+
+    def __init__(self, parties):
+        super().__init__()
+        self.barrier = threading.Barrier(parties, timeout=5)
+        self.handled = []
+
+    def process_update(self, update):
+        self.barrier.wait()
+        self.handled.append(update['update_id'])
+
+
+async def dispatch_all(bot, updates):
+    slots = asyncio.Semaphore(bot.concurrency)
+    for update in updates:
+        await bot.dispatch(update, slots)
+    await asyncio.wait(list(bot.chat_tails.values()))
+
+
+@override_settings(BOT_WORKERS=1, BOT_ASYNC_ORM_THREADS=4)
+class AsyncDispatchTests(SimpleTestCase):
+    def tearDown(self):
+        self.bot.executor.shutdown(wait=False)
+
+    def test_slow_updates_of_different_chats_run_concurrently(self):
+        # Con un solo thread la barriera scadrebbe e nessun update verrebbe gestito
+        self.bot = SlowBot(parties=2)
+        asyncio.run(dispatch_all(self.bot, [message_update(1, telegram_id=1), message_update(2, telegram_id=2)]))
+        self.assertEqual(sorted(self.bot.handled), [1, 2])
+
+    def test_same_chat_stays_in_order(self):
+        self.bot = SlowBot(parties=1)
+        asyncio.run(dispatch_all(self.bot, [message_update(i, telegram_id=1) for i in range(1, 6)]))
+        self.assertEqual(self.bot.handled, [1, 2, 3, 4, 5])
@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from apps.telegram_bot.dispatcher import ShardedDispatcher
+from apps.telegram_bot.tests.fakes import message_update
+
+
+class ShardedDispatcherTests(SimpleTestCase):
+    def start(self, handler, **options):
+        dispatcher = ShardedDispatcher(handler, **options)
+        dispatcher.start()
+        self.addCleanup(dispatcher.stop)
+        return dispatcher
+
+    def test_same_chat_in_order(self):
+        handled = []
+
+        def handler(update):
+            time.sleep(random.random() / 1000)
+            handled.append((update['message']['from']['id'], update['update_id']))
+
+        dispatcher = self.start(handler, workers=4)
+        for update_id in range(1, 41):
+            dispatcher.submit(message_update(update_id, telegram_id=100 + update_id % 3))
+        dispatcher.join()
+
+        self.assertEqual(len(handled), 40)
+        for telegram_id in (100, 101, 102):
+            update_ids = [update_id for sender, update_id in handled if sender == telegram_id]
+            self.assertEqual(update_ids, sorted(update_ids))
+
+    def test_different_chats_in_parallel(self):
+        # Ognuno dei due handler attende l'altro: in serie la barriera scadrebbe
+        barrier = threading.Barrier(2, timeout=5)
+        passed = []
+
+        def handler(update):
+            barrier.wait()
+            passed.append(update['update_id'])
+
+        dispatcher = self.start(handler, workers=2)
+        dispatcher.submit(message_update(1, telegram_id=100))
+        dispatcher.submit(message_update(2, telegram_id=101))
+        dispatcher.join()
+        self.assertEqual(sorted(passed), [1, 2])
+
+    def test_full_queue_blocks_submit(self):
+        started, release = threading.Event(), threading.Event()
+
+        def handler(update):
+            started.set()
+            release.wait(5)
+
+        dispatcher = self.start(handler, workers=1, queue_size=1)
+        dispatcher.submit(message_update(1))
+        self.assertTrue(started.wait(5))
+        dispatcher.submit(message_update(2))
+        self.assertEqual(dispatcher.queue_depths(), [1])
+
+        # Coda piena: il long polling resta fermo finché il worker non si libera
+        producer = threading.Thread(target=dispatcher.submit, args=(message_update(3),))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+
+        release.set()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        dispatcher.join()
+        self.assertEqual(dispatcher.queue_depths(), [0])
+
+    def test_wait_for_room(self):
+        release = threading.Event()
+        dispatcher = self.start(lambda update: release.wait(5), workers=2)
+        dispatcher.submit(message_update(1, telegram_id=100))
+        dispatcher.submit(message_update(2, telegram_id=101))
+        self.assertEqual(dispatcher.wait_for_room(3, timeout=0), 1)
+        self.assertEqual(dispatcher.wait_for_room(2, timeout=0.05), 0)
+
+        release.set()
+        dispatcher.join()
+        self.assertEqual(dispatcher.wait_for_room(2, timeout=0), 2)
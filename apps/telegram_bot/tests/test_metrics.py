@@ -0,0 +1,49 @@
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.test import TestCase, override_settings
+
+from ridermatch.metrics import start_metrics_server
+
+
+class MetricsViewTests(TestCase):
+    @override_settings(DEBUG=False, METRICS_TOKEN='')
+    def test_closed_without_token_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN='')
+    def test_open_in_debug(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'ridermatch_', response.content)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN='segreto')
+    def test_token_required_when_set(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer segreto')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN='')
+    def test_scrape_runs_no_queries(self):
+        # Code su DB escluse di default (METRICS_DB_GAUGES)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+
+@override_settings(DEBUG=False, METRICS_TOKEN='segreto')
+class MetricsServerTests(TestCase):
+    def setUp(self):
+        self.server = start_metrics_server(0)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/metrics'
+
+    def test_binds_localhost(self):
+        self.assertEqual(self.server.server_address[0], '127.0.0.1')
+
+    def test_checks_token(self):
+        with self.assertRaises(HTTPError) as error:
+            urlopen(self.url, timeout=5)
+        self.assertEqual(error.exception.code, 403)
+        with urlopen(Request(self.url, headers={'Authorization': 'Bearer segreto'}), timeout=5) as response:
+            self.assertEqual(response.status, 200)
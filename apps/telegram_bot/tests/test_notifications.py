@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.shifts.models import ShiftAssignment
+from apps.telegram_bot.models import OutboundMessage
+from apps.telegram_bot.notifications import DIGEST_MAX_SHIFTS, notify_expired_assignments, notify_new_assignments
+from ridermatch.factories import assign, create_pizzeria, create_rider, create_shift
+
+
+class NewAssignmentTests(TestCase):
+    def setUp(self):
+        self.pizzeria = create_pizzeria()
+
+    def assign_shifts(self, rider, count):
+        first = timezone.localdate() + timedelta(days=1)
+        return [assign(create_shift(self.pizzeria, first + timedelta(days=i)), rider) for i in range(count)]
+
+    def test_one_digest_per_rider(self):
+        self.assign_shifts(create_rider(1), 3)
+        self.assign_shifts(create_rider(2), 1)
+        notify_new_assignments()
+
+        digest = OutboundMessage.objects.get(chat_id=1)
+        self.assertIn('3 NUOVI TURNI ASSEGNATI', digest.text)
+        self.assertIn('NUOVO TURNO ASSEGNATO', OutboundMessage.objects.get(chat_id=2).text)
+        self.assertFalse(ShiftAssignment.objects.filter(notified_at__isnull=True).exists())
+
+    def test_second_run_sends_nothing(self):
+        self.assign_shifts(create_rider(1), 2)
+        notify_new_assignments()
+        notify_new_assignments()
+        self.assertEqual(OutboundMessage.objects.count(), 1)
+
+    def test_long_digest_is_split(self):
+        self.assign_shifts(create_rider(1), DIGEST_MAX_SHIFTS + 2)
+        notify_new_assignments()
+        self.assertEqual(OutboundMessage.objects.filter(chat_id=1).count(), 2)
+
+    def test_confirmed_assignments_are_not_notified(self):
+        assignment, = self.assign_shifts(create_rider(1), 1)
+        ShiftAssignment.objects.filter(id=assignment.id).update(confirmed_by_rider=True)
+        notify_new_assignments()
+        self.assertFalse(OutboundMessage.objects.exists())
+
+
+class ExpiredAssignmentTests(TestCase):
+    def test_says_the_shift_was_released(self):
+        rider = create_rider(1)
+        shift = create_shift(create_pizzeria(), timezone.localdate() + timedelta(days=1))
+        notify_expired_assignments({shift.id: rider.id})
+
+        message = OutboundMessage.objects.get(chat_id=1)
+        self.assertIn('TURNO SCADUTO', message.text)
+        self.assertIn('tornato disponibile', message.text)
+        self.assertNotIn('riassegnato', message.text)
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.telegram_bot.models import OutboundMessage
+from apps.telegram_bot.outbox import SENDER_LEASE_KEY, OutboxSender, enqueue_message
+from apps.telegram_bot.tests.fakes import FakeAPI
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_due(message):
+    OutboundMessage.objects.filter(id=message.id).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+
+class OutboxSenderTests(TestCase):
+    def test_sends_and_marks_sent(self):
+        enqueue_message(1, 'uno')
+        enqueue_message(2, 'due')
+        api = FakeAPI()
+        OutboxSender(api).run_once()
+        self.assertEqual(sorted(api.sent), ['due', 'uno'])
+        self.assertEqual(OutboundMessage.objects.filter(status='sent').count(), 2)
+
+    def test_one_message_per_chat_per_run(self):
+        enqueue_message(1, 'primo')
+        enqueue_message(1, 'secondo')
+        api = FakeAPI()
+        sender = OutboxSender(api, chat_rate=1000)
+        sender.run_once()
+        self.assertEqual(api.sent, ['primo'])
+        sender.run_once()
+        self.assertEqual(api.sent, ['primo', 'secondo'])
+
+    def test_failed_message_holds_back_chat(self):
+        first = enqueue_message(1, 'primo')
+        enqueue_message(1, 'secondo')
+        enqueue_message(2, 'altra chat')
+        # Errore di rete sul primo: backoff di 2 secondi
+        api = FakeAPI(None)
+        sender = OutboxSender(api, chat_rate=1000)
+        sender.run_once()
+        sender.run_once()
+        # Il secondo messaggio della chat non supera quello in retry
+        self.assertEqual(sorted(api.sent), ['altra chat', 'primo'])
+
+        make_due(first)
+        sender.run_once()
+        sender.run_once()
+        self.assertEqual([text for text in api.sent if text != 'altra chat'], ['primo', 'primo', 'secondo'])
+
+    def test_permanent_failure_releases_chat(self):
+        enqueue_message(1, 'primo')
+        enqueue_message(1, 'secondo')
+        api = FakeAPI({'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked'})
+        sender = OutboxSender(api, chat_rate=1000)
+        sender.run_once()
+        sender.run_once()
+        self.assertEqual(api.sent, ['primo', 'secondo'])
+        self.assertEqual(OutboundMessage.objects.get(text='primo').status, 'failed')
+
+    def test_429_blocks_whole_bot(self):
+        message = enqueue_message(1, 'primo')
+        api = FakeAPI({'ok': False, 'error_code': 429, 'parameters': {'retry_after': 5}})
+        sender = OutboxSender(api)
+        sender.run_once()
+        self.assertGreater(sender.global_bucket.wait_time(), 4)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=4))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SenderLeaseTests(TestCase):
+    def setUp(self):
+        cache.delete(SENDER_LEASE_KEY)
+        self.addCleanup(cache.delete, SENDER_LEASE_KEY)
+
+    def test_single_active_sender(self):
+        first = OutboxSender(FakeAPI())
+        second = OutboxSender(FakeAPI())
+        self.assertTrue(first.holds_lease())
+        self.assertFalse(second.holds_lease())
+        self.assertTrue(first.holds_lease())
+
+        # Lease scaduto (processo morto): subentra l'altro sender
+        cache.delete(SENDER_LEASE_KEY)
+        self.assertTrue(second.holds_lease())
+        self.assertFalse(first.holds_lease())
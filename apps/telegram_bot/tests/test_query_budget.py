@@ -0,0 +1,84 @@
+"""
+Budget di query degli handler più usati: non deve crescere con il numero di turni
+"""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.pizzerias.geo import get_pizzeria_index
+from apps.shifts.feed import ranked_shifts
+from apps.telegram_bot.notifications import notify_new_assignments
+from apps.telegram_bot.tests.fakes import make_bot
+from ridermatch.factories import assign, create_pizzeria, create_rider, create_shift
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+ALL_WEEK = [(day, '00:00', '23:59') for day in range(7)]
+
+
+def create_shifts(pizzerias, count):
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    return [
+        create_shift(pizzerias[i % len(pizzerias)], tomorrow + timedelta(days=i % 7), hourly_rate=f'{10 + i % 5}.00')
+        for i in range(count)
+    ]
+
+
+class MyShiftsQueryTests(TestCase):
+    def test_one_query_for_twenty_assignments(self):
+        rider = create_rider(100, ALL_WEEK)
+        pizzerias = [create_pizzeria(f'P{i}') for i in range(3)]
+        for shift in create_shifts(pizzerias, 20):
+            assign(shift, rider)
+        bot = make_bot()
+
+        with self.assertNumQueries(1):
+            bot.handle_my_shifts(100, 100)
+        self.assertEqual(bot.api.sent[0].count('⏳'), 20)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AvailableShiftsQueryTests(TestCase):
+    def cold_page_queries(self, shift_count, telegram_id):
+        rider = create_rider(telegram_id, ALL_WEEK)
+        create_shifts([create_pizzeria(f'P{telegram_id}')], shift_count)
+        # Indice spaziale per processo: costruito una volta, fuori dal budget per richiesta
+        get_pizzeria_index()
+        bot = make_bot()
+        with CaptureQueriesContext(connection) as queries:
+            bot.handle_available_shifts(telegram_id, telegram_id)
+        return rider, bot, len(queries)
+
+    def test_next_page_is_one_query(self):
+        rider, bot, _ = self.cold_page_queries(12, 100)
+        cursor = ranked_shifts(rider)[4]
+
+        with self.assertNumQueries(1):
+            bot.handle_available_shifts(100, 100, cursor=(-cursor[0], cursor[1]))
+        self.assertIn('<b>6. 🍕', bot.api.sent[-1])
+
+    def test_first_page_does_not_grow_with_shifts(self):
+        _, _, few = self.cold_page_queries(6, 100)
+        _, _, many = self.cold_page_queries(40, 200)
+        self.assertEqual(few, many)
+
+
+class NotificationQueryTests(TestCase):
+    def notify_queries(self, riders, shifts_per_rider, first_telegram_id):
+        pizzeria = create_pizzeria(f'P{first_telegram_id}')
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        for r in range(riders):
+            rider = create_rider(first_telegram_id + r)
+            for s in range(shifts_per_rider):
+                assign(create_shift(pizzeria, tomorrow + timedelta(days=s)), rider)
+        with CaptureQueriesContext(connection) as queries:
+            notify_new_assignments()
+        return len(queries)
+
+    def test_fan_out_is_constant(self):
+        single = self.notify_queries(1, 1, 100)
+        many = self.notify_queries(10, 3, 200)
+        self.assertEqual(single, many)
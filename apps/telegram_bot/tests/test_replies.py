@@ -0,0 +1,38 @@
+from django.test import TestCase
+
+from apps.telegram_bot.replies import editing
+from apps.telegram_bot.tests.fakes import make_bot
+
+INLINE = {'inline_keyboard': [[{'text': 'Menu', 'callback_data': 'main_menu'}]]}
+
+
+class CallbackReplyTests(TestCase):
+    def methods(self, bot):
+        return [method for method, _ in bot.api.calls]
+
+    def test_first_reply_edits_the_button_message(self):
+        bot = make_bot()
+        with editing(1, 10):
+            bot.send_message(1, 'uno', INLINE)
+            bot.send_message(1, 'due', INLINE)
+        self.assertEqual(self.methods(bot), ['editMessageText', 'sendMessage'])
+
+    def test_same_content_makes_no_call(self):
+        bot = make_bot()
+        with editing(1, 10):
+            bot.send_message(1, 'uno', INLINE)
+        with editing(1, 10):
+            bot.send_message(1, 'uno', INLINE)
+        self.assertEqual(self.methods(bot), ['editMessageText'])
+
+    def test_rejected_edit_falls_back_to_new_message(self):
+        bot = make_bot({'ok': False, 'description': "Bad Request: message can't be edited"})
+        with editing(1, 10):
+            bot.send_message(1, 'uno', INLINE)
+        self.assertEqual(self.methods(bot), ['editMessageText', 'sendMessage'])
+
+    def test_network_error_does_not_duplicate(self):
+        bot = make_bot(None)
+        with editing(1, 10):
+            self.assertIsNone(bot.send_message(1, 'uno', INLINE))
+        self.assertEqual(self.methods(bot), ['editMessageText'])
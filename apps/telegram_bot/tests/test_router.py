@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase
+
+from apps.telegram_bot.router import Router
+
+
+def make_bot_class(router):
+    class Bot:
+        def __init__(self):
+            self.calls = []
+
+        @router.route('menu')
+        def handle_menu(self, chat_id):
+            self.calls.append(('menu', chat_id))
+
+        @router.route('accept_shift_', arg='assignment_id', parse=int)
+        def handle_accept(self, chat_id, assignment_id):
+            self.calls.append(('accept', chat_id, assignment_id))
+
+    return Bot
+
+
+class RouterTests(SimpleTestCase):
+    def test_exact_and_prefix_routes(self):
+        router = Router('test')
+        bot = make_bot_class(router)()
+        self.assertTrue(router.dispatch(bot, 'menu', chat_id=1, telegram_id=2))
+        self.assertTrue(router.dispatch(bot, 'accept_shift_42', chat_id=1))
+        self.assertFalse(router.dispatch(bot, 'accept_shift_x', chat_id=1))
+        self.assertFalse(router.dispatch(bot, 'sconosciuto', chat_id=1))
+        self.assertEqual(bot.calls, [('menu', 1), ('accept', 1, 42)])
+
+    def test_subclass_override_is_called(self):
+        router = Router('test')
+
+        class CustomBot(make_bot_class(router)):
+            def handle_menu(self, chat_id):
+                self.calls.append(('custom menu', chat_id))
+
+        bot = CustomBot()
+        router.dispatch(bot, 'menu', chat_id=1)
+        self.assertEqual(bot.calls, [('custom menu', 1)])
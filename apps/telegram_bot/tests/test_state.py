@@ -0,0 +1,109 @@
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.telegram_bot.state import MemoryStateStore, RedisStateStore, get_state_store
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class MemoryStateStoreTests(SimpleTestCase):
+    def test_set_get_delete(self):
+        store = MemoryStateStore()
+        store.set(1, {'state': 'waiting_phone'})
+        self.assertEqual(store.get_state(1), 'waiting_phone')
+        store.delete(1)
+        self.assertIsNone(store.get(1))
+
+    def test_get_returns_copy(self):
+        store = MemoryStateStore()
+        store.set(1, {'state': 'waiting_phone'})
+        store.get(1)['state'] = 'altro'
+        self.assertEqual(store.get_state(1), 'waiting_phone')
+
+    def test_update_creates_and_merges(self):
+        store = MemoryStateStore()
+        store.update(1, state='waiting_time')
+        store.update(1, selected_day=3)
+        self.assertEqual(store.get(1), {'state': 'waiting_time', 'selected_day': 3})
+
+    @mock.patch('apps.telegram_bot.state.time.monotonic')
+    def test_ttl_expiry(self, monotonic):
+        monotonic.return_value = 1000.0
+        store = MemoryStateStore(ttl=60)
+        store.set(1, {'state': 'waiting_phone'})
+
+        monotonic.return_value = 1059.0
+        self.assertEqual(store.get_state(1), 'waiting_phone')
+        monotonic.return_value = 1061.0
+        self.assertIsNone(store.get(1))
+        # Lo stato scaduto viene rimosso alla lettura
+        self.assertEqual(len(store), 0)
+
+    @mock.patch('apps.telegram_bot.state.time.monotonic')
+    def test_set_renews_ttl(self, monotonic):
+        monotonic.return_value = 1000.0
+        store = MemoryStateStore(ttl=60)
+        store.set(1, {'state': 'waiting_phone'})
+        monotonic.return_value = 1050.0
+        store.update(1, phone='+39333')
+        monotonic.return_value = 1100.0
+        self.assertEqual(store.get(1)['phone'], '+39333')
+
+    def test_lru_eviction(self):
+        store = MemoryStateStore(max_entries=2)
+        store.set(1, {'state': 'a'})
+        store.set(2, {'state': 'b'})
+        # La lettura rende 1 il più recente: esce 2
+        store.get(1)
+        store.set(3, {'state': 'c'})
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get(2))
+        self.assertEqual(store.get_state(1), 'a')
+        self.assertEqual(store.get_state(3), 'c')
+
+
+@skipIf(fakeredis is None, "fakeredis non installato")
+class RedisStateStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.client = fakeredis.FakeRedis()
+        self.store = RedisStateStore(client=self.client, ttl=60)
+
+    def test_set_get_delete(self):
+        self.store.set(1, {'state': 'waiting_time', 'selected_day': 3})
+        self.assertEqual(self.store.get(1), {'state': 'waiting_time', 'selected_day': 3})
+        self.store.delete(1)
+        self.assertIsNone(self.store.get(1))
+
+    def test_ttl_on_every_write(self):
+        self.store.set(1, {'state': 'waiting_phone'})
+        self.client.expire('ridermatch:state:1', 5)
+        self.store.update(1, phone='+39333')
+        self.assertGreater(self.client.ttl('ridermatch:state:1'), 5)
+
+    def test_shared_between_stores(self):
+        # Due processi del bot con lo stesso Redis vedono lo stesso stato
+        other = RedisStateStore(client=self.client, ttl=60)
+        self.store.set(1, {'state': 'waiting_phone'})
+        self.assertEqual(other.get_state(1), 'waiting_phone')
+
+    def test_expired_state(self):
+        self.store.set(1, {'state': 'waiting_phone'})
+        self.client.delete('ridermatch:state:1')
+        self.assertIsNone(self.store.get_state(1))
+
+
+class StateStoreFactoryTests(SimpleTestCase):
+    @override_settings(BOT_STATE_BACKEND='memory', BOT_STATE_TTL=10, BOT_STATE_MAX_ENTRIES=5)
+    def test_memory(self):
+        store = get_state_store()
+        self.assertIsInstance(store, MemoryStateStore)
+        self.assertEqual((store.ttl, store.max_entries), (10, 5))
+
+    @override_settings(BOT_STATE_BACKEND='altro')
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            get_state_store()
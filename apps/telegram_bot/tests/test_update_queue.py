@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.telegram_bot.models import ProcessedCallback, TelegramUpdate
+from apps.telegram_bot.tasks import purge_processed_updates
+from apps.telegram_bot.tests.fakes import message_update
+from apps.telegram_bot.update_queue import (
+    claim_callback, claim_updates, complete_update, enqueue_update, purge_processed
+)
+
+
+class UpdateQueueTests(TestCase):
+    def test_claim_does_not_mark_processed(self):
+        enqueue_update(message_update(1))
+        self.assertEqual([u['update_id'] for u in claim_updates()], [1])
+        self.assertIsNone(TelegramUpdate.objects.get(update_id=1).processed_at)
+        # Riservato: non viene riconsegnato finché il lease è valido
+        self.assertEqual(claim_updates(), [])
+
+    def test_expired_lease_is_redelivered(self):
+        enqueue_update(message_update(1))
+        claim_updates(lease_seconds=-1)
+        # Consumer morto prima di completare: l'update torna disponibile
+        self.assertEqual([u['update_id'] for u in claim_updates()], [1])
+
+    def test_completed_update_is_not_redelivered(self):
+        enqueue_update(message_update(1))
+        claim_updates(lease_seconds=-1)
+        complete_update(1)
+        self.assertEqual(claim_updates(), [])
+
+    def test_claim_in_update_order(self):
+        for update_id in (3, 1, 2):
+            enqueue_update(message_update(update_id))
+        self.assertEqual([u['update_id'] for u in claim_updates(batch_size=2)], [1, 2])
+        self.assertEqual([u['update_id'] for u in claim_updates(batch_size=2)], [3])
+
+    def test_duplicate_update_ignored(self):
+        enqueue_update(message_update(1))
+        enqueue_update(message_update(1, text='/menu'))
+        self.assertEqual(TelegramUpdate.objects.count(), 1)
+
+    def test_claim_callback_once(self):
+        self.assertTrue(claim_callback('abc'))
+        self.assertFalse(claim_callback('abc'))
+
+    def test_purge_keeps_pending_updates(self):
+        enqueue_update(message_update(1))
+        enqueue_update(message_update(2))
+        complete_update(1)
+        claim_callback('abc')
+        purge_processed(older_than=timedelta(0))
+        self.assertEqual(list(TelegramUpdate.objects.values_list('update_id', flat=True)), [2])
+        self.assertFalse(ProcessedCallback.objects.exists())
+
+    def test_purge_task_removes_old_callback_keys(self):
+        claim_callback('vecchio')
+        ProcessedCallback.objects.update(processed_at=timezone.now() - timedelta(days=2))
+        claim_callback('nuovo')
+        purge_processed_updates.delay()
+        self.assertEqual(list(ProcessedCallback.objects.values_list('callback_id', flat=True)), ['nuovo'])
+
+
+@override_settings(TELEGRAM_WEBHOOK_SECRET='segreto')
+class WebhookTests(TestCase):
+    def post(self, body, secret='segreto'):
+        return self.client.post(
+            '/telegram/webhook/', body, content_type='application/json',
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret
+        )
+
+    def test_recorded_update_is_queued(self):
+        response = self.post(json.dumps(message_update(42)))
+        self.assertEqual(response.status_code, 200)
+        update = TelegramUpdate.objects.get(update_id=42)
+        self.assertEqual(update.payload['message']['text'], '/start')
+        self.assertIsNone(update.processed_at)
+
+    def test_redelivery_is_ignored(self):
+        self.post(json.dumps(message_update(42)))
+        self.assertEqual(self.post(json.dumps(message_update(42))).status_code, 200)
+        self.assertEqual(TelegramUpdate.objects.count(), 1)
+
+    def test_wrong_secret(self):
+        self.assertEqual(self.post(json.dumps(message_update(42)), secret='altro').status_code, 403)
+        self.assertFalse(TelegramUpdate.objects.exists())
+
+    def test_invalid_json(self):
+        self.assertEqual(self.post('{non json').status_code, 400)
+        self.assertEqual(self.post(json.dumps({'message': {}})).status_code, 400)
+
+
+@override_settings(BOT_WORKERS=1, BOT_METRICS_PORT=None)
+class ConsumeUpdatesTests(TestCase):
+    def test_updates_marked_processed_after_handler(self):
+        from apps.telegram_bot.complete_bot import RiderMatchBot
+
+        enqueue_update(message_update(1))
+        enqueue_update(message_update(2))
+        seen = []
+
+        def process_update(bot, update):
+            # Durante l'handler l'update non risulta ancora processato
+            seen.append(TelegramUpdate.objects.get(update_id=update['update_id']).processed_at)
+
+        with mock.patch.object(RiderMatchBot, 'process_update', process_update):
+            call_command('consume_updates', once=True, stdout=StringIO())
+
+        self.assertEqual(seen, [None, None])
+        self.assertFalse(TelegramUpdate.objects.filter(processed_at__isnull=True).exists())
+
+    @override_settings(BOT_WORKERS=2)
+    def test_workers_claim_only_free_slots(self):
+        from apps.telegram_bot.complete_bot import RiderMatchBot
+
+        pending = [message_update(update_id, telegram_id=100 + update_id) for update_id in range(1, 8)]
+        lock = threading.Lock()
+        in_flight, seen = [], []
+
+        def claim(limit):
+            with lock:
+                batch, pending[:limit] = pending[:limit], []
+                in_flight.extend(update['update_id'] for update in batch)
+                return batch
+
+        def complete(update_id):
+            with lock:
+                in_flight.remove(update_id)
+
+        def process_update(bot, update):
+            seen.append(len(in_flight))
+            time.sleep(0.01)
+
+        command = 'apps.telegram_bot.management.commands.consume_updates'
+        with mock.patch(f'{command}.claim_updates', claim), mock.patch(f'{command}.complete_update', complete), \
+                mock.patch.object(RiderMatchBot, 'process_update', process_update):
+            call_command('consume_updates', once=True, batch_size=2, idle_sleep=0.01, stdout=StringIO())
+
+        self.assertEqual((pending, in_flight), ([], []))
+        # Mai più di batch_size update prelevati e non completati
+        self.assertEqual(len(seen), 7)
+        self.assertLessEqual(max(seen), 2)
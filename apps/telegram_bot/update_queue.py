@@ -0,0 +1,83 @@
+"""
+Coda persistente degli update ricevuti via webhook
+- Il webhook salva l'update grezzo e risponde subito
+- Il consumer preleva gli update a blocchi con un lease (claimed_until) e
+  li segna processati solo dopo l'handler: se il consumer muore, gli update
+  tornano disponibili alla scadenza del lease (consegna almeno una volta)
+- Ogni callback query viene processata una sola volta
+- Un solo consumer per deployment: l'ordine per chat è garantito dagli shard
+  del dispatcher, che esistono solo dentro un processo
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.telegram_bot.models import ProcessedCallback, TelegramUpdate
+from ridermatch.metrics import QUEUE_DEPTH
+
+# Oltre questo tempo un update prelevato e non completato viene riconsegnato
+LEASE_SECONDS = 300
+
+
+def enqueue_update(update):
+    """Accoda un update (le riconsegne di Telegram vengono ignorate)"""
+    TelegramUpdate.objects.bulk_create(
+        [TelegramUpdate(update_id=update['update_id'], payload=update)],
+        ignore_conflicts=True
+    )
+
+
+def claim_updates(batch_size=100, lease_seconds=LEASE_SECONDS):
+    """Preleva il prossimo blocco di update in ordine di arrivo, riservandolo per lease_seconds"""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            TelegramUpdate.objects
+            .select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .order_by('update_id')[:batch_size]
+        )
+        if batch:
+            TelegramUpdate.objects.filter(
+                id__in=[update.id for update in batch]
+            ).update(claimed_until=now + timedelta(seconds=lease_seconds))
+    
+    return [update.payload for update in batch]
+
+
+def complete_update(update_id):
+    """Segna l'update come processato (dopo l'handler, anche se è fallito)"""
+    TelegramUpdate.objects.filter(update_id=update_id).update(processed_at=timezone.now())
+
+
+def claim_callback(callback_id):
+    """True solo per il primo processo che registra il callback"""
+    try:
+        with transaction.atomic():
+            ProcessedCallback.objects.create(callback_id=callback_id)
+        return True
+    except IntegrityError:
+        return False
+
+
+def pending_count():
+    """Update ancora da processare"""
+    return TelegramUpdate.objects.filter(processed_at__isnull=True).count()
+
+
+# COUNT(*) a ogni lettura delle metriche: solo se richiesto
+if getattr(settings, 'METRICS_DB_GAUGES', False):
+    QUEUE_DEPTH.labels('webhook_updates').set_function(pending_count)
+
+
+def purge_processed(older_than=timedelta(days=1)):
+    """Elimina gli update e le chiavi dei callback già processati"""
+    cutoff = timezone.now() - older_than
+    deleted, _ = TelegramUpdate.objects.filter(processed_at__lt=cutoff).delete()
+    ProcessedCallback.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,39 @@
+import hmac
+import json
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+# Importato per registrare la profondità dell'outbox nelle metriche
+from apps.telegram_bot import outbox  # noqa: F401
+from apps.telegram_bot.update_queue import enqueue_update
+from ridermatch.metrics import CONTENT_TYPE, authorized, render
+
+
+@csrf_exempt
+@require_POST
+def telegram_webhook(request):
+    """Riceve gli update da Telegram e li accoda per il consumer"""
+    secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+    received = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not secret or not hmac.compare_digest(received, secret):
+        return HttpResponseForbidden()
+    
+    try:
+        update = json.loads(request.body)
+        int(update['update_id'])
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest()
+    
+    enqueue_update(update)
+    return JsonResponse({'ok': True})
+
+
+@require_GET
+def metrics(request):
+    """Metriche del processo in formato Prometheus (token METRICS_TOKEN, senza token solo con DEBUG)"""
+    if not authorized(request.headers.get('Authorization', '')):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -6,7 +6,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ridermatch.settings')
 django.setup()
 
 def main():
-    from apps.telegram_bot.complete_bot import RiderMatchBot
+    # --async: runtime asyncio con pool HTTP condiviso
+    if '--async' in sys.argv:
+        from apps.telegram_bot.async_bot import AsyncRiderMatchBot as RiderMatchBot
+    else:
+        from apps.telegram_bot.complete_bot import RiderMatchBot
     
     try:
         bot = RiderMatchBot()
@@ -0,0 +1,133 @@
+"""
+Cache read-through per le letture più frequenti
+- LRU in processo (limitata, scadenza breve) davanti alla cache Django
+- Chiavi versionate: la versione cambia con i campi del modello, così
+  dopo una migrazione non si leggono oggetti serializzati con lo schema vecchio
+- Invalidazione esplicita (dai signal) e contatori di hit/miss
+- Debounce: una sola richiesta per chiave e intervallo, nel processo (anche
+  con la DummyCache di sviluppo) e tra processi (cache condivisa)
+"""
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ridermatch.metrics import Counter, Gauge
+
+_MISSING = object()
+_registry = {}
+# Debounce in processo: chiave -> scadenza (monotonic)
+_debounced = {}
+_debounce_lock = threading.Lock()
+
+CACHE_HITS = Counter('ridermatch_read_cache_hits_total', "Letture servite dalla cache", ['cache', 'level'])
+CACHE_MISSES = Counter('ridermatch_read_cache_misses_total', "Letture caricate dal database", ['cache'])
+CACHE_ENTRIES = Gauge('ridermatch_read_cache_local_entries', "Elementi nella cache in processo", ['cache'])
+
+
+def model_version(*models):
+    """Versione delle chiavi ricavata dai campi dei modelli memorizzati"""
+    fields = ','.join(
+        f"{model._meta.label}.{field.attname}" for model in models for field in model._meta.concrete_fields
+    )
+    return hashlib.md5(fields.encode()).hexdigest()[:8]
+
+
+class ReadThroughCache:
+    """Valori letti con loader(key) alla prima richiesta, poi serviti dalla cache"""
+
+    def __init__(self, name, loader, version='1', ttl=None, local_ttl=None, max_entries=None):
+        self.name = name
+        self.loader = loader
+        self.version = version
+        self.ttl = ttl or getattr(settings, 'READ_CACHE_TTL', 300)
+        self.local_ttl = local_ttl or getattr(settings, 'READ_CACHE_LOCAL_TTL', 10)
+        self.max_entries = max_entries or getattr(settings, 'READ_CACHE_MAX_ENTRIES', 10000)
+        # key -> (scadenza, valore serializzato): ogni lettura restituisce una copia
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        _registry[name] = self
+        # Contatori esportati leggendo gli attributi: nessun costo per lettura
+        CACHE_HITS.labels(name, 'local').set_function(lambda: self.local_hits)
+        CACHE_HITS.labels(name, 'shared').set_function(lambda: self.shared_hits)
+        CACHE_MISSES.labels(name).set_function(lambda: self.misses)
+        CACHE_ENTRIES.labels(name).set_function(lambda: len(self.local))
+
+    def _shared_key(self, key):
+        return f"rt:{self.name}:{self.version}:{key}"
+
+    def get(self, key):
+        """Valore per key (None compreso: anche i "non trovato" sono memorizzati)"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.local.get(key)
+            if entry is not None and entry[0] > now:
+                self.local.move_to_end(key)
+                self.local_hits += 1
+                return pickle.loads(entry[1])
+
+        value = cache.get(self._shared_key(key), _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            value = self.loader(key)
+            cache.set(self._shared_key(key), value, self.ttl)
+        else:
+            self.shared_hits += 1
+
+        with self.lock:
+            self.local[key] = (now + self.local_ttl, pickle.dumps(value))
+            self.local.move_to_end(key)
+            while len(self.local) > self.max_entries:
+                self.local.popitem(last=False)
+        return value
+
+    def invalidate(self, key):
+        with self.lock:
+            self.local.pop(key, None)
+        cache.delete(self._shared_key(key))
+
+    def stats(self):
+        """Contatori di hit/miss e hit rate complessivo"""
+        total = self.local_hits + self.shared_hits + self.misses
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (self.local_hits + self.shared_hits) / total if total else 0.0,
+            'local_entries': len(self.local),
+        }
+
+
+def bump_version(key):
+    """Incrementa un contatore di versione condiviso (le chiavi mancanti valgono 1)"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def debounce(key, seconds):
+    """True solo per la prima richiesta della chiave nei prossimi seconds secondi"""
+    now = time.monotonic()
+    with _debounce_lock:
+        if _debounced.get(key, 0) > now:
+            return False
+        _debounced[key] = now + seconds
+        if len(_debounced) > 10000:
+            for expired in [k for k, until in _debounced.items() if until <= now]:
+                del _debounced[expired]
+    # Un altro processo può averla già presa
+    return cache.add(key, 1, seconds)
+
+
+def cache_stats():
+    """Statistiche di tutte le cache read-through del processo"""
+    return {name: read_cache.stats() for name, read_cache in _registry.items()}
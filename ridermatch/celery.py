@@ -0,0 +1,15 @@
+"""
+Applicazione Celery di RiderMatch
+- Configurazione dai settings Django (prefisso CELERY_)
+- Task scoperti nei moduli tasks.py delle app
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ridermatch.settings')
+
+app = Celery('ridermatch')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
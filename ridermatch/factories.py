@@ -0,0 +1,51 @@
+"""
+Dati di prova condivisi dai test delle app
+"""
+
+from datetime import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+
+from apps.pizzerias.models import Pizzeria
+from apps.riders.models import Rider, RiderAvailability
+from apps.shifts.models import Shift, ShiftAssignment
+
+
+def _time(value):
+    return time.fromisoformat(value) if isinstance(value, str) else value
+
+
+def create_pizzeria(name='Da Mario', latitude='45.464200', longitude='9.190000', **fields):
+    return Pizzeria.objects.create(
+        name=name, address='Via Roma 1', phone='021234567',
+        latitude=Decimal(latitude), longitude=Decimal(longitude), **fields
+    )
+
+
+def create_rider(telegram_id, windows=(), **fields):
+    """Rider con disponibilità [(giorno, 'HH:MM', 'HH:MM'[, preferita])]"""
+    user = User.objects.create(username=f'telegram_{telegram_id}', first_name=f'Rider {telegram_id}')
+    fields.setdefault('phone', '+39333')
+    fields.setdefault('transport_type', 'bike')
+    rider = Rider.objects.create(user=user, telegram_id=telegram_id, **fields)
+    for day, start, end, *preferred in windows:
+        RiderAvailability.objects.create(
+            rider=rider, day_of_week=day, start_time=_time(start), end_time=_time(end),
+            is_preferred=bool(preferred and preferred[0])
+        )
+    return rider
+
+
+def create_shift(pizzeria, date, start='19:00', end='22:00', hourly_rate='12.00', **fields):
+    return Shift.objects.create(
+        pizzeria=pizzeria, date=date, start_time=_time(start), end_time=_time(end),
+        hourly_rate=Decimal(hourly_rate), **fields
+    )
+
+
+def assign(shift, rider, **fields):
+    """Assegnazione con il turno segnato come assegnato (come fa il matching)"""
+    assignment = ShiftAssignment.objects.create(shift=shift, rider=rider, **fields)
+    Shift.objects.filter(id=shift.id).update(status='assigned')
+    return assignment
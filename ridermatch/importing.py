@@ -0,0 +1,214 @@
+"""
+Import in blocco da CSV/JSONL
+- Righe lette in streaming (memoria costante, anche da stdin)
+- Validazione con i campi del modello (conversione, scelte, lunghezze)
+- Upsert a blocchi con bulk_create(update_conflicts=True): si aggiornano
+  solo le colonne presenti nel file, le altre restano come sono
+- Chiavi duplicate nello stesso blocco: vale l'ultima riga
+- Comando base con avanzamento in righe/s
+"""
+
+import csv
+import json
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+BATCH_SIZE = 2000
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'si', 'sì'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+
+
+class ImportRowError(ValueError):
+    """Riga non valida (viene saltata e conteggiata)"""
+
+
+def read_rows(path, file_format=None):
+    """(numero riga, dizionario) da un file CSV o JSONL ('-' = stdin)"""
+    if file_format is None:
+        file_format = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+    source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if file_format == 'csv':
+            # Riga 1 = intestazione
+            for line, row in enumerate(csv.DictReader(source), 2):
+                yield line, row
+        else:
+            for line, text in enumerate(source, 1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError as e:
+                    yield line, ImportRowError(f"JSON non valido: {e}")
+                    continue
+                yield line, row
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+class BulkUpserter:
+    """Valida le righe e le scrive a blocchi; le sottoclassi indicano modello e campi"""
+
+    model = None
+    # Campo con vincolo unique usato per l'upsert
+    key = None
+    # Campi del modello letti dalle colonne con lo stesso nome
+    fields = ()
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.model_fields = {name: self.model._meta.get_field(name) for name in self.fields}
+        self.columns = None
+        self.update_fields = None
+        self.batch = {}
+        self.saved = 0
+
+    def clean_value(self, name, value):
+        """Valore convertito e validato con il campo del modello"""
+        field = self.model_fields[name]
+        if isinstance(value, str):
+            value = value.strip()
+            if field.get_internal_type() == 'BooleanField' and value:
+                lowered = value.lower()
+                if lowered in TRUE_VALUES:
+                    value = True
+                elif lowered in FALSE_VALUES:
+                    value = False
+        if value is None or value == '':
+            if field.has_default():
+                return field.get_default()
+            if field.null:
+                return None
+            if not field.blank:
+                raise ImportRowError(f"{name}: campo obbligatorio")
+            value = ''
+        try:
+            return field.clean(value, None)
+        except ValidationError as e:
+            raise ImportRowError(f"{name}: {'; '.join(e.messages)}")
+
+    def build(self, row):
+        """Istanza del modello dalla riga (le sottoclassi aggiungono FK e controlli)"""
+        return self.model(**{
+            name: self.clean_value(name, row.get(name)) for name in self.fields
+        })
+
+    def add(self, row):
+        """Valida e accoda una riga; scrive il blocco quando è pieno"""
+        if self.columns is None:
+            self.set_columns(row)
+        instance = self.build(row)
+        key = getattr(instance, self.key)
+        if key is None or key == '':
+            raise ImportRowError(f"{self.key}: campo obbligatorio")
+        self.batch[key] = instance
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def set_columns(self, row):
+        """Le colonne della prima riga decidono cosa aggiornare sulle righe esistenti"""
+        self.columns = set(row)
+        if self.key not in self.columns:
+            raise CommandError(f"Colonna obbligatoria mancante: {self.key}")
+        self.update_fields = [
+            name for name in self.fields if name != self.key and name in self.columns
+        ]
+
+    def flush(self):
+        if not self.batch:
+            return
+        instances = list(self.batch.values())
+        self.batch = {}
+        if not self.dry_run:
+            with transaction.atomic():
+                self.save(instances)
+            self.after_save(instances)
+        self.saved += len(instances)
+
+    def save(self, instances):
+        self.upsert(self.model, instances, [self.key], self.update_fields)
+
+    def upsert(self, model, instances, unique_fields, update_fields):
+        if update_fields:
+            model.objects.bulk_create(
+                instances,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields
+            )
+        else:
+            model.objects.bulk_create(instances, ignore_conflicts=True)
+
+    def after_save(self, instances):
+        """Invalidazione delle cache dopo il commit di un blocco"""
+
+    def finish(self):
+        """Dopo l'ultimo blocco (lavoro da fare una volta sola per import)"""
+
+
+class ImportCommand(BaseCommand):
+    """Comando di import: sottoclassi impostano upserter_class e help"""
+
+    upserter_class = None
+    # Righe tra due messaggi di avanzamento
+    progress_every = 50000
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File CSV o JSONL ('-' per stdin)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Formato del file (default: dall'estensione)")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Valida le righe senza scrivere")
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help="Interrompe dopo questo numero di righe non valide")
+
+    def handle(self, *args, **options):
+        upserter = self.upserter_class(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        errors = 0
+        rows = 0
+        started = time.perf_counter()
+
+        try:
+            try:
+                for line, row in read_rows(options['path'], options['format']):
+                    rows += 1
+                    try:
+                        if isinstance(row, Exception):
+                            raise row
+                        if not isinstance(row, dict):
+                            raise ImportRowError("la riga non è un oggetto")
+                        upserter.add(row)
+                    except ImportRowError as e:
+                        errors += 1
+                        self.stderr.write(f"Riga {line}: {e}")
+                        if errors > options['max_errors']:
+                            raise CommandError(f"Troppe righe non valide ({errors}), import interrotto")
+
+                    if rows % self.progress_every == 0:
+                        self.write_progress(rows, started)
+                upserter.flush()
+            finally:
+                # Anche se interrotto: i blocchi già scritti restano nel DB
+                if not options['dry_run']:
+                    upserter.finish()
+        except OSError as e:
+            raise CommandError(f"File non leggibile: {e}")
+
+        elapsed = time.perf_counter() - started
+        verb = "validate" if options['dry_run'] else "importate"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {upserter.saved} righe {verb}, {errors} scartate in {elapsed:.1f}s "
+            f"({rows / elapsed if elapsed else 0:.0f} righe/s)"
+        ))
+
+    def write_progress(self, rows, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"   {rows} righe lette ({rows / elapsed if elapsed else 0:.0f} righe/s)")
@@ -0,0 +1,238 @@
+"""
+Metriche in formato Prometheus
+- Contatori, gauge e istogrammi a bucket fissi, senza lock sul percorso caldo:
+  ogni serie è un oggetto preallocato, observe() incrementa solo numeri
+  (sotto concorrenza un incremento può raramente perdersi, accettabile per metriche)
+- Serie per etichette create alla prima richiesta e poi riusate
+- Gauge/contatori calcolati al momento della lettura (code, statistiche cache)
+- Esposizione via view Django (/metrics/) o server HTTP nel processo del bot,
+  con token METRICS_TOKEN (senza token solo con DEBUG)
+"""
+
+import hmac
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Secondi: da 1ms a 10s
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Conteggi (query per update, assegnazioni per run)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Value:
+    """Serie di un contatore o gauge: valore fisso o funzione letta all'esportazione"""
+
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+
+class _Histogram:
+    """Serie di un istogramma: conteggi per bucket preallocati"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Ultimo elemento: oltre l'ultimo bucket (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """Metrica con eventuali etichette; senza etichette si usa direttamente"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Serie per i valori delle etichette (creata una volta sola)"""
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        """Righe (suffisso, etichette, valore) per l'esportazione"""
+        for values, child in list(self.children.items()):
+            try:
+                value = child.get()
+            except Exception as e:
+                print(f"Errore lettura metrica {self.name}: {e}")
+                continue
+            yield '', _format_labels(self.labelnames, values), value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value):
+        self._default.set(value)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _Histogram(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield '_bucket', _format_labels(self.labelnames, values, le), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield '_sum', labels, child.sum
+            yield '_count', labels, child.count
+
+
+def render():
+    """Tutte le metriche del processo nel formato testuale di Prometheus"""
+    lines = []
+    for metric in list(_registry):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, labels, value in metric.samples():
+            lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+    lines.append('')
+    return '\n'.join(lines)
+
+
+class QueryCounter:
+    """execute_wrapper di Django che conta le query eseguite"""
+
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def authorized(header):
+    """True se l'header Authorization permette di leggere le metriche"""
+    from django.conf import settings
+
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return settings.DEBUG
+    return hmac.compare_digest(header or '', f"Bearer {token}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        if not authorized(self.headers.get('Authorization', '')):
+            self.send_error(403)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Espone /metrics da un processo senza Django HTTP (bot, consumer)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='ridermatch-metrics', daemon=True).start()
+    return server
+
+
+# Metriche condivise da più moduli
+QUEUE_DEPTH = Gauge('ridermatch_queue_depth', "Elementi in attesa per coda", ['queue'])
@@ -56,4 +56,86 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Bot Telegram: dispatcher concorrente (1 = processamento sequenziale).
+# Più worker solo con un database che regge scritture concorrenti (PostgreSQL)
+BOT_WORKERS = 1
+# Update massimi in coda per ogni worker prima di rallentare il polling
+BOT_SHARD_QUEUE_SIZE = 100
+# Handler di callback/comandi oltre questa durata vengono segnalati nel log
+BOT_SLOW_HANDLER_SECONDS = 1.0
+
+# Bot Telegram: client HTTP
+TELEGRAM_API_URL = 'https://api.telegram.org'
+BOT_HTTP_POOL_SIZE = 100
+BOT_HTTP_TIMEOUT = 10
+BOT_POLL_TIMEOUT = 30
+# Runtime asyncio (bot.py --async): update processati in contemporanea
+BOT_ASYNC_CONCURRENCY = 1000
+# Thread per gli handler ORM del runtime asyncio (ognuno resta occupato anche
+# durante le chiamate Bot API dell'handler): indipendente da BOT_WORKERS
+BOT_ASYNC_ORM_THREADS = 8
+
+# Bot Telegram: stato conversazioni ('memory' o 'redis')
+BOT_STATE_BACKEND = 'memory'
+BOT_STATE_TTL = 3600
+BOT_STATE_MAX_ENTRIES = 10000
+
+# Bot Telegram: outbox notifiche (limiti Telegram: ~30 msg/s, 1 msg/s per chat)
+BOT_OUTBOX_GLOBAL_RATE = 30
+BOT_OUTBOX_CHAT_RATE = 1
+BOT_OUTBOX_MAX_ATTEMPTS = 5
+# Sender nel processo del bot (False se gira `manage.py send_outbox`).
+# Con più processi invia uno solo alla volta (lease nella cache condivisa)
+BOT_OUTBOX_SENDER_THREAD = True
+
+# Turni: minuti per confermare un'assegnazione prima che venga riassegnata
+SHIFT_CONFIRM_TIMEOUT_MINUTES = 30
+
+# Celery: matching e notifiche fuori dal processo del bot
+CELERY_BROKER_URL = 'redis://localhost:6379/0'
+CELERY_TASK_ALWAYS_EAGER = False
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'sweep-expired-assignments': {
+        'task': 'apps.shifts.tasks.sweep_assignments',
+        'schedule': 60.0,
+    },
+    'generate-recurring-shifts': {
+        'task': 'apps.shifts.tasks.generate_recurring_shifts',
+        'schedule': 3600.0,
+    },
+    'purge-processed-updates': {
+        'task': 'apps.telegram_bot.tasks.purge_processed_updates',
+        'schedule': 3600.0,
+    },
+}
+# Richieste di matching ravvicinate (disponibilità di un rider, turni importati o
+# generati) raggruppate in una sola ogni N secondi; senza worker (eager) la prima
+# parte subito e le altre nell'intervallo vengono saltate
+MATCHING_DEBOUNCE_SECONDS = 60
+
+# Cache read-through (rider): TTL condiviso e LRU in processo
+READ_CACHE_TTL = 300
+# Breve: le modifiche fatte da altri processi si vedono entro questo tempo
+READ_CACHE_LOCAL_TTL = 10
+READ_CACHE_MAX_ENTRIES = 10000
+# Indice spaziale delle pizzerie ricostruito al più tardi dopo N secondi
+PIZZERIA_INDEX_MAX_AGE = 300
+# Indice a intervalli delle disponibilità ricostruito al più tardi dopo N secondi
+AVAILABILITY_INDEX_MAX_AGE = 300
+
+# Classifica dei turni disponibili per rider: ricalcolata dopo N secondi
+FEED_CACHE_SECONDS = 60
+
+# Metriche Prometheus: /metrics/ nel processo web, porta dedicata nel bot (None = spenta)
+BOT_METRICS_PORT = None
+# Interfaccia del server metriche del bot (0.0.0.0 per esporlo fuori dall'host)
+BOT_METRICS_HOST = '127.0.0.1'
+# Header "Authorization: Bearer <token>" richiesto da /metrics/ e dal server del bot.
+# Senza token le metriche sono servite solo con DEBUG
+METRICS_TOKEN = ''
+# Profondità delle code su DB (COUNT(*) a ogni lettura): solo se richiesta
+METRICS_DB_GAUGES = False
\ No newline at end of file
@@ -32,8 +32,36 @@ INTERNAL_IPS = ['127.0.0.1']
 try:
     from decouple import config
     TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
+    # Webhook: URL pubblico e secret token verificato su ogni richiesta
+    TELEGRAM_WEBHOOK_URL = config('TELEGRAM_WEBHOOK_URL', default='')
+    TELEGRAM_WEBHOOK_SECRET = config('TELEGRAM_WEBHOOK_SECRET', default='')
+    # Stato conversazioni condiviso tra più processi del bot
+    BOT_STATE_BACKEND = config('BOT_STATE_BACKEND', default='memory')
+    BOT_STATE_REDIS_URL = config('BOT_STATE_REDIS_URL', default='redis://localhost:6379/1')
+    # Worker del dispatcher: con SQLite conviene restare sequenziali
+    BOT_WORKERS = config('BOT_WORKERS', default=1, cast=int)
+    # Celery: senza worker i task girano subito nel processo chiamante
+    CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='memory://')
+    CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=True, cast=bool)
+    # Cache Redis opzionale (altrimenti resta la DummyCache)
+    REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+    # Metriche: porta del server /metrics nel processo del bot (0 = spento)
+    BOT_METRICS_PORT = config('BOT_METRICS_PORT', default=0, cast=int)
+    METRICS_TOKEN = config('METRICS_TOKEN', default='')
+    if REDIS_CACHE_URL:
+        CACHES = {
+            'default': {
+                'BACKEND': 'django_redis.cache.RedisCache',
+                'LOCATION': REDIS_CACHE_URL,
+            }
+        }
 except ImportError:
     TELEGRAM_BOT_TOKEN = ''
+    TELEGRAM_WEBHOOK_URL = ''
+    TELEGRAM_WEBHOOK_SECRET = ''
+    BOT_STATE_REDIS_URL = 'redis://localhost:6379/1'
+    CELERY_BROKER_URL = 'memory://'
+    CELERY_TASK_ALWAYS_EAGER = True
 
 # Debug toolbar se disponibile
 try:
@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.urls import path
 from django.http import JsonResponse
 
+from apps.telegram_bot.views import metrics, telegram_webhook
+
 def health_check(request):
     """Health check endpoint"""
     return JsonResponse({
@@ -13,6 +15,8 @@ def health_check(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('health/', health_check, name='health_check'),
+    path('metrics/', metrics, name='metrics'),
+    path('telegram/webhook/', telegram_webhook, name='telegram_webhook'),
 ]
 
 # Custom admin site configuration